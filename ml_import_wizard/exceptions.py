@@ -40,4 +40,8 @@ class ImportSchemeNotReady(LoggingException):
 
 
 class StatusNotFound(LoggingException):
-    """ The indicated status has not been found """
\ No newline at end of file
+    """ The indicated status has not been found """
+
+
+class IdentityLockBusy(LoggingException):
+    """ An advisory lock on an identity is held by another worker """
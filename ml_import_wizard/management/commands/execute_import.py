@@ -17,6 +17,16 @@ class Command(BaseCommand):
         parser.add_argument('--limit_count', nargs='?', default=None, type=int, help='Number of rows to import from the file.')
         parser.add_argument('--offset_count', nargs='?', default=None, type=int, help='Number of rows to skip at the beginning of the file.')
         parser.add_argument('--ignore_status', action='store_true', help="Inspect the file even if it has already been inspected.")
+        parser.add_argument('--bulk_batch_size', nargs='?', default=None, type=int, help='Buffer new objects and save them with bulk_create in batches of this size.')
+        parser.add_argument('--transaction_batch_size', nargs='?', default=None, type=int, help='Commit rows in chunks of this size, with a savepoint for each row.')
+        parser.add_argument('--identity_index_budget', nargs='?', default=None, type=int, help='MB of memory to use for looking up existing objects in memory.  Off unless set.')
+        parser.add_argument('--copy_leaf_models', action='store_true', default=None, help='Save buffered models that nothing points to with COPY.  Needs PostgreSQL and --bulk_batch_size.')
+        parser.add_argument('--block_size', nargs='?', default=None, type=int, help='Number of rows to read at a time and transform with pandas.')
+        parser.add_argument('--join_budget', nargs='?', default=None, type=int, help='MB of memory to use joining linked files to the primary file, instead of looking up child rows for each row.')
+        parser.add_argument('--sql_join', action='store_true', default=None, help='Join linked files to the primary file in one SQLite query.')
+        parser.add_argument('--workers', nargs='?', default=None, type=int, help='Number of processes to split the rows between.  Needs PostgreSQL.')
+        parser.add_argument('--skip_rejected_featuretypes', action='store_true', default=None, help="Don't read the features of a GFF file whose featuretype would be rejected, only count them.")
+        parser.add_argument('--partition_featuretypes', action='store_true', default=None, help='Give each worker one featuretype of a GFF file at a time instead of a range of rows.')
 
     def handle(self, *args, **options):
         ''' Do the work of inspecting a file '''
@@ -38,7 +48,7 @@ class Command(BaseCommand):
             # except Exception as err:
             #     raise CommandError(err)
             
-            import_scheme.execute(ignore_status=options['ignore_status'], limit_count=options['limit_count'], offset_count=options["offset_count"])
+            import_scheme.execute(ignore_status=options['ignore_status'], limit_count=options['limit_count'], offset_count=options["offset_count"], bulk_batch_size=options["bulk_batch_size"], transaction_batch_size=options["transaction_batch_size"], identity_index_budget=options["identity_index_budget"], copy_leaf_models=options["copy_leaf_models"], block_size=options["block_size"], join_budget=options["join_budget"], sql_join=options["sql_join"], workers=options["workers"], skip_rejected_featuretypes=options["skip_rejected_featuretypes"], partition_featuretypes=options["partition_featuretypes"])
 
             # print(f"Limit Count: {options['limit_count']}")
 
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+import logging
+log = logging.getLogger(settings.ML_IMPORT_WIZARD['Logger'])
+
+from ml_import_wizard.utils.importer import importers
+from ml_import_wizard.utils.signatures import ContentSignatures
+
+class Command(BaseCommand):
+    help = "Saves content signatures for all existing objects of the models that have the content_signature setting, so imports can match them by signature. "
+    suppressed_base_arguments = ['--traceback', '--settings', '--pythonpath', '--skip-checks', '--no-color', '--version', '--force-color']
+
+    def add_arguments(self, parser):
+        ''' Set the arguments for sign_objects '''
+        parser.add_argument('importer', nargs='+', type=str, help='The name(s) of the importer(s) whose models should be signed')
+        parser.add_argument('--batch_size', nargs='?', default=1000, type=int, help='Number of objects to sign at a time.')
+
+    def handle(self, *args, **options):
+        ''' Do the work of signing objects '''
+
+        verbosity: int = int(options['verbosity'])
+
+        for importer_name in options['importer']:
+            if importer_name not in importers:
+                log.warn(f'Importer {importer_name} does not exist')
+                raise CommandError(f'Importer {importer_name} does not exist')
+
+            importer_models: list = [model for app in importers[importer_name].apps for model in app.models_by_import_order]
+            signatures = ContentSignatures(models=importer_models)
+
+            for model in [model for model in importer_models if model.name in signatures.models]:
+                if verbosity > 1:
+                    self.stdout.write(f'Signing {model.name} objects.')
+
+                object_count: int = signatures.sign_all(model=model, batch_size=options['batch_size'])
+
+                self.stdout.write(self.style.SUCCESS(f'{object_count} {model.name} objects signed.'))
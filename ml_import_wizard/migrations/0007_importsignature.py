@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml_import_wizard', '0006_add_import_failed_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportSignature',
+            fields=[
+                ('id', models.BigAutoField(editable=False, primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=255)),
+                ('signature', models.CharField(max_length=32)),
+                ('pkey_int', models.BigIntegerField(null=True)),
+                ('pkey_str', models.TextField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'signature'], name='ml_import_w_model_72e370_idx')],
+            },
+        ),
+    ]
@@ -1,11 +1,14 @@
-from pathlib import Path
-from itertools import islice
-import os.path, sqlite3, psutil
+from itertools import islice, groupby, chain
+from functools import partial
+from collections import Counter
+from contextlib import closing, nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os.path, io, sqlite3, psutil, multiprocessing, json, random
 import pandas as pd
-from typing import Generator, Callable
+from typing import Generator, Callable, Iterable
 
 from django.conf import settings
-from django.db import models, IntegrityError, transaction
+from django.db import models, connections, IntegrityError, OperationalError, transaction
 from django.db.models import Count
 from django.db.models.functions import Lower
 from django.utils.module_loading import import_string
@@ -19,11 +22,25 @@ from importlib.util import find_spec
 if find_spec("gffutils"): import gffutils # type: ignore
 else: NO_GFFUTILS=True
 
-from ml_import_wizard.utils.simple import dict_hash, stringalize, fancy_name, deep_exists
-from ml_import_wizard.exceptions import GFFUtilsNotInstalledError, FileNotReadyError, ImportSchemeNotReady, StatusNotFound
-from ml_import_wizard.utils.importer import importers, Importer
+# Check to see if pyarrow is installed, for Arrow staging files
+NO_PYARROW: bool = False
+if find_spec("pyarrow"): import pyarrow, pyarrow.compute, pyarrow.ipc # type: ignore
+else: NO_PYARROW=True
+
+from ml_import_wizard.utils.simple import dict_hash, lock_id, stringalize, fancy_name, deep_exists
+from ml_import_wizard.exceptions import GFFUtilsNotInstalledError, FileNotReadyError, IdentityLockBusy, ImportSchemeNotReady, StatusNotFound
+from ml_import_wizard.utils.importer import importers, Importer, ImporterModel
 from ml_import_wizard.decorators import timeit
 from ml_import_wizard.utils.cache import LRUCacheThing
+from ml_import_wizard.utils.writers import BulkWriter, identity_value, missing_key_values
+from ml_import_wizard.utils.identity import IdentityIndex, NOT_INDEXED
+from ml_import_wizard.utils.plan import RowPlan, RowContext, plans, joined_column
+from ml_import_wizard.utils.dates import infer_date_format
+from ml_import_wizard.utils.excel import excel_rows, excel_header
+from ml_import_wizard.utils.compression import split_compression, open_file, NO_ZSTANDARD
+from ml_import_wizard.utils.records import RecordScanner
+from ml_import_wizard.utils.gff import gff_rows, gff_rows_parallel, attribute_field
+from ml_import_wizard.utils.signatures import ContentSignatures, NOT_SIGNED
 
 
 class ImportBaseModel(models.Model):
@@ -173,11 +190,13 @@ class ImportScheme(ImportBaseModel):
         if self.status.import_defined == False:
             raise ImportSchemeNotReady(f"Import scheme {self.name} ({self.id}) has not been set up.")
 
-        table: dict = {"columns": self.data_columns(fix_ambigious_names=True),
+        plan: RowPlan = self.row_plan(fix_ambigious_names=True)
+
+        table: dict = {"columns": plan.columns,
                        "rows": []            
         }
 
-        for row in self.data_rows(columns = table["columns"], limit_count=limit_count):
+        for row in self.data_rows(plan=plan, limit_count=limit_count):
             table["rows"].append(row)
 
         return table
@@ -244,729 +263,1057 @@ class ImportScheme(ImportBaseModel):
 
         return columns
     
-    def data_rows(self, *, columns: list=None, limit_count: int=None, offset_count: int=0) -> Generator[dict[str: any], None, None]:
-        """ Yields a row for each set of models in the target importer """
-
-        # Fields holds a list of ImportSchemeItem.ids and the associated ImportSchemeFile.id and ImportSchemeFileField names
-        fields: dict[int: dict] = {}
+    def row_plan(self, *, columns: list=None, fix_ambigious_names: bool=False) -> RowPlan:
+        """ Returns the scheme's items compiled into a RowPlan.  Plans are cached until the importer, the scheme settings, an item, or a file's fields or settings change.
+        If columns are given a plan is compiled for them without caching """
 
         if columns is None:
-            columns = self.data_columns
+            key: tuple = (
+                self.id, self.importer_hash, dict_hash(self.settings), fix_ambigious_names, 
+                tuple(self.items.order_by("id").values_list("id", "updated")),
+                tuple(ImportSchemeFileField.objects.filter(import_scheme_file__import_scheme=self).order_by("id").values_list("id", "import_scheme_file_id", "name")),
+                tuple((file_id, dict_hash(file_settings)) for file_id, file_settings in self.files.order_by("id").values_list("id", "settings")),
+            )
 
-        primary_file: ImportSchemeFile = None
-        child_files: dict[int: dict] = {}
-        deferred_strategies: tuple = ("Resolver",)
+            if plan := plans.find(key=key):
+                return plan
 
-        # Set up information about the files that are not primary (child files)
-        if self.files.count() > 1:
-            primary_file = self.files.get(pk=int(self.settings["primary_file_id"]))
-            for file, value in self.settings["file_links"].items():
-                child = child_files[int(file)] = {}
-                
-                child["cache"] = LRUCacheThing(items=1000000)
-                child["object"] = self.files.get(pk=int(file))
+            plan = self.row_plan(columns=self.data_columns(fix_ambigious_names=fix_ambigious_names))
+            plans.store(key=key, value=plan)
 
-                # Create a db connection to use for loading data if the file has a db
-                child["connection"] = child["object"]._get_db_connection()
+            return plan
 
-                # Store the child and primary linked fields that the child row will be looked up by
-                import_scheme_file_field = ImportSchemeFileField.objects.get(pk=value["child"])
-                fields[import_scheme_file_field.id] = {
-                    "name": import_scheme_file_field.name,
-                    "file": import_scheme_file_field.import_scheme_file_id,
-                }
-                child["child_linked_field"] = import_scheme_file_field.name
+        file_fields: dict[int, tuple] = {
+            field_id: (file_id, name) for field_id, file_id, name in ImportSchemeFileField.objects.filter(import_scheme_file__import_scheme=self).values_list("id", "import_scheme_file_id", "name")
+        }
+        child_links: dict[int, tuple] = {}
 
-                import_scheme_file_field = ImportSchemeFileField.objects.get(pk=value["primary"])
-                fields[import_scheme_file_field.id] = {
-                    "name": import_scheme_file_field.name,
-                    "file": import_scheme_file_field.import_scheme_file_id,
-                }
-                child["primary_linked_field"] = import_scheme_file_field.name
+        if self.files.count() > 1:
+            primary_file_id: int = int(self.settings["primary_file_id"])
+
+            # Child rows are looked up by the child and primary linked fields
+            for file, value in self.settings["file_links"].items():
+                child_links[int(file)] = (file_fields[int(value["child"])][1], file_fields[int(value["primary"])][1])
         else:
-            primary_file = self.files.all()[0]
+            primary_file_id: int = self.files.all()[0].id
 
-        for row in primary_file.rows(limit_count=limit_count, offset_count=offset_count):
-            row_dict: dict = {"***row***setting***": {}}
+        file_date_formats: dict[int, dict] = {file.id: file.settings.get("date_formats", {}) for file in self.files.all()}
+        date_formats: dict[int, str] = {field_id: file_date_formats[file_id][name] for field_id, (file_id, name) in file_fields.items() if name in file_date_formats.get(file_id, {})}
 
-            # Go through columns that do not need to be deferred until after other columns are resolved
-            for column in [column for column in columns if column["import_scheme_item"].strategy not in (deferred_strategies)]:
-                strategy = column["import_scheme_item"].strategy
-                settings = column["import_scheme_item"].settings
+        return RowPlan(columns=columns, primary_file_id=primary_file_id, child_links=child_links, file_fields=file_fields, date_formats=date_formats)
 
-                col_name: str = column["column_name"]
+    def index_file_links(self) -> None:
+        """ Index the linked fields of the child files, so child rows are found without scanning the child file for each primary row.
+        It's run by execute, because indexing a large file takes too long for a request """
 
-                # Model is a key/value model, meaning that the data goes in as multiple rows instead of columns
-                if column["importer_model"].is_key_value:
-                    if strategy == "No Data":
-                        continue 
+        for file_id, link in self.settings.get("file_links", {}).items():
+            file: ImportSchemeFile = self.files.get(pk=file_id)
+            file.index_fields(fields=[file.fields.get(pk=link["child"]).name])
 
-                    row_dict[col_name] = {}
+    def data_rows(self, *, columns: list=None, limit_count: int=None, offset_count: int=0, plan: RowPlan=None, block_size: int=None, join_budget: int=None, sql_join: bool=False, featuretypes: list[str]=None, skipped: Counter=None) -> Generator[dict[str: any], None, None]:
+        """ Yields a row for each set of models in the target importer, built by the scheme's RowPlan.  If block_size is set rows are built in blocks of that size.
+        If join_budget is set child files are joined to the primary file instead of looked up for each row.  Child files that fit in join_budget MB are held in memory,
+        and one that doesn't is merged with the primary file with both read in link key order, so rows come out in that order.
+        If sql_join is True and every file has a DB the child files are attached to the primary file's DB and joined by SQLite in one query.
+        featuretypes limits the rows of a GFF primary file to features of those featuretypes, counting the others by featuretype in skipped """
 
-                    for key_value_key, key_value_value in column["import_scheme_item"].settings.items():
-                        if type(key_value_value) is dict and "key" in key_value_value:
-                            row_dict[col_name][key_value_key] = self.key_to_file_field(fields, primary_file, child_files, row, key_value_value["key"])
-                    
-                    continue
+        if plan is None:
+            plan = self.row_plan(columns=columns)
 
-                # Strategy should be deferred until the rest of the row is built
-                # if strategy in ("Resolver"):
-                #     continue
+        primary_file: ImportSchemeFile = self.files.get(pk=plan.primary_file_id)
+        context = RowContext(plan=plan, child_files={file_id: self.files.get(pk=file_id) for file_id in plan.child_links})
+        order_by: str = None
 
-                if strategy == "Raw Text":
-                    row_dict[col_name] = settings["raw_text"]
+        if sql_join and plan.child_links and all(file.settings.get("has_db", False) for file in [primary_file, *[file for file, connection in context.child_files.values()]]):
+            # Without indexes on the linked fields each join is a scan of the child file
+            self.index_file_links()
 
-                # A value loaded from a table
-                elif strategy == "Table Row":
-                    row_dict[col_name] = settings["row"]
+            yield from plan.rows(rows=primary_file.joined_rows(links=context.attach(), limit_count=limit_count, offset_count=offset_count), context=context, block_size=block_size)
+            return
 
-                elif strategy == "No Data":
-                    row_dict[col_name] = None
+        if join_budget and plan.child_links:
+            merge_file_id: int = context.join(budget=join_budget * 1024 * 1024)
 
-                # The 'regular' import of a field directly from the file
-                elif strategy == "File Field":
-                    key = settings["key"]
-                    row_dict[col_name] = self.key_to_file_field(fields, primary_file, child_files, row, key)
-                
-                elif strategy == "Select First":
-                    value: str = None
-
-                    for key in settings.get("first_keys", []):
-                        if key not in fields:
-                            import_scheme_file_field = ImportSchemeFileField.objects.get(pk=key)
-                            fields[import_scheme_file_field.id] = {
-                                "name": import_scheme_file_field.name,
-                                "file": import_scheme_file_field.import_scheme_file_id,
-                            }
+            if merge_file_id is not None and primary_file.is_staged:
+                context.merge(merge_file_id)
+                order_by = plan.child_links[merge_file_id][1]
 
-                        file = fields[key]["file"]
+        yield from plan.rows(rows=primary_file.rows(limit_count=limit_count, offset_count=offset_count, order_by=order_by, featuretypes=featuretypes, skipped=skipped), context=context, block_size=block_size)
 
-                        if file == primary_file.id:
-                            value = row.get(fields[key]["name"], None)
-                        else:
-                            child_row = child_files[file]["object"].find_row_by_key(
-                                field=child_files[file]["child_linked_field"],
-                                key=row[child_files[file]["primary_linked_field"]],
-                                connection=child_files[file]["connection"],
-                                cache=child_files[file]["cache"],
-                            )
-                            if child_row:
-                                value = child_row[fields[key]["name"]]
+    def gff_featuretypes(self, *, plan: RowPlan=None, approved_only: bool=True) -> list[str]|None:
+        """ Returns the featuretypes of a GFF primary file whose features get past the approved values of the scheme, or all of its featuretypes if approved_only is False.
+        Returns None if the primary file isn't a GFF file with the featuretypes found when it was inspected, or if approved_only is True and nothing rejects rows by featuretype """
 
-                        if value:
-                            break
-                    
-                    row_dict[col_name] = value
+        if plan is None:
+            plan = self.row_plan()
 
-                elif strategy == "Split Field":
-                    key: str = settings["split_key"]
+        primary_file: ImportSchemeFile = self.files.get(pk=plan.primary_file_id)
 
-                    if key not in fields:
-                        import_scheme_file_field = ImportSchemeFileField.objects.get(pk=key)
-                        fields[import_scheme_file_field.id] = {
-                            "name": import_scheme_file_field.name,
-                            "file": import_scheme_file_field.import_scheme_file_id,
-                        }
-                    
-                    value: str = None
-                    file = fields[key]["file"]
+        if primary_file.base_type != "gff" or "gff_summary" not in primary_file.settings:
+            return None
 
-                    if file == primary_file.id:
-                        value = row.get(fields[key]["name"], None)
+        featuretypes: list[str] = sorted(primary_file.settings["gff_summary"]["featuretypes"])
 
-                    else:
-                        child_row = child_files[file]["object"].find_row_by_key(
-                            field=child_files[file]["child_linked_field"],
-                            key=row.get(child_files[file]["primary_linked_field"]),
-                            connection=child_files[file]["connection"],
-                            #cache=child_files[file]["cache"],
-                        )
-                        if child_row:
-                            value = child_row[fields[key]["name"]]
+        if not approved_only:
+            return featuretypes
 
-                    if value and settings["splitter"] in value:
-                        row_dict[col_name] = value.split(settings["splitter"])[settings["splitter_position"]-1]
-                    else:
-                        row_dict[col_name] = value
+        if (approval := plan.primary_field_approval("featuretype")) is None:
+            return None
 
-                # Adjust data
-                if col_name in row_dict:
-                    if type(row_dict[col_name]) is str and row_dict[col_name].lower() == "null":
-                        row_dict[col_name] = None
+        return [featuretype for featuretype in featuretypes if approval(featuretype)]
 
-                    if "translate_values" in column["importer_field"].settings:
-                        if row_dict[col_name] in column["importer_field"].settings["translate_values"]:
-                            row_dict[col_name] = column["importer_field"].settings["translate_values"][row_dict[col_name]]
+    @timeit
+    def execute(self, *, ignore_status: bool=False, limit_count: int=None, offset_count: int=0, bulk_batch_size: int=None, transaction_batch_size: int=None, identity_index_budget: int=None, copy_leaf_models: bool=None, block_size: int=None, join_budget: int=None, sql_join: bool=None, workers: int=None, skip_rejected_featuretypes: bool=None, partition_featuretypes: bool=None) -> dict:
+        """ Execute the actual import and store the data.  Returns a dict with the counts of rows, rejected rows, created objects by model, and skipped features by featuretype.
+        If bulk_batch_size (or the importer setting bulk_batch_size) is set new objects are buffered and saved with bulk_create.
+        If transaction_batch_size (or the importer setting transaction_batch_size) is set rows are committed in chunks of that size, with a savepoint for each row.
+        If identity_index_budget (or the importer setting identity_index_budget) is set existing objects are looked up in memory, using up to that many MB.  It's off by default.
+        String matches in memory are exact (or lowercased for case_insensitive_compare fields), which can differ from a database collation
+        If copy_leaf_models (or the importer setting copy_leaf_models) is True buffered models that no other model points to are saved with COPY on PostgreSQL.  It needs bulk_batch_size.
+        If block_size (or the importer setting block_size) is set rows are read that many at a time and their columns are transformed with pandas.
+        If join_budget (or the importer setting join_budget) is set linked child files are joined to the primary file using up to that many MB, instead of looked up for each row.
+        If sql_join (or the importer setting sql_join) is True linked child files are joined to the primary file by SQLite, when they all have DBs.
+        If workers (or the importer setting workers) is more than 1 the rows are split into ranges that are imported by that many processes.
+        If skip_rejected_featuretypes (or the importer setting gff_skip_rejected_featuretypes) is True features of a GFF file whose featuretype would be rejected are never read.
+        They're counted as rejected rows, and in settings["skipped_featuretypes"], instead of being saved as ImportSchemeRowRejected.
+        If partition_featuretypes (or the importer setting gff_partition_featuretypes) is True the workers import one featuretype of a GFF file at a time instead of ranges of rows """
 
-                    if column["importer_field"].settings.get("force_case") == "upper" and row_dict[col_name]:
-                        row_dict[col_name] = row_dict[col_name].upper()
+        if not ignore_status and self.status.import_defined == False:
+            raise ImportSchemeNotReady(f"Import scheme {self.name} ({self.id}) has not been set up.")
+        
+        if not ignore_status and self.status.import_completed == True:
+            raise ImportSchemeNotReady(f"Import scheme {self.name} ({self.id}) has already been imported.")
+        
+        options: dict = {
+            "bulk_batch_size": bulk_batch_size,
+            "transaction_batch_size": transaction_batch_size,
+            "identity_index_budget": identity_index_budget,
+            "copy_leaf_models": copy_leaf_models,
+            "block_size": block_size,
+            "join_budget": join_budget,
+            "sql_join": sql_join,
+        }
 
-                    if column["importer_field"].settings.get("force_case") == "lower" and row_dict[col_name]:
-                        row_dict[col_name] = row_dict[col_name].lower()
+        for option, value in options.items():
+            if value is None:
+                options[option] = self.importer_object.settings.get(option)
 
-                # Check the data for rejections and store that in row_dict[***row***setting***][reject_row]
-                if column["importer_model"].settings.get("restriction") == "rejected":
-                    if "approved_values" in column["importer_field"].settings:
-                        if row_dict[col_name] not in column["importer_field"].settings.get("approved_values", []):
-                            if "reject_row" not in row_dict["***row***setting***"]:
-                                row_dict["***row***setting***"]["reject_row"] = []
-                            
-                            row_dict["***row***setting***"]["reject_row"].append({column['name']: row_dict[column['column_name']]})
+        # The GFF options are named for GFF files in the importer settings
+        if skip_rejected_featuretypes is None:
+            skip_rejected_featuretypes = self.importer_object.settings.get("gff_skip_rejected_featuretypes", False)
 
-            # Deal with columns that have been deferred
-            deferred_cache = LRUCacheThing(items=1000000)
-            resolver_classes: dict = {}
+        options["skip_rejected_featuretypes"] = skip_rejected_featuretypes
 
-            for column in [column for column in columns if column["import_scheme_item"].strategy in (deferred_strategies)]:
-                strategy = column["import_scheme_item"].strategy
-                settings = column["import_scheme_item"].settings
+        if partition_featuretypes is None:
+            partition_featuretypes = self.importer_object.settings.get("gff_partition_featuretypes", False)
 
-                # Identify the function to use
-                if strategy == "Resolver":
-                    arguments: dict = {}
-                    resolver = column["importer_field"].resolvers[settings["resolver"]]
+        if workers is None:
+            workers = self.importer_object.settings.get("workers", 1)
 
-                    # Field lookup arguments return a value from the current processed row
-                    for argument in resolver["field_lookup_arguments"]:
-                        arguments[f"field_lookup_{argument}"] = row_dict[argument]
-                    
-                    # User input arguments are looked up in the provided files.  Used to impliment a translation table
-                    for argument in resolver["user_input_arguments"]:
-                        key: str = settings["arguments"][argument["name"]]["key"]
-                        arguments[f"user_input_{argument['name']}"] = self.key_to_file_field(fields, primary_file, child_files, row, key)
+        self.index_file_links()
 
-                    function: Callable = None
-                    
-                    if "function" in resolver:
-                        function = resolver["function"]
-                    
-                    elif resolver["class"]:
-                        if resolver["full_name"] not in resolver_classes:
-                            resolver_classes[resolver["full_name"]] = resolver["class"]()
+        counts: Counter = None
 
-                        function = resolver_classes[resolver["full_name"]]
+        if workers and workers > 1:
+            counts = self._execute_parallel(workers=workers, limit_count=limit_count, offset_count=offset_count, options=options, partition_featuretypes=partition_featuretypes)
 
-                    # If the function throws an error, reject the row
-                    try:
-                        if column["importer_field"].settings.get("cacheable", True):
-                            if not (field_value := deferred_cache.find(key=dict_hash(arguments))):
-                                field_value = function(**arguments)
-                                deferred_cache.store(key=dict_hash(arguments), value=field_value)
-                        else:
-                            field_value = function(**arguments)
-                    
-                    except Exception as err:
-                        log.warn(err)
-                        field_value = None
+        if counts is None:
+            counts = self._execute_range(limit_count=limit_count, offset_count=offset_count, **options)
 
-                        if "reject_row" not in row_dict["***row***setting***"]:
-                                row_dict["***row***setting***"]["reject_row"] = []
+        skipped: dict[str, int] = dict(sorted((key[1], value) for key, value in counts.items() if type(key) is tuple and key[0] == "skipped"))
 
-                        row_dict["***row***setting***"]["reject_row"].append({column['name']: f"Function error: {err}"})
+        if skipped:
+            self.settings["skipped_featuretypes"] = skipped
+            self.save(update_fields=["settings"])
 
-                    row_dict[column["column_name"]] = field_value
+        if after_import_callable := settings.ML_IMPORT_WIZARD.get("Call_After_Import", None):
+            import_string(after_import_callable)()
 
-            # Step through columns and clean the data
-            for column in columns:
-                if not column['importer_model'].is_key_value:
-                    row_dict[column["column_name"]] = column["importer_field"].clean_data(row_dict[column["column_name"]])
+        return {
+            "rows": counts["rows"],
+            "rejected": counts["rejected"],
+            "created": {key[1]: value for key, value in counts.items() if type(key) is tuple and key[0] == "created"},
+            "skipped": skipped,
+        }
 
-            yield row_dict
+    def _execute_range(self, *, limit_count: int=None, offset_count: int=0, bulk_batch_size: int=None, transaction_batch_size: int=None, identity_index_budget: int=None, copy_leaf_models: bool=False, block_size: int=None, join_budget: int=None, sql_join: bool=False, skip_rejected_featuretypes: bool=False, featuretypes: list[str]=None, lock_identities: bool=False) -> Counter:
+        """ Import a range of rows.  Returns a Counter of rows, rejected rows, ("created", model name) for created objects, and ("skipped", featuretype) for skipped features.
+        If lock_identities is True new objects are created under an advisory lock, so other processes importing the same scheme can't create them too.
+        featuretypes imports only the features of those featuretypes of a GFF file, without counting the others, for featuretype partitions """
 
-    def key_to_file_field(self, fields: dict, primary_file, child_files, row, key):
-        """ Gets values out of the files
-        Result of automatic extraction.  Need to get rid of the side effect of storing things in the fields variable """
+        cache_thing = LRUCacheThing(items=1000000)
+        counts: Counter = Counter()
 
-        field: str = ""
+        writer: BulkWriter = None
+        identity_index: IdentityIndex = None
 
-        if key not in fields:
-            import_scheme_file_field = ImportSchemeFileField.objects.get(pk=key)
+        if identity_index_budget:
+            identity_index = IdentityIndex(budget=identity_index_budget)
 
-            fields[import_scheme_file_field.id] = {
-                            "name": import_scheme_file_field.name,
-                            "file": import_scheme_file_field.import_scheme_file_id,
-                        }
+            for model in [model for app in self.importer_object.apps for model in app.models_by_import_order]:
+                if not model.is_key_value and not model.instance_finder:
+                    identity_index.load(model=model)
 
-        file = fields[key]["file"]
-                    
-        if file == primary_file.id:
-            if type(row) is dict:
-                field = row.get(fields[key]["name"])
-            else:
-                field = row[fields[key]["name"]]
-        else:
-            if type(row) is sqlite3.Row:
-                field_key = row[child_files[file]["primary_linked_field"]]
-            else:
-                field_key=row.get(child_files[file]["primary_linked_field"])
+        importer_models: list[ImporterModel] = [model for app in self.importer_object.apps for model in app.models_by_import_order]
+        signatures: ContentSignatures = None
 
-            child_row = child_files[file]["object"].find_row_by_key(
-                            field=child_files[file]["child_linked_field"],
-                            key=field_key,
-                            connection=child_files[file]["connection"],
-                        )
-            
-            if child_row:
-                if type(child_row) is dict:
-                    field = child_row.get(fields[key]["name"])
-                else:
-                    field = child_row[fields[key]["name"]]
+        if any(model.settings.get("content_signature") for model in importer_models):
+            signatures = ContentSignatures(models=importer_models)
 
-        return field
+        if bulk_batch_size:
+            writer = BulkWriter(models=[model for app in self.importer_object.apps for model in app.models_by_import_order], batch_size=bulk_batch_size, copy_leaf_models=bool(copy_leaf_models))
+        
+        # Without a transaction size buffered objects are committed with each bulk batch
+        chunk_size: int = transaction_batch_size or bulk_batch_size or 1
+        skipped: Counter = None
 
-    @timeit
-    def execute(self, *, ignore_status: bool=False, limit_count: int=None, offset_count: int=0) -> None:
-        """ Execute the actual import and store the data """
+        if featuretypes is None and skip_rejected_featuretypes and (featuretypes := self.gff_featuretypes()) is not None:
+            skipped = Counter()
 
-        if not ignore_status and self.status.import_defined == False:
-            raise ImportSchemeNotReady(f"Import scheme {self.name} ({self.id}) has not been set up.")
-        
-        if not ignore_status and self.status.import_completed == True:
-            raise ImportSchemeNotReady(f"Import scheme {self.name} ({self.id}) has already been imported.")
-        
-        cache_thing = LRUCacheThing(items=1000000)
-        columns = self.data_columns()
-        
-        row_count = 1
-        for row in self.data_rows(columns=columns, limit_count=limit_count, offset_count=offset_count):
+        rows = self.data_rows(limit_count=limit_count, offset_count=offset_count, block_size=block_size, join_budget=join_budget, sql_join=bool(sql_join), featuretypes=featuretypes, skipped=skipped)
 
-            if not offset_count: offset_count = 0
+        while chunk := list(islice(rows, chunk_size)):
+            self._execute_chunk(rows=chunk, cache_thing=cache_thing, counts=counts, writer=writer, identity_index=identity_index, signatures=signatures, lock_identities=lock_identities)
 
-            # skip the row and store it in an ImportSchemeRejectedRow if it's rejected
-            if deep_exists(dictionary=row, keys=["***row***setting***", "reject_row"]):
-                ImportSchemeRowRejected(import_scheme=self, errors=row["***row***setting***"]["reject_row"], row=row).save()
-                continue
+        # Skipped features would all have been rejected, so they're counted as rejected rows without being read
+        for featuretype, count in (skipped or {}).items():
+            counts["rows"] += count
+            counts["rejected"] += count
+            counts[("skipped", featuretype)] += count
 
-            # Use a transaction so each source row gets saved or not
-            try:
-                with transaction.atomic():
-                    # Commit cache_thing changes if the transaction commits
-                    transaction.on_commit(cache_thing.commit)
+        return counts
 
-                    for app in importers[self.importer].apps:
-                        # working_objects holds the objects (model instances) for this particular row
-                        working_objects: dict[str: dict[str: any]] = {}
-
-                        for model in app.models_by_import_order:
-
-                            if model.is_key_value:
-
-                                for key, value in [(key, value) for key, value in row.get(f"{model.name} (key-value)", {}).items() if value and value != "NULL"]:
-                                    # working_attributes holds the attributes (field/value pairs) needed to save the current key/value model
-                                    working_attributes: dict = {}
-
-                                    for field in model.fields:
-                                        if field.is_foreign_key:
-                                            if field.field.related_model.__name__ in working_objects:
-                                                working_attributes[field.name] = working_objects[field.field.related_model.__name__]
-
-                                            else:
-                                                working_attributes[field.name] = None
-
-                                        elif field.is_key_field:
-                                            working_attributes[field.name] = key
-                                        
-                                        elif field.is_value_field:
-                                            working_attributes[field.name] = value
-                                    
-                                    try:
-                                        model.model.objects.get(**working_attributes)
-                                    except:
-                                        model.model(**working_attributes).save()
-
-                                continue
-
-                            if model.instance_finder:
-                                # Look up the model using the instance_finder if it's available
-                                
-                                instance: object = None
-                                arguments: dict = {f"field_lookup_{argument}": row.get(argument) for argument in model.instance_finder["field_lookup_arguments"]}
-                                
-                                if "class" in model.instance_finder:
-                                    instance = model.instance_finder["class"].__call__(**arguments)
-
-                                elif "function" in model.instance_finder:
-                                    if instance := model.instance_finder["function"](**arguments):
-                                        working_objects[model.name] = instance
-                            
-                            # working_attributes holds the attributes (field/value pairs) needed to build the current model
-                            working_attributes: dict = {}
-                            
-                            superbreak: bool = False    # Needed to break out of both for loops
-                            is_empty: bool = True       # Keeps track of whether the model has data other than foreign keys in it
-
-                            # Step through fields and fill working_attributes
-                            for field in model.fields:
-                                field_value: any = row.get(field.column_name)
-                                
-                                # If the field_value isn't blank and the field is an integer field, convert the value to an integer
-                                if field_value and field.field.get_internal_type() == "IntegerField" and not isinstance(field_value, int):
-                                    field_value = int(float(field_value))
-
-                                if field.is_foreign_key:
-                                    if "foreign_model_lookup" in field.settings:
-                                        temp_object: any = cache_thing.find(key=(model.name, field.foreign_model_lookup_field, field_value), report=False)
-
-                                        if not temp_object:
-                                            temp_object = field.foreign_model_lookup_instance(field_value)
-                                            cache_thing.store(key=(model.name, field.foreign_model_lookup_field, field_value), value=temp_object)
-
-                                        if temp_object:
-                                            working_attributes[field.name] = temp_object
-
-                                    else:
-                                        if field.field.related_model.__name__ in working_objects:
-                                            working_attributes[field.name] = working_objects[field.field.related_model.__name__]
-
-                                        else:
-                                            working_attributes[field.name] = None
-                                else:
-                                    working_attributes[field.name] = field_value
-                                    if working_attributes[field.name] is not None:
-                                        is_empty = False
+    def _execute_parallel(self, *, workers: int, limit_count: int=None, offset_count: int=0, options: dict, partition_featuretypes: bool=False) -> Counter|None:
+        """ Split the rows into a range for each worker, or a partition for each featuretype of a GFF file if partition_featuretypes is True, and import them in separate processes.
+        Returns the merged counts, or None if the import can't be run in parallel """
 
-                            # Load instances per their unique fields until we run out of unique fields or an object is returned.
-                            unique_sets: list[tuple] = list(model.model._meta.__dict__.get("unique_together"))
-                            unique_sets = unique_sets + [(field.name,) for field in model.fields if field.field.unique and not field.is_foreign_key]
-                            
-                            # minimum_objects models treat all fields together as unique so we don't end up with duplicates
-                            if "minimum_objects" not in model.settings or model.settings["minimum_objects"]:
-                                full_unique_set: list = [field.name for field in model.fields] # if not field.is_foreign_key
-                                full_unique_set.append("***Key_Value_Models***")
-
-                                unique_sets.append(tuple(full_unique_set))
-
-                            # Skip if there is a function for getting the instance
-                            if not model.settings.get("instance_finder"):
-                                
-                                for unique_set in unique_sets:
-                                    
-                                    test_attributes: dict[str, any] = {}
-                                    test_attributes_string: str = ""
-                                    key_value_attributes: dict[str, dict[str, any]] = {}
-
-                                    if "***Key_Value_Models***" in unique_set:
-                                        for key_value_model in model.key_value_children:
-                                            key_value_attributes[key_value_model.name] = {key: value for key, value in row.get(f"{key_value_model.name} (key-value)", {}).items() if value and value != "NULL"}
-                                            test_attributes_string += f"|{key_value_model.name}:{dict_hash(key_value_attributes[key_value_model.name])}|"
-
-                                    for unique_field in [unique_field for unique_field in unique_set if unique_field in working_attributes]:
-                                        # Use case insensitive test if case_insensitive_compare is true
-                                        
-                                        if model.fields_by_name[unique_field].settings.get("case_insensitive_compare") == True:
-                                            test_attributes[f"{getattr(unique_field, 'name', unique_field)}__iexact"] = working_attributes[unique_field]
-                                        else:
-                                            test_attributes[getattr(unique_field, "name", unique_field)] = working_attributes[unique_field]
-
-                                        test_attributes_string += f"|{unique_field}:{working_attributes[unique_field]}|"
-                                    
-                                    if "find_instance" in model.settings.get("debug", []):
-                                        log.debug(f"{model.name}: Test attributes: {test_attributes}")
-                                        log.debug(f"{model.name}: Test attributes string: {test_attributes_string}")
-
-                                    temp_object: any = cache_thing.find(key=(model.name, test_attributes_string), report=False)
-
-                                    if temp_object:
-                                        if "find_instance" in model.settings.get("debug", []):
-                                            log.debug(f"{model.name}: Found object in cache")
-
-                                        working_objects[model.name] = temp_object
-                                    
-                                    if model.name not in working_objects or not working_objects[model.name]:
-                                        temp_object = model.model.objects.filter(**test_attributes)
-
-                                        # For key/value models we need to annotate the queryset with the key/values
-                                        if key_value_attributes:
-                                            for key_value_model in model.key_value_children:
-                                                temp_object = temp_object.annotate(key_value_count=Count(key_value_model.table)).filter(key_value_count=len(key_value_attributes[key_value_model.name]))
-                                                
-                                                for key, value in key_value_attributes[key_value_model.name].items():
-                                                    attributes: dict = {
-                                                        f"{key_value_model.table}__{key_value_model.settings['key_field']}": key,
-                                                        f"{key_value_model.table}__{key_value_model.settings['value_field']}": value,
-                                                    }
-                                                
-                                                    temp_object = temp_object.filter(**attributes)
-
-                                        temp_object = temp_object.first()
-
-                                        if temp_object:
-                                            if "find_instance" in model.settings.get("debug", []):
-                                                log.debug(f"{model.name}: Found object in database")
-
-                                            working_objects[model.name] = temp_object
-                                            cache_thing.store(key=(model.name, test_attributes_string), value=working_objects[model.name], transaction=True)
-                                        
-                                    if model.name in working_objects:
-                                        continue
-                        
-                            # Ensure that if the data for a field is None that the field is nullable
-                            if model.name not in working_objects:
-                                for field in model.fields:
-                                    if field.name not in working_attributes or working_attributes[field.name] is None and field.not_nullable:
-                                        working_objects[model.name] = None
-
-                                        if model.settings.get("critical"):
-                                            raise IntegrityError(f"Critical model is invalid: Model: {model.name}, Field: {field.name} is null")
-                                        
-                                        superbreak = True
-                                        break
-                            
-                            if superbreak: 
-                                continue
-
-                            if "suppress_on_empty" in model.settings and is_empty:
-                                working_objects[model.name] = None
-
-                            # If the model is not in working_objects save it to the database, add it to working_objects, and cache it
-                            if model.name not in working_objects:
-                                if "create_instance" in model.settings.get("debug", []):
-                                    log.debug(f"{model.name}: Saving object to database: {working_attributes}")
-
-                                working_objects[model.name] = model.model.objects.create(**working_attributes)
-                                
-                                # If this is a deferred model save an ImportSchemeDeferredRows
-                                if model.settings.get("restriction") == "deferred":
-
-                                    if type(working_objects[model.name].pk) is int:
-                                        ImportSchemeRowDeferred(import_scheme = self,
-                                                                model = model.name,
-                                                                pkey_name = working_objects[model.name]._meta.pk.name,
-                                                                pkey_int = working_objects[model.name].pk,
-                                        ).save()
-
-                                    elif type(working_objects[model.name].pk) is str:
-                                        ImportSchemeRowDeferred(import_scheme = self,
-                                                                model = model.name,
-                                                                pkey_name = working_objects[model.name].pk.name,
-                                                                pkey_str = working_objects[model.name].pk,
-                                        ).save()
-            
-            except IntegrityError as err:
-                # Roll back cache_thing changes if the transaction is rolled back
-                log.warn(err)
-                cache_thing.rollback()
-                ImportSchemeRowRejected(import_scheme=self, errors=str(err), row=row).save()
+        if transaction.get_connection().vendor != "postgresql":
+            log.warn(f"Import scheme {self.name} ({self.id}): parallel imports need PostgreSQL advisory locks, importing in one process")
+            return None
 
-            row_count += 1
+        if partition_featuretypes:
+            if limit_count or offset_count:
+                log.warn(f"Import scheme {self.name} ({self.id}): featuretype partitions are only made for whole files, splitting the rows into ranges")
+            elif (counts := self._execute_featuretypes(workers=workers, options=options)) is not None:
+                return counts
+            else:
+                log.warn(f"Import scheme {self.name} ({self.id}): the primary file doesn't have inspected featuretypes, splitting the rows into ranges")
 
-        if after_import_callable := settings.ML_IMPORT_WIZARD.get("Call_After_Import", None):
-            import_string(after_import_callable)()
+        primary_file: ImportSchemeFile = self.files.get(pk=int(self.settings["primary_file_id"])) if self.files.count() > 1 else self.files.all()[0]
+        row_count: int = primary_file.row_count if primary_file.is_staged or primary_file.has_gff_db else None
 
-    def description_object(self) -> str:
-        """ Returns a dict that describes the import in human readable terms """
+        if not row_count:
+            log.warn(f"Import scheme {self.name} ({self.id}): the primary file can't be split into ranges, importing in one process")
+            return None
 
-        description: dict = {
-            "files": {"secondary": {}},
-            "color_keys": {},
-            "models": []
-        }
+        offset_count = offset_count or 0
+        row_count = max(row_count - offset_count, 0)
 
-        files = description["files"]
-        models = description["models"]
+        if limit_count:
+            row_count = min(row_count, limit_count)
 
-        primary_file = self.files.get(pk=self.settings["primary_file_id"])
-        files["primary"] = primary_file.name
-        
-        color_key = 1
-        for file_id, link in self.settings.get("file_links", {}).items():
-            description["color_keys"][file_id] = color_key
-            file = self.files.get(pk=file_id) 
+        if row_count == 0:
+            return Counter()
 
-            file_object = files["secondary"][file.name] = {}
-            file_object["color_key"] = color_key
-            file_object["secondary_field"] = file.fields.get(pk=link['child']).name
-            file_object["primary_field"] = primary_file.fields.get(pk=link['primary']).name
+        ranges: list[tuple[int, int]] = self._row_ranges(row_count=row_count, offset_count=offset_count, parts=workers)
 
-            color_key += 1
+        # Forked workers must not share the parent's database connections, so they open their own
+        connections.close_all()
 
-        for app in self.importer_object.apps:
-            for model in app.models:
-                model_object = {
-                    "name": model.fancy_name,
-                    "items": []
-                }
+        counts: Counter = Counter()
 
-                for item in self.items.filter(app=app.name, model=model.name):
-                    value: str = ""
-                    value_class: str = ""
-                    strategy_class: str = ""
-                    key_values: dict = {}
+        with ProcessPoolExecutor(max_workers=len(ranges), mp_context=multiprocessing.get_context("fork")) as pool:
+            futures = [pool.submit(execute_range, import_scheme_id=self.id, offset_count=start, limit_count=size, options=options) for start, size in ranges]
 
-                    if item.strategy == "No Data":
-                        strategy_class = "no_data"
+            for future in as_completed(futures):
+                counts.update(future.result())
 
-                    elif item.strategy == "Raw Text":
-                        value = item.settings["raw_text"]
-                        value_class = "value"
+        return counts
 
-                    elif item.strategy == "Table Row":
-                        value = item.settings["row"]
-                        value_class = "value"
+    @staticmethod
+    def _row_ranges(*, row_count: int, offset_count: int, parts: int) -> list[tuple[int, int]]:
+        """ Split row_count rows starting at offset_count into up to parts (offset, count) ranges of nearly the same size """
 
-                    elif item.strategy == "File Field":
-                        file_field: ImportSchemeFileField = ImportSchemeFileField.objects.get(pk=item.settings["key"])
-                        #value = f"{file_field.import_scheme_file.name}: {file_field.name}"
-                        value = file_field.name
-                        
-                        if file_field.import_scheme_file.name == files["primary"]:
-                            value_class = "primary_file"
-                        else:
-                            value_class = f"secondary_file_{files['secondary'][file_field.import_scheme_file.name]['color_key']}"
+        range_size: int = -(-row_count // parts)
+        return [(start, min(range_size, offset_count + row_count - start)) for start in range(offset_count, offset_count + row_count, range_size)]
 
-                    elif item.strategy == "Key Value":
-                        for field_key, field_value in item.settings.items():
-                            file_field: ImportSchemeFileField = ImportSchemeFileField.objects.get(pk=field_value["key"])
+    def _execute_featuretypes(self, *, workers: int, options: dict) -> Counter|None:
+        """ Import each featuretype of a GFF primary file in its own partition, with up to workers processes, largest featuretype first.
+        Returns the merged counts, or None if the file doesn't have the featuretypes found when it was inspected """
 
-                            value_class: str = ""
+        plan: RowPlan = self.row_plan()
 
-                            if file_field.import_scheme_file.name == files["primary"]:
-                                value_class = "primary_file"
-                            else:
-                                value_class = f"secondary_file_{files['secondary'][file_field.import_scheme_file.name]['color_key']}"
+        if (featuretypes := self.gff_featuretypes(plan=plan, approved_only=False)) is None:
+            return None
 
-                            key_values[field_key] = {
-                                "value": file_field.name,
-                                "value_class": value_class,
-                            }
+        featuretype_counts: dict[str, int] = self.files.get(pk=plan.primary_file_id).settings["gff_summary"]["featuretypes"]
+        counts: Counter = Counter()
 
-                    model_object["items"].append({
-                        "field": item.field,
-                        "strategy": item.strategy,
-                        "strategy_class": strategy_class,
-                        "value": value,
-                        "value_class": value_class,
-                        "key_values": key_values
-                    })
+        # Rejected featuretypes are counted from the inspection instead of being given a partition
+        if options.get("skip_rejected_featuretypes") and (approved := self.gff_featuretypes(plan=plan)) is not None:
+            for featuretype in set(featuretypes) - set(approved):
+                counts["rows"] += featuretype_counts[featuretype]
+                counts["rejected"] += featuretype_counts[featuretype]
+                counts[("skipped", featuretype)] += featuretype_counts[featuretype]
 
-                models.append(model_object)
+            featuretypes = approved
 
-        return description
-    
-    def process_start(self) -> None:
-        """ Mark the process started """
+        if not featuretypes:
+            return counts
 
-        self.set_status_by_name("Import Started")
-        self.process_pid = os.getpid()
-        self.process_created_time = psutil.Process(self.process_pid).create_time()
-        self.save()
+        # Forked workers must not share the parent's database connections, so they open their own
+        connections.close_all()
 
-    def process_complete(self) -> None:
-        """ Mark the process completed """
+        with ProcessPoolExecutor(max_workers=min(workers, len(featuretypes)), mp_context=multiprocessing.get_context("fork")) as pool:
+            futures = [
+                pool.submit(execute_range, import_scheme_id=self.id, offset_count=0, limit_count=None, options=options, featuretypes=[featuretype])
+                for featuretype in sorted(featuretypes, key=lambda featuretype: featuretype_counts[featuretype], reverse=True)
+            ]
 
-        self.set_status_by_name("Import Completed")
-        self.process_pid = None
-        self.process_created_time = None
-        self.save()
+            for future in as_completed(futures):
+                counts.update(future.result())
 
-    def process_fail(self) -> None:
-        """ Mark the process failed """
+        return counts
 
-        self.set_status_by_name("Import Failed")
-        self.process_pid = None
-        self.process_created_time = None
-        self.save()
+    def _execute_chunk(self, *, rows: list[dict], cache_thing: LRUCacheThing, counts: Counter, writer: BulkWriter=None, identity_index: IdentityIndex=None, signatures: ContentSignatures=None, lock_identities: bool=False) -> None:
+        """ Save the objects for a chunk of rows in one transaction, with a savepoint for each row so bad rows are rejected on their own.
+        If the chunk can't be committed, or an identity it needs is locked by another worker, it is rolled back and its rows are imported one transaction at a time """
 
-    def process_run(self) -> None:
-        """ Run the process """
+        if len(rows) == 1 and not writer:
+            self._execute_row_in_transaction(row=rows[0], cache_thing=cache_thing, counts=counts, identity_index=identity_index, signatures=signatures, lock_identities=lock_identities)
+            return
 
-        self.process_start()
-        self.execute()
-        self.process_complete()
+        # Counts for the chunk only go into counts if the chunk is committed
+        chunk_counts: Counter = Counter()
 
-    def process_check_health(self) -> bool:
-        """ Check the health of the process """
+        try:
+            with transaction.atomic():
+                # Commit cache_thing changes if the transaction commits
+                transaction.on_commit(cache_thing.commit)
 
-        healthy: bool = True
+                buffered_rows: int = 0
 
-        if not self.status.import_started:
-            healthy = True
+                for row in rows:
+                    chunk_counts["rows"] += 1
 
-        elif not psutil.pid_exists(self.process_pid):
-            healthy = False
+                    if self._reject_row(row=row):
+                        chunk_counts["rejected"] += 1
+                        continue
 
-        else:
-            process = psutil.Process(self.process_pid)
+                    self._execute_row_in_savepoint(row=row, cache_thing=cache_thing, counts=chunk_counts, writer=writer, identity_index=identity_index, signatures=signatures, lock_identities=lock_identities, wait_for_locks=False)
 
-            if process.create_time() != self.process_created_time:
-                healthy = False
+                    if writer:
+                        buffered_rows += 1
 
-        if not healthy:
-            self.process_fail()
+                        if buffered_rows >= writer.batch_size:
+                            self._flush_writer(writer=writer, counts=chunk_counts, identity_index=identity_index, signatures=signatures)
+                            buffered_rows = 0
 
-        return healthy
+                if writer:
+                    self._flush_writer(writer=writer, counts=chunk_counts, identity_index=identity_index, signatures=signatures)
 
-class ImportSchemeFileStatus(ImportBaseModel):
-    """ Holds statuses for ImportSchemeFiles """
+            counts.update(chunk_counts)
 
-    name = models.CharField(max_length=255)
-    uploaded = models.BooleanField(default=False)
-    preinspected = models.BooleanField(default=False)
-    inspecting = models.BooleanField(default=False)
-    inspected = models.BooleanField(default=False)
-    importing = models.BooleanField(default=False)
-    imported = models.BooleanField(default=False)
+        except (IntegrityError, OperationalError, IdentityLockBusy) as err:
+            # Roll back cache_thing changes if the transaction is rolled back.  OperationalError covers deadlocks between parallel workers
+            log.warn(f"Saving chunk failed, importing {len(rows)} rows one at a time: {err}")
+            cache_thing.rollback()
 
+            if writer:
+                writer.clear()
 
-class ImportSchemeFile(ImportBaseModel):
-    ''' Holds a file to import for an ImportScheme. '''
+            for row in rows:
+                self._execute_row_in_transaction(row=row, cache_thing=cache_thing, counts=counts, identity_index=identity_index, signatures=signatures, lock_identities=lock_identities)
 
-    name = models.CharField(max_length=255, null=False, blank=False)
-    import_scheme = models.ForeignKey(ImportScheme, on_delete=models.CASCADE, related_name='files', editable=False)
-    type = models.CharField(max_length=255)
-    status = models.ForeignKey(ImportSchemeFileStatus, on_delete=models.DO_NOTHING, default=1, related_name="files")
-    settings = models.JSONField(default=dict)
+    def _reject_row(self, *, row: dict) -> bool:
+        """ Store the row in an ImportSchemeRowRejected if data_rows rejected it.  Returns True if the row was rejected """
 
-    @property
-    def file_name(self) -> str:
-        ''' Return a file name based on the ID of the ImportFile '''
+        if deep_exists(dictionary=row, keys=["***row***setting***", "reject_row"]):
+            ImportSchemeRowRejected(import_scheme=self, errors=row["***row***setting***"]["reject_row"], row=row).save()
+            return True
 
-        return str(self.id).rjust(8, '0')
-    
-    @property
-    def row_count(self) -> int:
-        """ Count the lines of the file """
+        return False
 
-        if self.base_type in ["text", "excel"]:
-            if self.settings.get("has_db", False):
-                return sqlite3.connect(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db").execute("SELECT COUNT(*) FROM data").fetchone()[0]
-            else:
-                data_frame: pd.DataFrame = self._get_file_as_dataframe()
-                return len(data_frame.index)
-    
-    @property
-    def base_type(self) -> str:
-        """ Returns the base type of the file: text or gff """
+    def _execute_row_in_transaction(self, *, row: dict, cache_thing: LRUCacheThing, counts: Counter, identity_index: IdentityIndex=None, signatures: ContentSignatures=None, lock_identities: bool=False) -> None:
+        """ Save the objects for one row in its own transaction, rejecting the row if it fails """
 
-        if self.type.lower() in  ("gff", "gff3"):
-            return "gff"
-        elif self.type.lower() in ("tsv", "csv"):
-            return "text"
-        elif self.type.lower() in ("xlsx", "xls"):
-            return "excel"
-    
-    @property
-    def ready_to_inspect(self) -> bool:
-        """ Returns true if the file is ready to preinspect """
+        counts["rows"] += 1
 
-        if self.base_type == "gff":
-            return False
-            
-        if self.base_type == "text":
+        # skip the row and store it in an ImportSchemeRejectedRow if it's rejected
+        if self._reject_row(row=row):
+            counts["rejected"] += 1
+            return
+
+        attempts: int = 0
+
+        # Use a transaction so each source row gets saved or not
+        while True:
             try:
-                self._confirm_file_is_ready(preinspected=False, inspected=False)
-            except:
-                return False
-            
-            if self.settings.get("first_row_header", None) is None:
-                return False
+                with transaction.atomic():
+                    # Commit cache_thing changes if the transaction commits
+                    transaction.on_commit(cache_thing.commit)
 
-        return True
+                    created: Counter = self._execute_row(row=row, cache_thing=cache_thing, identity_index=identity_index, signatures=signatures, lock_identities=lock_identities)
+
+                counts.update(created)
+                return
+
+            except (IntegrityError, OperationalError) as err:
+                # Roll back cache_thing changes if the transaction is rolled back
+                cache_thing.rollback()
+                attempts += 1
+
+                # OperationalError covers deadlocks and serialization failures between parallel workers, which can work when they're tried again
+                if isinstance(err, OperationalError) and attempts <= settings.ML_IMPORT_WIZARD.get("Row_Retries", 3):
+                    log.warn(f"Retrying row, attempt {attempts + 1}: {err}")
+                    continue
+
+                log.warn(err)
+                ImportSchemeRowRejected(import_scheme=self, errors=str(err), row=row).save()
+                counts["rejected"] += 1
+                return
+
+    def _execute_row_in_savepoint(self, *, row: dict, cache_thing: LRUCacheThing, counts: Counter, writer: BulkWriter=None, identity_index: IdentityIndex=None, signatures: ContentSignatures=None, lock_identities: bool=False, wait_for_locks: bool=True) -> None:
+        """ Save (or buffer) the objects for one row inside an enclosing transaction, rolling back only this row if it fails.
+        A row that fails with an OperationalError is tried again Row_Retries times in its savepoint, then the error is passed on so the enclosing transaction is rolled back
+        and its rows are imported one transaction at a time.  IdentityLockBusy is passed on so the enclosing transaction can give up its locks """
+
+        attempts: int = 0
+
+        while True:
+            cache_thing.savepoint()
+
+            if writer:
+                writer.start_row()
+
+            try:
+                if writer:
+                    # Rows going to the writer don't write to the database, so they don't need a database savepoint
+                    created: Counter = self._execute_row(row=row, cache_thing=cache_thing, writer=writer, identity_index=identity_index, signatures=signatures, lock_identities=lock_identities, wait_for_locks=wait_for_locks)
+                else:
+                    with transaction.atomic():
+                        created: Counter = self._execute_row(row=row, cache_thing=cache_thing, identity_index=identity_index, signatures=signatures, lock_identities=lock_identities, wait_for_locks=wait_for_locks)
+
+                cache_thing.savepoint_commit()
+                counts.update(created)
+                return
+
+            except (IntegrityError, OperationalError) as err:
+                cache_thing.savepoint_rollback()
+
+                if writer:
+                    writer.discard_row()
+
+                attempts += 1
+
+                if isinstance(err, OperationalError):
+                    # Without a database savepoint a failed query leaves the enclosing transaction unusable, so the row can't be tried again in it
+                    if not writer and attempts <= settings.ML_IMPORT_WIZARD.get("Row_Retries", 3):
+                        log.warn(f"Retrying row, attempt {attempts + 1}: {err}")
+                        continue
+
+                    raise
+
+                log.warn(err)
+                ImportSchemeRowRejected(import_scheme=self, errors=str(err), row=row).save()
+                counts["rejected"] += 1
+                return
+
+    def _flush_writer(self, *, writer: BulkWriter, counts: Counter, identity_index: IdentityIndex=None, signatures: ContentSignatures=None) -> None:
+        """ Save the objects buffered in the writer.  Should be run inside a transaction """
+
+        for model, instances in writer.flush().items():
+            counts[("created", model.name)] += len(instances)
+
+            if signatures is not None:
+                signatures.add(model=model, instances=instances)
+
+            if model.settings.get("restriction") == "deferred":
+                for instance in instances:
+                    self._defer_instance(model=model, instance=instance)
+
+            if identity_index:
+                if any(instance.pk is None for instance in instances):
+                    # Copied instances have no pks to index, so the model has to be looked up in the database from now on
+                    identity_index.drop(model=model)
+                else:
+                    transaction.on_commit(partial(self._index_instances, identity_index=identity_index, model=model, instances=instances))
+
+    @staticmethod
+    def _index_instances(*, identity_index: IdentityIndex, model: ImporterModel, instances: list) -> None:
+        """ Add saved instances to the identity index """
+
+        for instance in instances:
+            identity_index.add(model=model, instance=instance)
+
+    def _defer_instance(self, *, model: ImporterModel, instance: models.Model) -> None:
+        """ Save an ImportSchemeRowDeferred for an instance of a deferred model """
+
+        if type(instance.pk) is int:
+            ImportSchemeRowDeferred(import_scheme = self,
+                                    model = model.name,
+                                    pkey_name = instance._meta.pk.name,
+                                    pkey_int = instance.pk,
+            ).save()
+
+        elif type(instance.pk) is str:
+            ImportSchemeRowDeferred(import_scheme = self,
+                                    model = model.name,
+                                    pkey_name = instance._meta.pk.name,
+                                    pkey_str = instance.pk,
+            ).save()
+
+    def _execute_row(self, *, row: dict, cache_thing: LRUCacheThing, writer: BulkWriter=None, identity_index: IdentityIndex=None, signatures: ContentSignatures=None, lock_identities: bool=False, wait_for_locks: bool=True) -> Counter:
+        """ Find or create the objects for one row.  Returns a Counter of ("created", model name) for objects saved to the database.
+        If there is a writer new objects are buffered in it instead of being saved.
+        If there is an identity_index it is used instead of querying for models it holds.
+        If there are signatures models with the content_signature setting are matched on all their fields by signature.
+        If lock_identities is True new objects are locked and looked for again before they are created.
+        If wait_for_locks is False IdentityLockBusy is raised instead of waiting for a lock held by another worker """
+
+        created: Counter = Counter()
+
+        for app in importers[self.importer].apps:
+            # working_objects holds the objects (model instances) for this particular row
+            working_objects: dict[str: dict[str: any]] = {}
+
+            for model in app.models_by_import_order:
+
+                if model.is_key_value:
+                    key_values: list[tuple] = [(key, value) for key, value in row.get(f"{model.name} (key-value)", {}).items() if value and value != "NULL"]
+
+                    # One lock covers all the key/values of the parent, so they can be taken in the same order by every worker
+                    if lock_identities and key_values:
+                        self._lock_identities(keys=[(model.name, *[identity_value(working_objects.get(field.field.related_model.__name__)) for field in model.fields if field.is_foreign_key])], wait=wait_for_locks)
+
+                    instances: list = []
+
+                    for key, value in key_values:
+                        # working_attributes holds the attributes (field/value pairs) needed to save the current key/value model
+                        working_attributes: dict = {}
+
+                        for field in model.fields:
+                            if field.is_foreign_key:
+                                if field.field.related_model.__name__ in working_objects:
+                                    working_attributes[field.name] = working_objects[field.field.related_model.__name__]
+
+                                else:
+                                    working_attributes[field.name] = None
+
+                            elif field.is_key_field:
+                                working_attributes[field.name] = key
+                            
+                            elif field.is_value_field:
+                                working_attributes[field.name] = value
+                        
+                        # The writer drops key/values that are already in the database when it's flushed
+                        if writer:
+                            writer.add(model, model.model(**working_attributes), dedupe_key=(model.name, *[identity_value(attribute) for attribute in working_attributes.values()]))
+                        else:
+                            instances.append(model.model(**working_attributes))
+
+                    # Save the key/values for the row with one query to find the existing ones and one to create the rest
+                    if instances and (instances := missing_key_values(model, instances)):
+                        model.model.objects.bulk_create(instances)
+                        created[("created", model.name)] += len(instances)
+
+                    continue
+
+                if model.instance_finder:
+                    # Look up the model using the instance_finder if it's available
+                    
+                    instance: object = None
+                    arguments: dict = {f"field_lookup_{argument}": row.get(argument) for argument in model.instance_finder["field_lookup_arguments"]}
+                    
+                    if "class" in model.instance_finder:
+                        instance = model.instance_finder["class"].__call__(**arguments)
+
+                    elif "function" in model.instance_finder:
+                        if instance := model.instance_finder["function"](**arguments):
+                            working_objects[model.name] = instance
+                
+                # working_attributes holds the attributes (field/value pairs) needed to build the current model
+                working_attributes: dict = {}
+                
+                superbreak: bool = False    # Needed to break out of both for loops
+                is_empty: bool = True       # Keeps track of whether the model has data other than foreign keys in it
+
+                # Step through fields and fill working_attributes
+                for field in model.fields:
+                    field_value: any = row.get(field.column_name)
+                    
+                    # If the field_value isn't blank and the field is an integer field, convert the value to an integer
+                    if field_value and field.field.get_internal_type() == "IntegerField" and not isinstance(field_value, int):
+                        field_value = int(float(field_value))
+
+                    if field.is_foreign_key:
+                        if "foreign_model_lookup" in field.settings:
+                            temp_object: any = cache_thing.find(key=(model.name, field.foreign_model_lookup_field, field_value), report=False)
+
+                            if not temp_object:
+                                temp_object = field.foreign_model_lookup_instance(field_value)
+                                cache_thing.store(key=(model.name, field.foreign_model_lookup_field, field_value), value=temp_object)
+
+                            if temp_object:
+                                working_attributes[field.name] = temp_object
+
+                        else:
+                            if field.field.related_model.__name__ in working_objects:
+                                working_attributes[field.name] = working_objects[field.field.related_model.__name__]
+
+                            else:
+                                working_attributes[field.name] = None
+                    else:
+                        working_attributes[field.name] = field_value
+                        if working_attributes[field.name] is not None:
+                            is_empty = False
+
+                # Cache keys for each unique set, so a new object can be found by later rows
+                cache_keys: list[tuple] = []
+
+                # Skip if there is a function for getting the instance
+                if not model.settings.get("instance_finder"):
+                    temp_object, cache_keys = self._find_instance(model=model, row=row, working_attributes=working_attributes, cache_thing=cache_thing, identity_index=identity_index, signatures=signatures)
+
+                    if temp_object:
+                        working_objects[model.name] = temp_object
+            
+                # Ensure that if the data for a field is None that the field is nullable
+                if model.name not in working_objects:
+                    for field in model.fields:
+                        if field.name not in working_attributes or working_attributes[field.name] is None and field.not_nullable:
+                            working_objects[model.name] = None
+
+                            if model.settings.get("critical"):
+                                raise IntegrityError(f"Critical model is invalid: Model: {model.name}, Field: {field.name} is null")
+                            
+                            superbreak = True
+                            break
+                
+                if superbreak: 
+                    continue
+
+                if "suppress_on_empty" in model.settings and is_empty:
+                    working_objects[model.name] = None
+
+                # Another worker may have created the object since it was looked for, so look again once it's locked
+                if model.name not in working_objects and lock_identities and cache_keys:
+                    self._lock_identities(keys=cache_keys, wait=wait_for_locks)
+                    temp_object, _ = self._find_instance(model=model, row=row, working_attributes=working_attributes, signatures=signatures)
+
+                    if temp_object:
+                        working_objects[model.name] = temp_object
+
+                        for cache_key in cache_keys:
+                            cache_thing.store(key=cache_key, value=temp_object, transaction=True)
+
+                # If the model is not in working_objects save it to the database (or buffer it in the writer), add it to working_objects, and cache it
+                if model.name not in working_objects:
+                    if "create_instance" in model.settings.get("debug", []):
+                        log.debug(f"{model.name}: Saving object to database: {working_attributes}")
+
+                    if writer:
+                        working_objects[model.name] = model.model(**working_attributes)
+                    else:
+                        working_objects[model.name] = model.model.objects.create(**working_attributes)
+                        created[("created", model.name)] += 1
+
+                    # Keep the row's key/values with the object so its signature can be saved once it has a pk
+                    if signatures is not None and model.name in signatures.models:
+                        working_objects[model.name]._import_wizard_key_values = signatures.row_key_values(model=model, row=row)
+
+                    if writer:
+                        writer.add(model, working_objects[model.name])
+
+                    else:
+                        if signatures is not None:
+                            signatures.add(model=model, instances=[working_objects[model.name]])
+                        
+                        # If this is a deferred model save an ImportSchemeDeferredRows
+                        if model.settings.get("restriction") == "deferred":
+                            self._defer_instance(model=model, instance=working_objects[model.name])
+
+                        # Index the new object once it's committed, so a rolled back object never ends up in the index
+                        if identity_index:
+                            transaction.on_commit(partial(identity_index.add, model=model, instance=working_objects[model.name]))
+
+                    for cache_key in cache_keys:
+                        cache_thing.store(key=cache_key, value=working_objects[model.name], transaction=True)
+
+        return created
+
+    def _find_instance(self, *, model: ImporterModel, row: dict, working_attributes: dict, cache_thing: LRUCacheThing=None, identity_index: IdentityIndex=None, signatures: ContentSignatures=None) -> tuple[models.Model|None, list[tuple]]:
+        """ Load instances per their unique fields until we run out of unique fields or an object is returned.
+        Returns the object (or None) and the cache keys for each unique set.  Without a cache_thing or identity_index only the database is checked """
+
+        instance: models.Model = None
+        cache_keys: list[tuple] = []
+
+        for unique_set in model.unique_sets:
+            
+            test_attributes: dict[str, any] = {}
+            test_attributes_string: str = ""
+            key_value_attributes: dict[str, dict[str, any]] = {}
+
+            if "***Key_Value_Models***" in unique_set:
+                for key_value_model in model.key_value_children:
+                    key_value_attributes[key_value_model.name] = {key: value for key, value in row.get(f"{key_value_model.name} (key-value)", {}).items() if value and value != "NULL"}
+                    test_attributes_string += f"|{key_value_model.name}:{dict_hash(key_value_attributes[key_value_model.name])}|"
+
+            for unique_field in [unique_field for unique_field in unique_set if unique_field in working_attributes]:
+                # Use case insensitive test if case_insensitive_compare is true
+                
+                if model.fields_by_name[unique_field].settings.get("case_insensitive_compare") == True:
+                    test_attributes[f"{getattr(unique_field, 'name', unique_field)}__iexact"] = working_attributes[unique_field]
+                else:
+                    test_attributes[getattr(unique_field, "name", unique_field)] = working_attributes[unique_field]
+
+                test_attributes_string += f"|{unique_field}:{identity_value(working_attributes[unique_field])}|"
+            
+            if "find_instance" in model.settings.get("debug", []):
+                log.debug(f"{model.name}: Test attributes: {test_attributes}")
+                log.debug(f"{model.name}: Test attributes string: {test_attributes_string}")
+
+            cache_keys.append((model.name, test_attributes_string))
+
+            if cache_thing is not None:
+                temp_object: any = cache_thing.find(key=(model.name, test_attributes_string), report=False)
+
+                if temp_object:
+                    if "find_instance" in model.settings.get("debug", []):
+                        log.debug(f"{model.name}: Found object in cache")
+
+                    instance = temp_object
+            
+            # Objects that point to buffered parents can't be in the database yet
+            if any(isinstance(attribute, models.Model) and attribute.pk is None for attribute in test_attributes.values()):
+                continue
+
+            # The identity index answers without a query if it holds this unique set
+            if identity_index and not instance:
+                pk: any = identity_index.find(model=model, unique_set=unique_set, attributes=working_attributes)
+
+                if pk is not NOT_INDEXED:
+                    if pk is not None:
+                        if "find_instance" in model.settings.get("debug", []):
+                            log.debug(f"{model.name}: Found object in identity index")
+
+                        instance = identity_index.instance(model=model, pk=pk)
+
+                        if cache_thing is not None:
+                            cache_thing.store(key=(model.name, test_attributes_string), value=instance, transaction=True)
+
+                    continue
+
+            # Signed models are matched on all their fields and key/values with one indexed lookup when the identity index can't answer
+            if signatures is not None and not instance and "***Key_Value_Models***" in unique_set:
+                pk: any = signatures.find(model=model, attributes=working_attributes, key_values=key_value_attributes)
+
+                if pk is not NOT_SIGNED:
+                    if pk is not None:
+                        if "find_instance" in model.settings.get("debug", []):
+                            log.debug(f"{model.name}: Found object by content signature")
+
+                        instance = IdentityIndex.instance(model=model, pk=pk)
+
+                        if cache_thing is not None:
+                            cache_thing.store(key=(model.name, test_attributes_string), value=instance, transaction=True)
+
+                    continue
+
+            if not instance:
+                temp_object = model.model.objects.filter(**test_attributes)
+
+                # For key/value models we need to annotate the queryset with the key/values
+                if key_value_attributes:
+                    for key_value_model in model.key_value_children:
+                        temp_object = temp_object.annotate(key_value_count=Count(key_value_model.table)).filter(key_value_count=len(key_value_attributes[key_value_model.name]))
+                        
+                        for key, value in key_value_attributes[key_value_model.name].items():
+                            attributes: dict = {
+                                f"{key_value_model.table}__{key_value_model.settings['key_field']}": key,
+                                f"{key_value_model.table}__{key_value_model.settings['value_field']}": value,
+                            }
+                        
+                            temp_object = temp_object.filter(**attributes)
+
+                temp_object = temp_object.first()
+
+                if temp_object:
+                    if "find_instance" in model.settings.get("debug", []):
+                        log.debug(f"{model.name}: Found object in database")
+
+                    instance = temp_object
+
+                    if cache_thing is not None:
+                        cache_thing.store(key=(model.name, test_attributes_string), value=instance, transaction=True)
+
+        return instance, cache_keys
+
+    @staticmethod
+    def _lock_identities(*, keys: list, wait: bool=True) -> None:
+        """ Take a PostgreSQL advisory lock on each key until the end of the transaction.
+        A transaction holding locks for earlier rows can deadlock if it waits, so chunks use wait=False and raise IdentityLockBusy if a lock is taken.
+        Only rows in their own transactions wait, and they take their locks in model and unique set order """
+
+        with transaction.get_connection().cursor() as cursor:
+            for key in keys:
+                if wait:
+                    cursor.execute("SELECT pg_advisory_xact_lock(%s)", [lock_id(key)])
+                    continue
+
+                cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [lock_id(key)])
+
+                if not cursor.fetchone()[0]:
+                    raise IdentityLockBusy(f"Identity {key} is locked by another worker")
+
+    def description_object(self) -> str:
+        """ Returns a dict that describes the import in human readable terms """
+
+        description: dict = {
+            "files": {"secondary": {}},
+            "color_keys": {},
+            "models": []
+        }
+
+        files = description["files"]
+        models = description["models"]
+
+        primary_file = self.files.get(pk=self.settings["primary_file_id"])
+        files["primary"] = primary_file.name
+        
+        color_key = 1
+        for file_id, link in self.settings.get("file_links", {}).items():
+            description["color_keys"][file_id] = color_key
+            file = self.files.get(pk=file_id) 
+
+            file_object = files["secondary"][file.name] = {}
+            file_object["color_key"] = color_key
+            file_object["secondary_field"] = file.fields.get(pk=link['child']).name
+            file_object["primary_field"] = primary_file.fields.get(pk=link['primary']).name
+
+            color_key += 1
+
+        for app in self.importer_object.apps:
+            for model in app.models:
+                model_object = {
+                    "name": model.fancy_name,
+                    "items": []
+                }
+
+                for item in self.items.filter(app=app.name, model=model.name):
+                    value: str = ""
+                    value_class: str = ""
+                    strategy_class: str = ""
+                    key_values: dict = {}
+
+                    if item.strategy == "No Data":
+                        strategy_class = "no_data"
+
+                    elif item.strategy == "Raw Text":
+                        value = item.settings["raw_text"]
+                        value_class = "value"
+
+                    elif item.strategy == "Table Row":
+                        value = item.settings["row"]
+                        value_class = "value"
+
+                    elif item.strategy == "File Field":
+                        file_field: ImportSchemeFileField = ImportSchemeFileField.objects.get(pk=item.settings["key"])
+                        #value = f"{file_field.import_scheme_file.name}: {file_field.name}"
+                        value = file_field.name
+                        
+                        if file_field.import_scheme_file.name == files["primary"]:
+                            value_class = "primary_file"
+                        else:
+                            value_class = f"secondary_file_{files['secondary'][file_field.import_scheme_file.name]['color_key']}"
+
+                    elif item.strategy == "Key Value":
+                        for field_key, field_value in item.settings.items():
+                            file_field: ImportSchemeFileField = ImportSchemeFileField.objects.get(pk=field_value["key"])
+
+                            value_class: str = ""
+
+                            if file_field.import_scheme_file.name == files["primary"]:
+                                value_class = "primary_file"
+                            else:
+                                value_class = f"secondary_file_{files['secondary'][file_field.import_scheme_file.name]['color_key']}"
+
+                            key_values[field_key] = {
+                                "value": file_field.name,
+                                "value_class": value_class,
+                            }
+
+                    model_object["items"].append({
+                        "field": item.field,
+                        "strategy": item.strategy,
+                        "strategy_class": strategy_class,
+                        "value": value,
+                        "value_class": value_class,
+                        "key_values": key_values
+                    })
+
+                models.append(model_object)
+
+        return description
+    
+    def process_start(self) -> None:
+        """ Mark the process started """
+
+        self.set_status_by_name("Import Started")
+        self.process_pid = os.getpid()
+        self.process_created_time = psutil.Process(self.process_pid).create_time()
+        self.save()
+
+    def process_complete(self) -> None:
+        """ Mark the process completed """
+
+        self.set_status_by_name("Import Completed")
+        self.process_pid = None
+        self.process_created_time = None
+        self.save()
+
+    def process_fail(self) -> None:
+        """ Mark the process failed """
+
+        self.set_status_by_name("Import Failed")
+        self.process_pid = None
+        self.process_created_time = None
+        self.save()
+
+    def process_run(self) -> None:
+        """ Run the process """
+
+        self.process_start()
+        self.execute()
+        self.process_complete()
+
+    def process_check_health(self) -> bool:
+        """ Check the health of the process """
+
+        healthy: bool = True
+
+        if not self.status.import_started:
+            healthy = True
+
+        elif not psutil.pid_exists(self.process_pid):
+            healthy = False
+
+        else:
+            process = psutil.Process(self.process_pid)
+
+            if process.create_time() != self.process_created_time:
+                healthy = False
+
+        if not healthy:
+            self.process_fail()
+
+        return healthy
+
+class ImportSchemeFileStatus(ImportBaseModel):
+    """ Holds statuses for ImportSchemeFiles """
+
+    name = models.CharField(max_length=255)
+    uploaded = models.BooleanField(default=False)
+    preinspected = models.BooleanField(default=False)
+    inspecting = models.BooleanField(default=False)
+    inspected = models.BooleanField(default=False)
+    importing = models.BooleanField(default=False)
+    imported = models.BooleanField(default=False)
+
+
+class ImportSchemeFile(ImportBaseModel):
+    ''' Holds a file to import for an ImportScheme. '''
+
+    name = models.CharField(max_length=255, null=False, blank=False)
+    import_scheme = models.ForeignKey(ImportScheme, on_delete=models.CASCADE, related_name='files', editable=False)
+    type = models.CharField(max_length=255)
+    status = models.ForeignKey(ImportSchemeFileStatus, on_delete=models.DO_NOTHING, default=1, related_name="files")
+    settings = models.JSONField(default=dict)
+
+    @property
+    def file_name(self) -> str:
+        ''' Return a file name based on the ID of the ImportFile '''
+
+        return str(self.id).rjust(8, '0')
+    
+    @property
+    def row_count(self) -> int:
+        """ Count the lines of the file """
+
+        if self.base_type in ["text", "excel"]:
+            # A text file's sidecar has its row count whether it's staged or not
+            if (meta := self._file_meta()) is not None:
+                return meta["row_count"]
+            elif self.settings.get("has_arrow", False):
+                return self._arrow_table().num_rows
+            elif self.settings.get("has_db", False):
+                with closing(sqlite3.connect(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db")) as connection:
+                    return connection.execute("SELECT COUNT(*) FROM data").fetchone()[0]
+            else:
+                return sum(len(chunk.index) for chunk in self._tabular_chunks())
+
+        elif self.has_gff_db:
+            return self._gff_db_rowids()["count"]
+    
+    @property
+    def is_staged(self) -> bool:
+        """ True if the file has been staged in a SQLite3 DB or an Arrow file, so it can be read in ranges and in key order """
+
+        return bool(self.settings.get("has_db", False) or self.settings.get("has_arrow", False))
+
+    @property
+    def has_gff_db(self) -> bool:
+        """ True if the file is a GFF file read from a gffutils DB, so it can be read in ranges of rowids """
+
+        return self.base_type == "gff" and self.gff_reader == "gffutils" and os.path.exists(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db")
+
+    @property
+    def base_type(self) -> str:
+        """ Returns the base type of the file: text or gff """
+
+        if self.type.lower() in  ("gff", "gff3"):
+            return "gff"
+        elif self.type.lower() in ("tsv", "csv"):
+            return "text"
+        elif self.type.lower() in ("xlsx", "xls"):
+            return "excel"
+    
+    @property
+    def gff_reader(self) -> str:
+        """ Returns the reader for a GFF file: gffutils, which builds a DB that knows the feature hierarchy, or native, which streams the file.
+        The file's gff_reader setting overrides the GFF_Reader setting, and native is used if gffutils isn't installed """
+
+        return self.settings.get("gff_reader", settings.ML_IMPORT_WIZARD.get("GFF_Reader", "native" if NO_GFFUTILS else "gffutils"))
+
+    @property
+    def ready_to_inspect(self) -> bool:
+        """ Returns true if the file is ready to preinspect """
+
+        if self.base_type == "gff":
+            return False
+            
+        if self.base_type == "text":
+            try:
+                self._confirm_file_is_ready(preinspected=False, inspected=False)
+            except:
+                return False
+            
+            if self.settings.get("first_row_header", None) is None:
+                return False
+
+        return True
 
     def save(self, *args, **kwargs) -> None:
         ''' Override Save to get at the file type  '''
 
-        self.type = Path(self.name).suffix[1:]
+        self.type, compression = split_compression(self.name)
+
+        # Compressed files are read through a decompressing stream, so the compression is all that needs to be remembered
+        if compression:
+            self.settings["compression"] = compression
+        else:
+            self.settings.pop("compression", None)
         
         if self.status == None:
             self.status = {}
@@ -994,26 +1341,72 @@ class ImportSchemeFile(ImportBaseModel):
             import_file_field.import_sample(sample=samples)
 
     def inspect(self, *, use_db: bool = False, ignore_status: bool = False) -> None:
-        """ Inspect the file to figure out what fields it has """
+        """ Inspect the file to figure out what fields it has.  The inspecting process is recorded so the heartbeat can tell if it was killed """
         
+        self.settings["inspect_process"] = {"pid": os.getpid(), "created": psutil.Process(os.getpid()).create_time()}
+        self.settings.pop("inspect_progress", None)
         self.set_status_by_name("Inspecting")
 
-        if self.base_type == "gff":
-            self._inspect_gff_file(use_db=use_db, ignore_status=ignore_status)
+        try:
+            if self.base_type == "gff":
+                self._inspect_gff_file(use_db=use_db, ignore_status=ignore_status)
 
-        elif self.base_type in ["text", "excel"]:
-            self._inspect_tabular_file(ignore_status=ignore_status)
+            elif self.base_type in ["text", "excel"]:
+                self._inspect_tabular_file(ignore_status=ignore_status)
+
+        finally:
+            self.settings.pop("inspect_process", None)
+            self.save(update_fields=["settings"])
+
+    def inspect_check_health(self) -> bool:
+        """ Check the health of the process inspecting the file.  If it was killed, its half built files are removed and the file is put back in line to be inspected """
+
+        process: dict = self.settings.get("inspect_process")
 
-    def rows(self, *, limit_count: int=None, offset_count: int=0, specific_rows: list[int]=None, header_row: bool=False, connection=None) -> Generator[dict[str: any], None, None]:
-        """ Iterates through the rows of the file, returning a dict for each row """
+        if not self.status.inspecting or self.status.inspected or not process:
+            return True
+
+        try:
+            healthy: bool = psutil.Process(process["pid"]).create_time() == process["created"]
+        except psutil.NoSuchProcess:
+            healthy = False
+
+        if not healthy:
+            log.warn(f"{self}: the inspection was interrupted, it will be started again")
+
+            for suffix in (".db.tmp", ".arrow.tmp", ".meta.json.tmp"):
+                if os.path.exists(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}{suffix}"):
+                    os.remove(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}{suffix}")
+
+            self.settings.pop("inspect_process", None)
+            self.settings.pop("inspect_progress", None)
+            self.set_status_by_name("Preinspected")
+
+        return healthy
+
+    @property
+    def inspect_progress(self) -> str:
+        """ Returns how far the GFF DB build of the file has got, for showing while the file is being inspected """
+
+        if not (progress := self.settings.get("inspect_progress")):
+            return ""
+
+        return f"{progress['features']:,} features, {progress['bytes_read'] * 100 // max(progress['bytes'], 1)}% of the file read"
+
+    def rows(self, *, limit_count: int=None, offset_count: int=0, specific_rows: list[int]=None, header_row: bool=False, connection=None, order_by: str=None, featuretypes: list[str]=None, skipped: Counter=None) -> Generator[dict[str: any], None, None]:
+        """ Iterates through the rows of the file, returning a dict for each row.  offset_count rows are skipped, and specific_rows are 0 based row numbers.
+        order_by sorts the rows by a field, and only works for staged files.
+        featuretypes limits the rows of a GFF file to features of those featuretypes, and the features of other featuretypes are counted by featuretype in skipped """
 
         if self.base_type == "gff":
-            for row in self._rows_from_gff_file(limit_count=limit_count, offset_count=offset_count, specific_rows=specific_rows):
+            for row in self._rows_from_gff_file(limit_count=limit_count, offset_count=offset_count, specific_rows=specific_rows, featuretypes=featuretypes, skipped=skipped):
                 yield row
 
         elif self.base_type in ["text", "excel"]:
-            if self.settings.get("has_db", False):
-                for row in self._rows_from_db(limit_count=limit_count, offset_count=offset_count, connection=connection):
+            if self.settings.get("has_arrow", False):
+                yield from self._rows_from_arrow(limit_count=limit_count, offset_count=offset_count, specific_rows=specific_rows, order_by=order_by)
+            elif self.settings.get("has_db", False):
+                for row in self._rows_from_db(limit_count=limit_count, offset_count=offset_count, specific_rows=specific_rows, connection=connection, order_by=order_by):
                     yield row
             else:
                 columns = self.header_fields()
@@ -1027,8 +1420,15 @@ class ImportSchemeFile(ImportBaseModel):
 
     def header_fields(self, *, connection = None) -> list:
         """ Return the first row of the file as a list """
-        
-        if self.settings.get("has_db", False):
+
+        # A text file's sidecar has its columns whether it's staged or not
+        if (meta := self._file_meta()) is not None:
+            return meta["columns"]
+
+        if self.settings.get("has_arrow", False):
+            return self._arrow_table().column_names
+
+        elif self.settings.get("has_db", False):
             fields: list = []
             if not connection: 
                 connection = self._get_db_connection()
@@ -1038,8 +1438,7 @@ class ImportSchemeFile(ImportBaseModel):
             return fields
         
         elif self.base_type in ["text", "excel"]:
-            data_frame: pd.DataFrame = self._get_file_as_dataframe()
-            return data_frame.columns.tolist()
+            return self._tabular_columns()
 
     def find_row_by_key(self, *, field: str|list=None, key: str=None, cache: LRUCacheThing=None, connection=None) -> list|None:
         """ Find the first row that has a field that equals key.  Uses a cache object if it's given one """
@@ -1065,15 +1464,21 @@ class ImportSchemeFile(ImportBaseModel):
             if row:
                 return row
             
-        if self.base_type == "text":
-            if self.settings.get("has_db", False):
-                row = connection.execute(f"SELECT * FROM data WHERE \"{field}\"='{key}'").fetchone()
-                return row
-            else:
-                for row in self.rows():
-                    if cache: cache.store(key=key, value=row)
-                    if row[field] == key:
-                        return row
+        if self.settings.get("has_arrow", False):
+            index = self._arrow_key_index(field=field).get(str(key))
+
+            return self._arrow_table().slice(index, 1).to_pylist()[0] if index is not None else None
+
+        # Text and Excel files are both staged in a DB, and read a row at a time if they aren't
+        if self.settings.get("has_db", False):
+            row = connection.execute(f"SELECT * FROM data WHERE \"{field}\"=?", (str(key),)).fetchone()
+            return row
+
+        elif self.base_type in ["text", "excel"]:
+            for row in self.rows():
+                if cache: cache.store(key=key, value=row)
+                if row[field] == key:
+                    return row
         
         # If it's not found after going through the file store that it's not in the file
         if cache:
@@ -1081,8 +1486,135 @@ class ImportSchemeFile(ImportBaseModel):
 
         return None
 
-    def _rows_from_db(self, *, limit_count: int=None, offset_count: int=0, specific_rows: list[int]=None, header_row: bool=False, connection=None) -> Generator[list, None, None]:
-        """ Iterates through the rows of select from an SQLite3 db, returning a list for each row """
+    def find_rows_by_keys(self, *, field: str=None, keys: list=None, connection=None, chunk_size: int=500) -> dict[str, any]:
+        """ Find the first row for each of a list of keys in one pass.  Returns a dict of str(key): row for the keys that are found.
+        DBs are queried with IN (...) for chunk_size keys at a time """
+
+        rows: dict[str, any] = {}
+
+        if not field or not keys:
+            return rows
+
+        keys = list(dict.fromkeys(str(key) for key in keys if key))
+
+        if self.settings.get("has_arrow", False):
+            key_index: dict[str, int] = self._arrow_key_index(field=field)
+
+            for row in self._arrow_table().take(sorted(key_index[key] for key in keys if key in key_index)).to_pylist():
+                rows[row[field]] = row
+
+        elif self.settings.get("has_db", False):
+            if not connection: connection = self._get_db_connection()
+
+            for start in range(0, len(keys), chunk_size):
+                chunk_keys: list[str] = keys[start:start + chunk_size]
+
+                # Rows come back in file order, so the first row for a key is the one find_row_by_key would find
+                for row in connection.execute(f"SELECT * FROM data WHERE \"{field}\" IN ({', '.join(['?'] * len(chunk_keys))}) ORDER BY rowid", chunk_keys):
+                    rows.setdefault(row[field], row)
+
+        elif self.base_type in ["text", "excel"]:
+            wanted_keys: set[str] = set(keys)
+
+            for row in self.rows():
+                if row[field] in wanted_keys and row[field] not in rows:
+                    rows[row[field]] = row
+
+                    if len(rows) == len(wanted_keys):
+                        break
+
+        return rows
+
+    def joined_rows(self, *, links: dict[int, tuple], limit_count: int=None, offset_count: int=0) -> Generator[any, None, None]:
+        """ Iterates through the rows of the file's DB with linked child files joined in by SQLite, in file order.
+        links is a dict of child file id: (child file, child linked field, primary linked field, child fields).  Child fields are named by joined_column,
+        along with the child row's rowid, which is None if there's no child row.  Like find_row_by_key the first child row with the key is used """
+
+        # The child DBs are attached to this connection, so it's closed when the rows have been read or the generator is closed
+        with closing(self._get_db_connection()) as connection:
+            select_list: list[str] = ["p.*"]
+            join_list: list[str] = []
+
+            for file_id, (file, child_linked_field, primary_linked_field, fields) in links.items():
+                connection.execute(f"ATTACH DATABASE ? AS child_{file_id}", (f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{file.file_name}.db",))
+
+                select_list.append(f'c{file_id}.rowid AS \"{joined_column(file_id, "***rowid***")}\"')
+                select_list += [f'c{file_id}.\"{name}\" AS \"{joined_column(file_id, name)}\"' for name in fields]
+
+                join_list.append(
+                    f'LEFT JOIN child_{file_id}.data c{file_id} ON c{file_id}.rowid = '
+                    f'(SELECT MIN(rowid) FROM child_{file_id}.data WHERE \"{child_linked_field}\" = p.\"{primary_linked_field}\" AND p.\"{primary_linked_field}\" != \'\')'
+                )
+
+            where_bit: str = ""
+
+            if limit_count or offset_count:
+                where_bit = f" WHERE p.rowid IN (SELECT rowid FROM data LIMIT {limit_count or -1} OFFSET {offset_count or 0})"
+
+            for row in connection.execute(f"SELECT {', '.join(select_list)} FROM data p {' '.join(join_list)}{where_bit} ORDER BY p.rowid"):
+                yield row
+
+    def key_rows(self, *, field: str, fields: list[str], ordered: bool=False, connection=None) -> Generator[tuple[str, dict], None, None]:
+        """ Yields (str(key), row) for each row of the file with a value in field, where row is a dict of only the fields listed.
+        Rows are in file order, or in key order then file order if ordered is True, which needs the file to be staged """
+
+        if self.settings.get("has_arrow", False):
+            table = self._arrow_table().select([field, *fields])
+
+            if ordered:
+                table = table.sort_by(field)
+
+            for batch in table.to_batches(max_chunksize=settings.ML_IMPORT_WIZARD.get("Read_Chunk_Size", 10000)):
+                for row in batch.to_pylist():
+                    if row[field]:
+                        yield str(row[field]), {name: row[name] for name in fields}
+
+        elif self.settings.get("has_db", False):
+            if not connection: connection = self._get_db_connection()
+
+            column_list: str = ", ".join([f'\"{name}\"' for name in [field, *fields]])
+            order_bit: str = f'\"{field}\", rowid' if ordered else "rowid"
+
+            for row in connection.execute(f'SELECT {column_list} FROM data WHERE \"{field}\" IS NOT NULL ORDER BY {order_bit}'):
+                if row[0]:
+                    yield str(row[0]), dict(zip(fields, tuple(row)[1:]))
+
+        elif ordered:
+            raise FileNotReadyError(f"Rows can only be read in key order from a file with a DB: {self}")
+
+        else:
+            for row in self.rows():
+                if row[field]:
+                    yield str(row[field]), {name: row[name] for name in fields}
+
+    def index_fields(self, *, fields: list[str], connection=None) -> None:
+        """ Index fields of the file's DB so rows can be found by them without a table scan.  Indexed fields are kept in settings["indexes"] """
+
+        if not self.settings.get("has_db", False) or self.base_type not in ["text", "excel"]:
+            return
+
+        indexes: list[str] = self.settings.get("indexes", [])
+        new_indexes: list[str] = [field for field in dict.fromkeys(fields) if field not in indexes]
+
+        if not new_indexes:
+            return
+
+        if not connection: connection = self._get_db_connection()
+
+        for field in new_indexes:
+            quoted_field: str = field.replace('"', '""')
+            connection.execute(f'CREATE INDEX IF NOT EXISTS "data_{quoted_field}" ON data("{quoted_field}")')
+
+        connection.commit()
+
+        def add_indexes(file_settings: dict) -> None:
+            file_settings["indexes"] = [*file_settings.get("indexes", []), *[field for field in new_indexes if field not in file_settings.get("indexes", [])]]
+
+        self.settings["indexes"] = self._save_settings(update=add_indexes)["indexes"]
+
+    def _rows_from_db(self, *, limit_count: int=None, offset_count: int=0, specific_rows: list[int]=None, header_row: bool=False, connection=None, order_by: str=None) -> Generator[list, None, None]:
+        """ Iterates through the rows of select from an SQLite3 db, returning a list for each row.  If order_by is set the selected rows are sorted by that field, then file order.
+        specific_rows are 0 based row numbers, like every other reader, so they're one less than the rowids """
 
         if not connection: connection = self._get_db_connection()
 
@@ -1091,95 +1623,384 @@ class ImportSchemeFile(ImportBaseModel):
         offset_bit: str = ""
 
         if limit_count: limit_bit = f" LIMIT {limit_count} "
-        if specific_rows: where_bit = f" WHERE rowid in ({','.join([str(row) for row in specific_rows])}) "
+        if specific_rows: where_bit = f" WHERE rowid in ({','.join([str(row + 1) for row in specific_rows])}) "
         if offset_count: offset_bit = f" OFFSET {offset_count}"
 
         sql = f"SELECT * FROM data{where_bit}{limit_bit}{offset_bit}"
 
+        if order_by:
+            sql = f"SELECT * FROM data WHERE rowid IN (SELECT rowid FROM data{where_bit}{limit_bit}{offset_bit}) ORDER BY \"{order_by}\", rowid"
+
         for row in connection.execute(sql):
             yield row
 
-    def _get_file_as_dataframe(self) -> pd.DataFrame:
-        """ Reuturns the contents of the file as a pandas DataFrame """
+    def _rows_from_arrow(self, *, limit_count: int=None, offset_count: int=0, specific_rows: list[int]=None, order_by: str=None) -> Generator[dict, None, None]:
+        """ Iterates through the rows of the file's Arrow staging file, returning a dict for each row.  Ranges are zero-copy slices of the memory-mapped file.
+        specific_rows are 0 based row numbers.  If order_by is set the selected rows are sorted by that field, then file order """
+
+        table = self._arrow_table()
+
+        if specific_rows is not None:
+            table = table.take([row for row in sorted(specific_rows) if row < table.num_rows])
+        else:
+            table = table.slice(offset_count or 0, limit_count)
+
+        if order_by:
+            table = table.sort_by(order_by)
+
+        for batch in table.to_batches(max_chunksize=settings.ML_IMPORT_WIZARD.get("Read_Chunk_Size", 10000)):
+            yield from batch.to_pylist()
+
+    def _arrow_key_index(self, *, field: str) -> dict[str, int]:
+        """ Returns a dict of value: row number of the first row with that value in a column of the Arrow staging file.  It's built once per field for each file """
 
-        if hasattr(self, "data_frame"):
-            return self.data_frame
+        if not hasattr(self, "_arrow_keys"):
+            self._arrow_keys: dict[str, dict[str, int]] = {}
 
-        data_frame: pd.DataFrame = None
+        if field not in self._arrow_keys:
+            values: list = self._arrow_table()[field].to_pylist()
+
+            # Later rows are added first, so the first row with a value is the one that's kept
+            key_index: dict[str, int] = dict(zip(reversed(values), range(len(values) - 1, -1, -1)))
+            key_index.pop(None, None)
+
+            self._arrow_keys[field] = key_index
+
+        return self._arrow_keys[field]
+
+    def _arrow_table(self) -> object:
+        """ Returns the file's Arrow staging file as a pyarrow Table, memory-mapped so it isn't read into memory """
+
+        if not hasattr(self, "_arrow"):
+            self._arrow = pyarrow.ipc.open_file(pyarrow.memory_map(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.arrow")).read_all()
+
+        return self._arrow
+
+    def _tabular_chunks(self, *, start_row: int=0, row_limit: int=None) -> Generator[pd.DataFrame, None, None]:
+        """ Yields the contents of the file as pandas DataFrames of at most Read_Chunk_Size rows, with every value a str or None.
+        Reading starts at start_row, from the closest row offset in the sidecar if the file has one, and stops after row_limit rows """
+
+        chunks: Generator = None
+        skip_rows: int = start_row
+
+        if start_row and (meta := self._file_meta()) is not None and meta["offsets"]:
+            block: int = min(start_row // meta["interval"], len(meta["offsets"]) - 1)
+            chunks = self._read_chunks(offset=meta["offsets"][block], names=meta["header"])
+            skip_rows = start_row - block * meta["interval"]
+
+        if chunks is None:
+            chunks = self._read_chunks()
+
+        try:
+            for chunk in chunks:
+                if skip_rows >= len(chunk.index):
+                    skip_rows -= len(chunk.index)
+                    continue
+
+                chunk, skip_rows = chunk.iloc[skip_rows:], 0
+
+                if row_limit is not None:
+                    chunk = chunk.iloc[:row_limit]
+                    row_limit -= len(chunk.index)
+
+                yield chunk
+
+                if row_limit == 0:
+                    return
+        finally:
+            chunks.close()
+
+    def _read_chunks(self, *, offset: int=None, names: list[str]=None) -> Generator[pd.DataFrame, None, None]:
+        """ Yields the contents of the file as pandas DataFrames of at most Read_Chunk_Size rows.  Text files can be read from a byte offset, with the names of the columns """
+
+        chunk_size: int = settings.ML_IMPORT_WIZARD.get("Read_Chunk_Size", 10000)
 
         match self.base_type:
             case "text":
                 delimiter: str = "\t" if self.type.lower()=="tsv" else ","
-                data_frame = pd.read_csv(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}", delimiter=delimiter)
+                options: dict = {"compression": self.settings.get("compression")} if offset is None else {"header": None, "names": names, "index_col": False}
+
+                with open(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}", "rb") if offset is not None else nullcontext(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}") as source:
+                    if offset is not None:
+                        source.seek(offset)
+
+                    with pd.read_csv(source, delimiter=delimiter, dtype=object, chunksize=chunk_size, **options) as reader:
+                        for chunk in reader:
+                            yield chunk.where(chunk.notna(), None)
 
             case "excel":
-                data_frame = pd.read_excel(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}")
-        
-        if not data_frame.empty:
-            data_frame = data_frame.dropna(how="all", axis=1)
-            self.data_frame = data_frame
+                rows: Generator = excel_rows(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}", self.type)
+
+                if rows is not None:
+                    header: list[str] = excel_header(next(rows, []))
+
+                    while chunk := list(islice(rows, chunk_size)):
+                        yield pd.DataFrame([row[:len(header)] + [None] * (len(header) - len(row)) for row in chunk], columns=header, dtype=object)
+
+                    return
+
+                log.warn(f"{self}: python-calamine and openpyxl aren't installed, reading the whole workbook")
+
+                data_frame: pd.DataFrame = pd.read_excel(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}")
+
+                for start in range(0, len(data_frame.index), chunk_size):
+                    chunk: pd.DataFrame = data_frame.iloc[start:start + chunk_size].map(lambda value: None if pd.isna(value) else str(value)).astype(object)
+                    yield chunk.where(chunk.notna(), None)
+
+    def _tabular_columns(self) -> list[str]:
+        """ Returns the columns of the file that have a value in at least one row.  Text files have them in their sidecar, other files are read once, a chunk at a time """
+
+        if hasattr(self, "_columns"):
+            return self._columns
+
+        if (meta := self._file_meta()) is not None:
+            self._columns = meta["columns"]
+        else:
+            header, self._columns, row_count = self._scan_columns()
 
-        return data_frame
+        return self._columns
+
+    def _scan_columns(self, *, chunks: Iterable[pd.DataFrame]=None) -> tuple[list[str], list[str], int]:
+        """ Reads the file, or chunks if they're given, a chunk at a time.  Returns all the columns, the columns that have a value in at least one row, and the number of rows """
+
+        columns: list[str] = None
+        used_columns: set[str] = set()
+        row_count: int = 0
+
+        for chunk in chunks if chunks is not None else self._tabular_chunks():
+            if columns is None:
+                columns = chunk.columns.tolist()
+
+            used_columns.update(chunk.columns[chunk.notna().any()].tolist())
+            row_count += len(chunk.index)
+
+        return columns or [], [column for column in columns or [] if column in used_columns], row_count
+
+    def _file_meta(self) -> dict|None:
+        """ Returns the sidecar of a text file, which holds its header, delimiter, columns, row count and row offsets.
+        Returns None if the file hasn't been inspected since it was last changed """
+
+        if self.base_type != "text":
+            return None
+
+        if (meta := getattr(self, "_sidecar", None)) is not None:
+            return meta
+
+        try:
+            stat: os.stat_result = os.stat(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}")
+        except FileNotFoundError:
+            return None
+
+        try:
+            with open(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.meta.json") as file:
+                meta = json.load(file)
+
+            if meta["size"] == stat.st_size and meta["mtime"] == stat.st_mtime_ns:
+                self._sidecar = meta
+                return meta
+
+        except (OSError, ValueError, KeyError):
+            pass
+
+        return None
+
+    def _write_file_meta(self) -> dict:
+        """ Writes the sidecar of a text file in one pass, parsing the file with pandas while a RecordScanner keeps the offset of every Row_Offset_Interval-th record so reads can seek to it """
+
+        file_name: str = f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}"
+        stat: os.stat_result = os.stat(file_name)
+        delimiter: str = "\t" if self.type.lower()=="tsv" else ","
+        interval: int = settings.ML_IMPORT_WIZARD.get("Row_Offset_Interval", 10000)
+
+        with open_file(file_name, self.settings.get("compression")) as file:
+            scanner: RecordScanner = RecordScanner(file, interval=interval)
+
+            try:
+                with pd.read_csv(io.BufferedReader(scanner), delimiter=delimiter, dtype=object, chunksize=settings.ML_IMPORT_WIZARD.get("Read_Chunk_Size", 10000)) as reader:
+                    header, columns, row_count = self._scan_columns(chunks=reader)
+            except pd.errors.EmptyDataError:
+                header, columns, row_count = [], [], 0
+
+        meta: dict = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "delimiter": delimiter,
+            "header": header,
+            "columns": columns,
+            "interval": interval,
+            "row_count": row_count,
+            # Offsets in a compressed file are offsets in the decompressed data, which can't be seeked to
+            "offsets": None if self.settings.get("compression") else scanner.offsets,
+        }
+
+        if row_count != scanner.row_count:
+            log.warn(f"{self}: pandas read {row_count} rows but {scanner.row_count} records were found, so rows won't be read from offsets")
+            meta["offsets"] = None
+
+        with open(f"{file_name}.meta.json.tmp", "w") as file:
+            json.dump(meta, file)
+
+        os.replace(f"{file_name}.meta.json.tmp", f"{file_name}.meta.json")
+
+        self._sidecar = meta
+        self.__dict__.pop("_columns", None)
+
+        return meta
 
     def _rows_from_file(self, *, limit_count: int=None, offset_count: int=0, specific_rows: list[int]=None, header_row: bool=False) -> Generator[list, None, None]:
-        """ Iterates through the rows of a text or excel file, returning a list for each row """
-    
-        read_count: int = 0
+        """ Iterates through the rows of a text or excel file, returning a list for each row.  Text files with row offsets are read from the offset closest to the first row asked for """
+
         returned_count: int = 0
 
+        columns: list[str] = self._tabular_columns()
+        meta: dict = self._file_meta()
+
+        # Read each block of rows that holds specific rows from its offset, instead of reading the file from the top
+        if specific_rows is not None and meta is not None and meta["offsets"]:
+            rows: list[int] = [row for row in sorted(set(specific_rows)) if row >= offset_count][:limit_count or None]
+
+            for block, block_rows in groupby(rows, key=lambda row: row // meta["interval"]):
+                block_rows = list(block_rows)
+                chunks: list[pd.DataFrame] = list(self._tabular_chunks(start_row=block_rows[0], row_limit=block_rows[-1] - block_rows[0] + 1))
+
+                if not chunks:
+                    return
+
+                data_frame: pd.DataFrame = pd.concat(chunks)[columns]
+
+                for row in data_frame.iloc[[row - block_rows[0] for row in block_rows if row - block_rows[0] < len(data_frame.index)]].itertuples(index=False, name=None):
+                    yield list(row)
+
+            return
+
         if specific_rows is not None:
             max_specific_rows: int = max(specific_rows)
             specific_rows.sort()
         else:
             max_specific_rows: int = 0
 
-        data_frame: pd.DataFrame = self._get_file_as_dataframe()
+        start_row: int = offset_count if offset_count and specific_rows is None else 0
+        index: int = start_row - 1
 
-        for index, row in data_frame.iterrows():
-            if specific_rows is not None and index not in specific_rows:
-                continue
-            
-            if offset_count and index <= offset_count:
-                continue
-            
-            yield [str(value) if not pd.isna(value) else None for value in row.values]
-            returned_count += 1
+        for chunk in self._tabular_chunks(start_row=start_row):
+            for row in chunk[columns].itertuples(index=False, name=None):
+                index += 1
+
+                if specific_rows is not None and index not in specific_rows:
+                    continue
+                
+                if offset_count and index < offset_count:
+                    continue
+                
+                yield list(row)
+                returned_count += 1
 
-            if specific_rows is not None and returned_count > max_specific_rows:
-                break
+                if specific_rows is not None and (returned_count > max_specific_rows or index >= max_specific_rows):
+                    return
 
-            if limit_count and returned_count >= limit_count:
-                break
+                if limit_count and returned_count >= limit_count:
+                    return
 
-    def _rows_from_gff_file(self, *, limit_count: int=None, offset_count: int=0, specific_rows: list[int]=None) -> Generator[dict[str: any], None, None]:
-        """ Iterates through the rows of the GFF file, returning a dict for each row """
+    def _rows_from_gff_file(self, *, limit_count: int=None, offset_count: int=0, specific_rows: list[int]=None, featuretypes: list[str]=None, skipped: Counter=None) -> Generator[dict[str: any], None, None]:
+        """ Iterates through the rows of the GFF file, returning a dict for each row.  With a gffutils DB the offset and limit are turned into a
+            range of rowids, so only the rows in the range are read.  If featuretypes is given only features of those featuretypes are made into rows,
+            and the features of other featuretypes in the range are counted in skipped.  Offsets and limits count the features of every featuretype """
 
         self._confirm_file_is_ready(inspected=True)
 
-        db = gffutils.FeatureDB(f'{settings.ML_IMPORT_WIZARD["Working_Files_Dir"]}{self.file_name}.db')
+        offset_count = offset_count or 0
+
+        if self.gff_reader == "native":
+            for row in islice(self._rows_from_gff_stream(featuretypes=featuretypes), offset_count, offset_count + limit_count if limit_count else None):
+                if type(row) is str:
+                    if skipped is not None: skipped[row] += 1
+                    continue
+
+                yield row
+
+        elif (rowids := self._gff_rowid_range(limit_count=limit_count, offset_count=offset_count)) is not None:
+            yield from self._rows_from_gff_db(start_rowid=rowids[0], end_rowid=rowids[1], featuretypes=featuretypes, skipped=skipped)
+
+    def _gff_db_rowids(self) -> dict[str, any]:
+        """ Returns the first rowid and number of features in the gffutils DB, and whether the rowids are contiguous.
+            The count needs a scan, so it's kept in settings["gff_rowids"] until the DB changes """
+
+        db_file_name: str = f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db"
+        stat = os.stat(db_file_name)
+
+        if (rowids := self.settings.get("gff_rowids")) and (rowids["size"], rowids["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+            return rowids
+
+        with closing(sqlite3.connect(db_file_name)) as connection:
+            first, last, count = connection.execute("SELECT MIN(rowid), MAX(rowid), COUNT(*) FROM features").fetchone()
+
+        rowids = {"first": first or 1, "count": count, "contiguous": not count or last - first + 1 == count, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        self._save_settings(update=lambda file_settings: file_settings.update(gff_rowids=rowids))
+        self.settings["gff_rowids"] = rowids
+
+        return self.settings["gff_rowids"]
+
+    def _gff_rowid_range(self, *, limit_count: int=None, offset_count: int=0) -> tuple[int|None, int|None]|None:
+        """ Returns the first rowid and the rowid after the last of a range of features in the gffutils DB, with None for an open end,
+            or None if the range is past the last feature.  Rowids are found by arithmetic if they're contiguous, and by a rowid only query if they aren't """
+
+        rowids: dict[str, any] = self._gff_db_rowids()
+
+        if offset_count >= rowids["count"]:
+            return None
+
+        if rowids["contiguous"]:
+            return (
+                rowids["first"] + offset_count, 
+                rowids["first"] + offset_count + limit_count if limit_count and offset_count + limit_count < rowids["count"] else None,
+            )
+
+        with closing(sqlite3.connect(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db")) as connection:
+            def rowid_at(position: int) -> int|None:
+                if (row := connection.execute("SELECT rowid FROM features ORDER BY rowid LIMIT 1 OFFSET ?", (position,)).fetchone()) is not None:
+                    return row[0]
+
+            return rowid_at(offset_count), rowid_at(offset_count + limit_count) if limit_count else None
+
+    def _rows_from_gff_db(self, *, start_rowid: int=None, end_rowid: int=None, featuretypes: list[str]=None, skipped: Counter=None) -> Generator[dict[str: any], None, None]:
+        """ Iterates through the features in the gffutils DB of the GFF file, returning a dict for each row.  start_rowid and end_rowid
+            limit the features to those with rowids from start_rowid up to but not including end_rowid, which SQLite seeks to.
+            featuretypes limits them to those featuretypes, using the featuretype index, and the other features in the range are counted in skipped """
 
         base_fields = ('seqid', 'source', 'featuretype', 'start', 'end', 'score', 'strand', 'frame')
-        counter: int = 0
 
-        for feature in db.all_features():
-            row: dict[str, any] = {}
+        where: list[str] = []
+        parameters: list[int] = []
 
-            for field in base_fields:
-                row[field] = getattr(feature, field)
+        if start_rowid is not None:
+            where.append("rowid >= ?")
+            parameters.append(start_rowid)
 
-            for key, value in feature.attributes.items():
-                row[key] = value
-                if len(row[key]) == 1: row[key] = row[key][0]
+        if end_rowid is not None:
+            where.append("rowid < ?")
+            parameters.append(end_rowid)
 
-            counter += 1
+        with closing(sqlite3.connect(f'{settings.ML_IMPORT_WIZARD["Working_Files_Dir"]}{self.file_name}.db')) as connection:
+            if featuretypes is not None:
+                featuretypes_bit: str = f"featuretype IN ({', '.join('?' * len(featuretypes))})"
 
-            if offset_count and counter <= offset_count:
-                    continue
+                if skipped is not None:
+                    for featuretype, count in connection.execute(f"SELECT featuretype, COUNT(*) FROM features WHERE {' AND '.join(where + ['NOT ' + featuretypes_bit])} GROUP BY featuretype", parameters + list(featuretypes)):
+                        skipped[featuretype] += count
 
-            yield row
+                where = where + [featuretypes_bit]
+                parameters = parameters + list(featuretypes)
+
+            query: str = f"SELECT {', '.join(f'`{field}`' for field in base_fields)}, attributes FROM features{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY rowid"
+
+            # The columns are read straight from the features table, which is much faster than making a gffutils Feature of each row
+            for feature in connection.execute(query, parameters):
+                row: dict[str, any] = dict(zip(base_fields, feature))
+
+                for key, value in json.loads(feature[-1]).items():
+                    row[attribute_field(key)] = value[0] if len(value) == 1 else value
 
-            if limit_count and counter >= limit_count:
-                break
+                yield row
 
     def _inspect_tabular_file(self, *, ignore_status: bool = False) -> None:
         """ Inspect a tabular file (text, excel) by importing to the db """
@@ -1189,7 +2010,24 @@ class ImportSchemeFile(ImportBaseModel):
         self.set_status_by_name('Inspecting')
         self.save(update_fields=["status"])
 
-        connection = self._create_db_from_tabular_file(replace_file=True)
+        connection = None
+
+        # The sidecar's columns and row count are used to stage the file, and to read it once it's staged, so it's written first
+        if self.base_type == "text":
+            self._write_file_meta()
+
+        # Files are staged in SQLite unless the file, or the Staging_Format setting, asks for Arrow
+        staging: str = self.settings.get("staging", settings.ML_IMPORT_WIZARD.get("Staging_Format", "sqlite"))
+
+        if staging == "arrow" and NO_PYARROW:
+            log.warn(f"{self}: pyarrow is not installed, staging in SQLite")
+            staging = "sqlite"
+
+        if staging == "arrow":
+            self._create_arrow_from_tabular_file()
+        else:
+            connection = self._create_db_from_tabular_file(replace_file=True)
+
         row_count = self.row_count
         
         # Look at 25 rows spread out in the file.
@@ -1218,6 +2056,10 @@ class ImportSchemeFile(ImportBaseModel):
         
         self.import_fields(fields=attributes)
 
+        # Remember the format of fields whose samples are all dates, so they can be parsed without dateutil
+        self.settings["date_formats"] = {field: date_format for field, samples in attributes.items() if (date_format := infer_date_format(samples))}
+        self.save(update_fields=["settings"])
+
         self.set_status_by_name('Inspected')
         self.save(update_fields=["status"])
 
@@ -1228,38 +2070,79 @@ class ImportSchemeFile(ImportBaseModel):
 
         self.set_status_by_name('Inspecting')
         self.save(update_fields=["status"])
+
+        if self.gff_reader == "native":
+            self._inspect_gff_rows()
+            return
         
-        if (use_db):
+        if use_db and os.path.exists(f'{settings.ML_IMPORT_WIZARD["Working_Files_Dir"]}{self.file_name}.db'):
             db = gffutils.FeatureDB(f'{settings.ML_IMPORT_WIZARD["Working_Files_Dir"]}{self.file_name}.db')
         else:
-            db = gffutils.create_db(
-                f'{settings.ML_IMPORT_WIZARD["Working_Files_Dir"]}{self.file_name}', 
-                f'{settings.ML_IMPORT_WIZARD["Working_Files_Dir"]}{self.file_name}.db', 
-                merge_strategy="create_unique", 
-                force=True
-            )
+            if use_db:
+                log.warn(f"{self}: there's no GFF DB to use, building one")
 
-        # Look at five of each featuretype to make a master list of attributes
-        attributes: dict = {}
+            db = self._create_gff_db()
+
+        # Read the columns straight from the features table, which is much faster than making a gffutils Feature of each row
+        fixed_attributes: tuple = ('seqid', 'source', 'featuretype', 'start', 'end', 'score', 'strand', 'frame', 'bin')
+        features = db.execute(f"SELECT {', '.join(f'`{field}`' for field in fixed_attributes)}, attributes FROM features")
+
+        self._sample_gff_rows(
+            rows=({**dict(zip(fixed_attributes, feature)), **{attribute_field(key): value for key, value in json.loads(feature[-1]).items()}} for feature in features),
+            fixed_attributes=fixed_attributes,
+        )
+
+    def _inspect_gff_rows(self) -> None:
+        """ Inspect a GFF file with the native reader """
 
-        fixed_attributes=('seqid', 'source', 'featuretype', 'start', 'end', 'score', 'strand', 'frame', 'bin')
+        self._sample_gff_rows(
+            rows=gff_rows(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}", compression=self.settings.get("compression")),
+            fixed_attributes=('seqid', 'source', 'featuretype', 'start', 'end', 'score', 'strand', 'frame'),
+        )
 
-        for feature_type in db.featuretypes():
-            for feature in islice(db.features_of_type(featuretype=feature_type), 5):
+    def _sample_gff_rows(self, *, rows: Iterable[dict], fixed_attributes: tuple) -> None:
+        """ Make the fields of a GFF file from a reservoir sample of five features of each featuretype, taken in one pass over rows.
+            The number of features of each featuretype, and of features with each attribute, are saved to settings["gff_summary"] """
+
+        # Seeded with the file so inspecting it again picks the same features
+        randomizer = random.Random(self.id)
+        samples: dict[str, list[dict]] = {}
+        featuretypes: Counter = Counter()
+        attribute_counts: Counter = Counter()
+
+        for row in rows:
+            featuretype: str = row["featuretype"]
+            featuretypes[featuretype] += 1
+            attribute_counts.update(islice(row, len(fixed_attributes), None))
+
+            if (seen := featuretypes[featuretype]) <= 5:
+                samples.setdefault(featuretype, []).append(row)
+            elif (index := randomizer.randrange(seen)) < 5:
+                samples[featuretype][index] = row
+
+        attributes: dict = {}
+
+        # Featuretypes in sorted order, so the fields come out in the same order whichever reader found them
+        for featuretype in sorted(samples):
+            for row in samples[featuretype]:
 
                 # Get the arbitrary attributes
-                for attribute in feature.attributes:
-                    if attribute in attributes:
-                        attributes[attribute] = attributes[attribute] | set(feature.attributes[attribute])
-                    else:
-                        attributes[attribute] = set(feature.attributes[attribute])
+                for attribute in islice(row, len(fixed_attributes), None):
+                    attributes.setdefault(attribute, set()).update(row[attribute] if type(row[attribute]) is list else (row[attribute],))
 
                 # Get the fixed attributes
                 for attribute in fixed_attributes:
                     if attribute in attributes:
-                        attributes[attribute].add(getattr(feature, attribute))
-                    elif getattr(feature, attribute) is not None:
-                        attributes[attribute] = set([getattr(feature, attribute)])
+                        attributes[attribute].add(row[attribute])
+                    elif row[attribute] is not None:
+                        attributes[attribute] = set([row[attribute]])
+
+        self.settings["gff_summary"] = {
+            "features": featuretypes.total(),
+            "featuretypes": dict(featuretypes.most_common()),
+            "attributes": dict(attribute_counts.most_common()),
+        }
+        self.save(update_fields=["settings"])
 
         # Remove any existing fields
         self.fields.all().delete()
@@ -1269,14 +2152,119 @@ class ImportSchemeFile(ImportBaseModel):
         self.set_status_by_name('Inspected')
         self.save(update_fields=["status"])
 
+    def _rows_from_gff_stream(self, *, featuretypes: list[str]=None) -> Generator[dict[str, any]|str, None, None]:
+        """ Yields the rows of a GFF file with the native reader, parsing it in GFF_Parse_Workers processes if it isn't compressed.
+            If featuretypes is given only the featuretype of features of other featuretypes is yielded """
+
+        workers: int = settings.ML_IMPORT_WIZARD.get("GFF_Parse_Workers", 1)
+        featuretypes: set = set(featuretypes) if featuretypes is not None else None
+
+        if workers > 1 and not self.settings.get("compression"):
+            return gff_rows_parallel(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}", workers=workers, featuretypes=featuretypes)
+
+        return gff_rows(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}", compression=self.settings.get("compression"), featuretypes=featuretypes)
+
+    def _create_gff_db(self) -> object:
+        """ Build the gffutils DB for the file in a .tmp file, or in memory and then backed up to it, and rename it into place so a build that's killed never leaves a .db.
+        The importer settings gff_disable_inference, gff_memory_build and gff_bulk_pragmas tune the build """
+
+        db_file_name: str = f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db"
+        importer_settings: dict = self.import_scheme.importer_object.settings
+        memory_build: bool = bool(importer_settings.get("gff_memory_build"))
+        pragmas: dict = dict(gffutils.constants.default_pragmas)
+
+        # The .tmp file is thrown away if the build doesn't finish, so it doesn't need a journal or syncs
+        if importer_settings.get("gff_bulk_pragmas"):
+            pragmas.update({"synchronous": "OFF", "journal_mode": "OFF", "main.cache_size": -262144, "temp_store": "MEMORY"})
+
+        if os.path.exists(f"{db_file_name}.tmp"):
+            os.remove(f"{db_file_name}.tmp")
+
+        db = gffutils.create_db(
+            self._gff_features(),
+            ":memory:" if memory_build else f"{db_file_name}.tmp",
+            merge_strategy="create_unique",
+            force=True,
+            pragmas=pragmas,
+            disable_infer_genes=bool(importer_settings.get("gff_disable_inference")),
+            disable_infer_transcripts=bool(importer_settings.get("gff_disable_inference")),
+        )
+
+        if memory_build:
+            with closing(sqlite3.connect(f"{db_file_name}.tmp")) as connection:
+                db.conn.backup(connection)
+
+        db.conn.close()
+        os.replace(f"{db_file_name}.tmp", db_file_name)
+
+        return gffutils.FeatureDB(db_file_name)
+
+    def _gff_features(self) -> Generator:
+        """ Yields gffutils Features from the GFF file the way gffutils reads it: comments are skipped, the FASTA section ends it, and the dialect is chosen from the first features.
+        Compressed files are decompressed as they're read, and the features and bytes read so far are saved in the inspect_progress setting """
+
+        file_name: str = f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}"
+        file_size: int = os.path.getsize(file_name)
+
+        def feature_lines(file) -> Generator[str, None, None]:
+            for line in file:
+                line = line.decode().rstrip("\n\r")
+
+                if line == "##FASTA" or line.startswith(">"):
+                    return
+
+                if line.startswith("#") or not line:
+                    continue
+
+                yield line
+
+        with open(file_name, "rb") as raw_file, open_file(raw_file, self.settings.get("compression")) as file:
+            lines: Generator = feature_lines(file)
+            first_lines: list[str] = list(islice(lines, 11))
+            # gffutils' public DataIterator chooses the dialect from the first features, the same way it does when it reads the file itself
+            dialect: dict = gffutils.iterators.DataIterator("\n".join(first_lines), from_string=True, checklines=len(first_lines)).dialect if first_lines else None
+
+            count: int = 0
+
+            for count, line in enumerate(chain(first_lines, lines), 1):
+                yield gffutils.feature.feature_from_line(line, dialect=dialect)
+
+                if count % 10000 == 0:
+                    self._save_inspect_progress(progress={"features": count, "bytes_read": raw_file.tell(), "bytes": file_size})
+
+            self._save_inspect_progress(progress={"features": count, "bytes_read": file_size, "bytes": file_size})
+
+    def _save_inspect_progress(self, *, progress: dict) -> None:
+        """ Save progress in the inspect_progress setting """
+
+        self._save_settings(update=lambda file_settings: file_settings.update(inspect_progress=progress))
+        self.settings["inspect_progress"] = progress
+
+    def _save_settings(self, *, update: Callable[[dict], None]) -> dict:
+        """ Apply update to a fresh copy of the settings, locked while it's saved, and return the copy.
+        Settings saved by another process since the file was loaded, like during an inspection or a parallel import, aren't overwritten """
+
+        with transaction.atomic():
+            file_settings: dict = ImportSchemeFile.objects.select_for_update().values_list("settings", flat=True).get(pk=self.pk)
+            update(file_settings)
+            ImportSchemeFile.objects.filter(pk=self.pk).update(settings=file_settings)
+
+        return file_settings
+
     def _confirm_file_is_ready(self, *, ignore_status: bool = False, preinspected: bool = False, inspected: bool = False) -> None:
         """ Make sure that the file is ready to operate on """
 
-        if self.type.lower() in  ("gff", "gff3"):
+        if self.type.lower() in  ("gff", "gff3") and self.gff_reader == "gffutils":
             # Gffutils is not installed
             if (NO_GFFUTILS):
                 raise GFFUtilsNotInstalledError("gfutils is not installed: The file can't be inspected because GFFUtils is not installed. (pip install gffutils)")
 
+        if self.settings.get("compression") == "zstd" and NO_ZSTANDARD:
+            raise FileNotReadyError(f"zstandard is not installed: {self} can't be decompressed. (pip install zstandard)")
+
+        if self.settings.get("compression") and self.base_type == "excel":
+            raise FileNotReadyError(f"Compressed Excel files can't be read, Excel files are already compressed: {self}")
+
         if not ignore_status and self.status.uploaded == False:
             raise FileNotReadyError(f'File not marked as saved: {self} ({settings.ML_IMPORT_WIZARD["Working_Files_Dir"]}{self.file_name})')
 
@@ -1292,22 +2280,33 @@ class ImportSchemeFile(ImportBaseModel):
         if not ignore_status and inspected and self.status.inspected == False:
             raise FileNotReadyError(f'File has not been inspected: {self} ({settings.ML_IMPORT_WIZARD["Working_Files_Dir"]}{self.file_name})')
 
-        if self.type.lower() in  ("gff", "gff3"):
+        if self.type.lower() in  ("gff", "gff3") and self.gff_reader == "gffutils":
             if not ignore_status and inspected and not os.path.exists(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db"):
                 raise FileNotReadyError(f"DB file is missing from disk: {self} ({settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db)")
     
     def _create_db_from_tabular_file(self, *, replace_file: bool = False) -> None:
-        """ Build a SQLite3 DB for inspecting and importing the file """
+        """ Build a SQLite3 DB for inspecting and importing the file.  The DB is built in a .tmp file with bulk load pragmas, then renamed into place """
 
-        if os.path.isfile(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db") and os.stat(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db").st_size:
-            if replace_file:
-                os.remove(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db")
-            else:
-                raise FileExistsError(f"SQLite3 DB already exists: {settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db")
+        db_file_name: str = f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.db"
+
+        if os.path.isfile(db_file_name) and os.stat(db_file_name).st_size and not replace_file:
+            raise FileExistsError(f"SQLite3 DB already exists: {db_file_name}")
 
         self.settings["has_db"] = False
+        self.settings["has_arrow"] = False
+        self.settings["indexes"] = []
+
+        if os.path.isfile(f"{db_file_name}.tmp"):
+            os.remove(f"{db_file_name}.tmp")
 
-        connection = self._get_db_connection()
+        connection = sqlite3.connect(f"{db_file_name}.tmp")
+
+        # Nothing needs to survive a crash until the rename, so skip the journal and syncs
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.execute("PRAGMA locking_mode = EXCLUSIVE")
+        connection.execute("PRAGMA temp_store = MEMORY")
+        connection.execute("PRAGMA cache_size = -262144")
 
         columns: list = self.header_fields()
         sql: str = ""
@@ -1321,16 +2320,46 @@ class ImportSchemeFile(ImportBaseModel):
         connection.execute(f"CREATE TABLE data({column_list})")
 
         sql = f"INSERT INTO data VALUES({', '.join(['?' for column in columns])})"
-        for row in self._rows_from_file():
-            connection.execute(sql, row)
+        for chunk in self._tabular_chunks():
+            connection.executemany(sql, chunk[columns].itertuples(index=False, name=None))
 
         connection.commit()
+        connection.close()
+
+        os.replace(f"{db_file_name}.tmp", db_file_name)
 
         self.settings["has_db"] = True
         self.save(update_fields=["settings"])
 
-        return connection
+        return self._get_db_connection()
     
+    def _create_arrow_from_tabular_file(self) -> None:
+        """ Stage the file in an Arrow IPC file of string columns.  The file is written to a .tmp file, then renamed into place """
+
+        arrow_file_name: str = f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.file_name}.arrow"
+
+        self.settings["has_db"] = False
+        self.settings["has_arrow"] = False
+
+        if hasattr(self, "_arrow"):
+            del self._arrow
+
+        if hasattr(self, "_arrow_keys"):
+            del self._arrow_keys
+
+        columns: list = self.header_fields()
+        schema = pyarrow.schema([(column, pyarrow.string()) for column in columns])
+
+        with pyarrow.OSFile(f"{arrow_file_name}.tmp", "wb") as sink, pyarrow.ipc.new_file(sink, schema) as writer:
+            for chunk in self._tabular_chunks():
+                writer.write_batch(pyarrow.RecordBatch.from_pandas(chunk[columns], schema=schema, preserve_index=False))
+
+        os.replace(f"{arrow_file_name}.tmp", arrow_file_name)
+
+        self.settings["has_arrow"] = True
+        self.settings["indexes"] = []
+        self.save(update_fields=["settings"])
+
     def _get_db_connection(self) -> None:
         """ Returns a SQLite3 connection for loading or reading data """
 
@@ -1406,6 +2435,23 @@ class ImportSchemeRowRejected(ImportBaseModel):
         return f"Rejected row for {self.model}"
 
 
+class ImportSignature(ImportBaseModel):
+    """ Holds the content signature of an imported object, so identical objects can be found with one indexed lookup """
+
+    model = models.CharField(max_length=255, null=False)
+    signature = models.CharField(max_length=32, null=False)
+    pkey_int = models.BigIntegerField(null=True)
+    pkey_str = models.TextField(null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["model", "signature"])]
+
+    @property
+    def name(self) -> str:
+        """ Custom name for ImportSignature """
+        return f"Signature for {self.model}"
+
+
 class ImportSchemeRowDeferred(ImportBaseModel):
     """ Holds refrences to rows that have been deferred for approval """
     
@@ -1413,4 +2459,13 @@ class ImportSchemeRowDeferred(ImportBaseModel):
     model = models.TextField(max_length=255, null=False)
     pkey_name = models.CharField(max_length=255, default="pk", null=False)
     pkey_int = models.IntegerField(null=True)
-    pkey_str = models.TextField(null=True)
\ No newline at end of file
+    pkey_str = models.TextField(null=True)
+
+
+def execute_range(*, import_scheme_id: int, offset_count: int, limit_count: int, options: dict, featuretypes: list[str]=None) -> Counter:
+    """ Import a range of rows of an ImportScheme, or the features of some featuretypes of its GFF file, in a worker process.  Returns the counts for the range """
+
+    try:
+        return ImportScheme.objects.get(pk=import_scheme_id)._execute_range(offset_count=offset_count, limit_count=limit_count, featuretypes=featuretypes, lock_identities=True, **options)
+    finally:
+        connections.close_all()
@@ -1,18 +1,33 @@
 import logging
 log = logging.getLogger('test')
 
-import json
+import os, json, datetime, sqlite3, psutil
 from http import HTTPStatus
 
 from django.test import TestCase, TransactionTestCase, SimpleTestCase
 from django.contrib.auth.models import User
 from django.conf import settings
-
-from unittest import skipIf
-
-from .models import ImportScheme, ImportSchemeFile
-from .utils.simple import dict_hash, sound_user_name, split_by_caps, stringalize, mached_name_choices, fancy_name, resolve_true, deep_exists
+from django.db import connection, models, IntegrityError, OperationalError
+
+from unittest import skipIf, mock
+from types import SimpleNamespace
+from contextlib import closing
+from functools import partial
+from collections import Counter
+from concurrent.futures import Future
+
+from .models import ImportScheme, ImportSchemeFile, ImportSchemeRowDeferred, ImportSchemeRowRejected, NO_PYARROW, NO_GFFUTILS
+from .exceptions import IdentityLockBusy
+from .utils.simple import dict_hash, lock_id, sound_user_name, split_by_caps, stringalize, mached_name_choices, fancy_name, resolve_true, deep_exists
 from .utils.cache import LRUCacheThing
+from .utils.writers import BulkWriter, copy_text, missing_key_values
+from .utils.identity import IdentityIndex, NOT_INDEXED
+from .utils.signatures import ContentSignatures
+from .utils.plan import RowPlan, RowContext, joined_column
+from .utils.dates import DateParser, infer_date_format
+from .utils.excel import excel_header, excel_value
+from .utils.compression import split_compression
+from .utils.gff import gff_row
 
 class InclusionTest(TestCase):
     ''' A test to make sure the Import Wizard app is being included '''
@@ -99,6 +114,28 @@ class ModelTests(TestCase):
 
         self.assertEqual(self.import_scheme.items.count(), 2)
 
+    def test_import_scheme_row_plan_should_be_cached_until_an_item_changes(self):
+        """ import_scheme.row_plan() should return the cached plan until an item is added or updated """
+        row_plan = self.import_scheme.row_plan()
+        self.assertIs(row_plan, self.import_scheme.row_plan())
+
+        self.import_scheme.create_or_update_item(app="app", model= "model", field="field", strategy="raw_text", settings={"text": "this thing"})
+        self.assertIsNot(row_plan, self.import_scheme.row_plan())
+
+    def test_import_scheme_row_plan_should_be_rebuilt_when_a_file_changes(self):
+        """ import_scheme.row_plan() should compile a new plan when a file's fields or settings change """
+        row_plan = self.import_scheme.row_plan()
+
+        self.import_file_1.import_fields(fields={"name": {"a", "b"}})
+        self.assertIsNot(row_plan, self.import_scheme.row_plan())
+
+        row_plan = self.import_scheme.row_plan()
+        self.assertIn("name", [name for file_id, name in row_plan.file_fields.values()])
+
+        self.import_file_1.settings["date_formats"] = {"name": "%Y-%m-%d"}
+        self.import_file_1.save()
+        self.assertIsNot(row_plan, self.import_scheme.row_plan())
+
 
 class LRUCacheThingsTests(TestCase):
     """ Tests of the LRUCacheThing """
@@ -146,6 +183,863 @@ class LRUCacheThingsTests(TestCase):
         self.assertEqual(self.cache.count, 2)
         self.assertEqual(self.cache.transaction_count, 0)
 
+    def test_cache_savepoint_rollback_only_removes_things_stored_after_the_savepoint(self):
+        """ Cache should keep transaction things stored before a savepoint when the savepoint is rolled back """
+        self.cache.savepoint()
+        self.cache.store(key="savepoint", value="savepoint test1", transaction=True)
+        self.cache.store(key="transaction", value="transaction test2", transaction=True)
+        self.cache.savepoint_rollback()
+
+        self.assertIs(self.cache.find(key="savepoint"), None)
+        self.assertEqual(self.cache.find(key="transaction"), "transaction test1")
+
+    def test_cache_savepoint_commit_keeps_things_for_the_enclosing_savepoint(self):
+        """ Cache should roll back a committed inner savepoint when the outer savepoint is rolled back """
+        self.cache.savepoint()
+        self.cache.savepoint()
+        self.cache.store(key="savepoint", value="savepoint test1", transaction=True)
+        self.cache.savepoint_commit()
+
+        self.assertEqual(self.cache.find(key="savepoint"), "savepoint test1")
+
+        self.cache.savepoint_rollback()
+        self.assertIs(self.cache.find(key="savepoint"), None)
+
+class BulkWriterTests(TestCase):
+    ''' Tests for the BulkWriter '''
+
+    def test_copy_text_escapes_values_for_copy_text_format(self):
+        """ copy_text should escape backslashes, tabs and newlines, write None as \\N, and refuse values COPY can't take """
+        self.assertEqual(copy_text("a\tb\nc\\d"), "a\\tb\\nc\\\\d")
+        self.assertEqual(copy_text("line\r\n"), "line\\r\\n")
+        self.assertEqual(copy_text("\\N"), "\\\\N")
+        self.assertEqual(copy_text(""), "")
+        self.assertEqual(copy_text(None), "\\N")
+        self.assertEqual(copy_text(True), "t")
+        self.assertEqual(copy_text(False), "f")
+        self.assertEqual(copy_text(0), "0")
+        self.assertEqual(copy_text(datetime.date(2020, 1, 2)), "2020-01-02")
+        self.assertIs(copy_text({"a": 1}), None)
+        self.assertIs(copy_text(["a"]), None)
+        self.assertIs(copy_text(b"a"), None)
+
+    @skipIf("Genome" not in settings.ML_IMPORT_WIZARD["Importers"], "Don't include model tests")
+    def test_missing_key_values_only_returns_key_values_that_arent_saved(self):
+        """ missing_key_values should find the saved key/values of every parent in one query, and of a null parent in another, and return the rest in order """
+        import_schemes = [ImportScheme(name=f"Test Importer {number}", importer="Genome") for number in range(2)]
+
+        for import_scheme in import_schemes:
+            import_scheme.save()
+
+        # ImportSchemeRowDeferred stands in for a key/value model, with import_scheme as the parent, model as the key and pkey_str as the value
+        def field(name: str, **kind) -> SimpleNamespace:
+            return SimpleNamespace(field=ImportSchemeRowDeferred._meta.get_field(name), **{"is_foreign_key": False, "is_key_field": False, "is_value_field": False, **kind})
+
+        model = SimpleNamespace(model=ImportSchemeRowDeferred, fields=[field("import_scheme", is_foreign_key=True), field("model", is_key_field=True), field("pkey_str", is_value_field=True), field("pkey_int")])
+
+        for import_scheme, key, value in ((import_schemes[0], "a", "1"), (import_schemes[1], "b", "2"), (None, "a", "1")):
+            ImportSchemeRowDeferred(import_scheme=import_scheme, model=key, pkey_str=value).save()
+
+        instances = [
+            ImportSchemeRowDeferred(import_scheme=import_scheme, model=key, pkey_str=value)
+            for import_scheme, key, value in ((import_schemes[0], "a", "1"), (import_schemes[0], "a", "2"), (import_schemes[0], "b", "2"), (import_schemes[1], "b", "2"), (import_schemes[1], "c", "3"), (None, "a", "1"), (None, "b", "2"))
+        ]
+
+        with self.assertNumQueries(2):
+            missing = missing_key_values(model, instances)
+
+        self.assertEqual([instances[index] for index in (1, 2, 4, 6)], missing)
+
+    @skipIf(connection.vendor != "postgresql", "COPY needs PostgreSQL")
+    def test_copy_leaf_models_saves_the_same_rows_as_bulk_create(self):
+        """ Instances saved with COPY should read back the same as instances saved with bulk_create """
+        import_scheme = ImportScheme(name="Test Importer", importer="Genome")
+        import_scheme.save()
+
+        model = SimpleNamespace(name="ImportSchemeRowDeferred", model=ImportSchemeRowDeferred, settings={}, is_key_value=False)
+        values = [("Feature", 1, None), ("Feature", None, "tab\there"), ("Feature", None, "new\nline \\N")]
+
+        for copy_leaf_models in (False, True):
+            writer = BulkWriter(models=[model], copy_leaf_models=copy_leaf_models)
+
+            for name, pkey_int, pkey_str in values:
+                writer.add(model, ImportSchemeRowDeferred(import_scheme=import_scheme, model=name, pkey_int=pkey_int, pkey_str=pkey_str))
+
+            writer.flush()
+
+        rows = list(ImportSchemeRowDeferred.objects.order_by("id").values_list("import_scheme", "model", "pkey_name", "pkey_int", "pkey_str"))
+        self.assertEqual(rows[:3], rows[3:])
+
+
+def plan_column(name: str, strategy: str, item_settings: dict, field_settings: dict={}, *, model: SimpleNamespace=None) -> dict:
+    ''' A column of a RowPlan, with stand-ins for its scheme item, importer field and importer model '''
+
+    return {
+        "name": name,
+        "column_name": name,
+        "import_scheme_item": SimpleNamespace(strategy=strategy, settings=item_settings),
+        "importer_field": SimpleNamespace(settings=field_settings, is_date=False),
+        "importer_model": model or SimpleNamespace(name="Feature", settings={"restriction": "rejected"}, is_key_value=False),
+    }
+
+
+class RowPlanTests(TestCase):
+    ''' Tests for the RowPlan '''
+
+    def test_block_rows_are_the_same_as_rows(self):
+        """ Building rows in blocks with pandas should give the same rows, and rejections, as building them one at a time """
+        key_value_model = SimpleNamespace(name="FeatureAttribute", settings={}, is_key_value=True)
+
+        columns = [
+            plan_column("strand", "File Field", {"key": 1}, {"translate_values": {"+": "f"}, "force_case": "upper", "approved_values": ["F", "R"]}),
+            plan_column("version", "Split Field", {"split_key": 2, "splitter": "|", "splitter_position": 2}),
+            plan_column("type", "Select First", {"first_keys": [3, 1]}),
+            plan_column("source", "Raw Text", {"raw_text": "NULL"}),
+            {"name": "FeatureAttribute (key-value)", "column_name": "FeatureAttribute (key-value)", "import_scheme_item": SimpleNamespace(strategy="Key Value", settings={"note": {"key": 3}}), "importer_model": key_value_model},
+        ]
+        rows = [
+            {"strand": "+", "version": "a|1", "type": "gene"},
+            {"strand": "r", "version": "b", "type": ""},
+            {"strand": "x", "version": None, "type": "null"},
+            {"strand": None, "version": "c|2|3", "type": None},
+        ]
+
+        plan = RowPlan(columns=columns, primary_file_id=1, child_links={}, file_fields={1: (1, "strand"), 2: (1, "version"), 3: (1, "type")})
+
+        self.assertEqual(
+            list(plan.rows(rows=rows, context=RowContext(plan=plan, child_files={}), block_size=3)),
+            list(plan.rows(rows=rows, context=RowContext(plan=plan, child_files={}))),
+        )
+
+    def test_block_rows_are_the_same_as_rows_for_multi_valued_fields(self):
+        """ Fields that hold lists, like GFF attributes with more than one value, should be built the same way in blocks as one row at a time """
+        columns = [
+            plan_column("parent", "File Field", {"key": 1}, {"translate_values": {"g3": "g2"}, "force_case": "lower", "approved_values": ["g1", "g2"]}),
+            plan_column("name", "Select First", {"first_keys": [2, 1]}),
+            plan_column("note", "Split Field", {"split_key": 2, "splitter": "|", "splitter_position": 1}),
+        ]
+        rows = [
+            {"Parent": "g1", "Alias": "a|b"},
+            {"Parent": ["g1", "g2"], "Alias": []},
+            {"Parent": "null", "Alias": ["x", "y"]},
+            {"Parent": "G3", "Alias": None},
+        ]
+
+        plan = RowPlan(columns=columns, primary_file_id=1, child_links={}, file_fields={1: (1, "Parent"), 2: (1, "Alias")})
+        block_rows = list(plan.rows(rows=rows, context=RowContext(plan=plan, child_files={}), block_size=4))
+
+        self.assertEqual(block_rows, list(plan.rows(rows=rows, context=RowContext(plan=plan, child_files={}))))
+        self.assertEqual(["g1", "g2"], block_rows[1]["parent"])
+        self.assertEqual([{"parent": ["g1", "g2"]}], block_rows[1]["***row***setting***"]["reject_row"])
+
+    def test_primary_field_approval_matches_the_rejections_of_rows(self):
+        """ Values should be approved after they're translated and cased the way the rows that have them would be """
+        model = SimpleNamespace(name="FeatureType", settings={"restriction": "rejected"}, is_key_value=False)
+        columns = [plan_column("type", "File Field", {"key": 1}, {"translate_values": {"mRNA": "transcript"}, "force_case": "lower", "approved_values": ["gene", "transcript"]}, model=model)]
+
+        plan = RowPlan(columns=columns, primary_file_id=1, child_links={}, file_fields={1: (1, "featuretype"), 2: (1, "seqid")})
+        approval = plan.primary_field_approval("featuretype")
+
+        self.assertEqual([value for value in ["gene", "GENE", "mRNA", "exon", "null"] if approval(value)], ["gene", "GENE", "mRNA"])
+        self.assertIsNone(plan.primary_field_approval("seqid"))
+
+
+class DateParserTests(TestCase):
+    ''' Tests for the DateParser '''
+
+    def test_infer_date_format_returns_a_format_only_if_it_matches_every_value(self):
+        """ infer_date_format should find the format all the values share, and None if they don't share one """
+        self.assertEqual(infer_date_format({"2020-01-02", "2021-12-31", None}), "%Y-%m-%d")
+        self.assertEqual(infer_date_format({"1/2/2020", "12/31/2021"}), "%m/%d/%Y")
+        self.assertIs(infer_date_format({"2020-01-02", "12/31/2021"}), None)
+        self.assertIs(infer_date_format({"gene", "exon"}), None)
+
+    def test_date_parser_falls_back_to_dateutil_for_values_that_dont_match(self):
+        """ Values that don't match the format should still parse to the same date as dateutil """
+        date_parser = DateParser(formats=["%m/%d/%Y"])
+
+        self.assertEqual(date_parser.parse("1/2/2020"), "2020-01-02")
+        self.assertEqual(date_parser.parse("13/2/2020"), "2020-02-13")
+        self.assertEqual(date_parser.parse("2020-03-04 10:11:12"), "2020-03-04")
+
+
+class ExcelTests(TestCase):
+    ''' Tests for the streaming Excel reader '''
+
+    def test_excel_header_names_columns_like_pandas(self):
+        """ Blank header cells should be Unnamed: n and repeated names should get .n added """
+        self.assertEqual(excel_header(["name", None, "name", "name"]), ["name", "Unnamed: 1", "name.1", "name.2"])
+
+    def test_excel_value_returns_strings(self):
+        """ Empty cells should be None and whole numbers shouldn't keep Excel's .0 """
+        self.assertIs(excel_value(""), None)
+        self.assertEqual(excel_value(5.0), "5")
+        self.assertEqual(excel_value(5.5), "5.5")
+        self.assertEqual(excel_value(datetime.date(2020, 1, 2)), "2020-01-02 00:00:00")
+
+
+class CompressionTests(TestCase):
+    ''' Tests for compressed uploads '''
+
+    def test_split_compression_types_files_by_the_suffix_before_the_compression(self):
+        """ A compression suffix should be split off so the file is typed by the suffix before it """
+        self.assertEqual(split_compression("features.gff3.gz"), ("gff3", "gzip"))
+        self.assertEqual(split_compression("variants.TSV.BZ2"), ("TSV", "bz2"))
+        self.assertEqual(split_compression("table.csv"), ("csv", None))
+        self.assertEqual(split_compression("archive.gz"), ("", "gzip"))
+
+
+class GFFReaderTests(TestCase):
+    ''' Tests for the native GFF reader '''
+
+    def test_gff_row_is_shaped_like_a_gffutils_feature_row(self):
+        """ Coordinates should be ints, attributes with one value should be a value, and values should be split and unquoted like gffutils does """
+        self.assertEqual(
+            gff_row("chr1\tsrc\tmRNA\t1\t100\t.\t+\t.\tID=m1;Parent=g1,g2;Note=kinase, subunit 1;Alias=a%3Bb;flag"),
+            {"seqid": "chr1", "source": "src", "featuretype": "mRNA", "start": 1, "end": 100, "score": ".", "strand": "+", "frame": ".",
+             "ID": "m1", "Parent": ["g1", "g2"], "Note": "kinase, subunit 1", "Alias": "a;b", "flag": []},
+        )
+
+    def test_attributes_named_like_a_column_should_not_replace_it(self):
+        """ Attributes like source or score should be kept under a prefixed name, next to the column of the same name """
+        self.assertEqual(
+            gff_row("chr1\tsrc\tgene\t1\t100\t.\t+\t.\tID=g1;source=RefSeq;score=1,2;bin=7"),
+            {"seqid": "chr1", "source": "src", "featuretype": "gene", "start": 1, "end": 100, "score": ".", "strand": "+", "frame": ".",
+             "ID": "g1", "attribute_source": "RefSeq", "attribute_score": ["1", "2"], "attribute_bin": "7"},
+        )
+
+    @skipIf("Genome" not in settings.ML_IMPORT_WIZARD["Importers"], "Don't include model tests")
+    def test_gff_inspection_keeps_attributes_named_like_a_column(self):
+        """ A source attribute should be a field of its own, sampled and counted apart from the source column """
+        import_scheme = ImportScheme(name="Test Importer", importer="Genome")
+        import_scheme.save()
+        import_file = ImportSchemeFile(name="test.gff3", import_scheme=import_scheme)
+        import_file.save()
+
+        rows = (gff_row(f"chr1\tsrc\tgene\t{number}\t{number + 1}\t.\t+\t.\tID=f{number};source=RefSeq") for number in range(1, 4))
+        import_file._sample_gff_rows(rows=rows, fixed_attributes=('seqid', 'source', 'featuretype', 'start', 'end', 'score', 'strand', 'frame'))
+
+        self.assertEqual({"ID": 3, "attribute_source": 3}, import_file.settings["gff_summary"]["attributes"])
+        self.assertEqual(("src", "RefSeq"), (import_file.fields.get(name="source").sample, import_file.fields.get(name="attribute_source").sample))
+
+    @skipIf("Genome" not in settings.ML_IMPORT_WIZARD["Importers"], "Don't include model tests")
+    def test_gff_inspection_samples_five_features_of_each_featuretype_in_one_pass(self):
+        """ Every feature should be counted, but only five of each featuretype should be sampled for the fields """
+        import_scheme = ImportScheme(name="Test Importer", importer="Genome")
+        import_scheme.save()
+        import_file = ImportSchemeFile(name="test.gff3", import_scheme=import_scheme)
+        import_file.save()
+
+        rows = (gff_row(f"chr1\tsrc\t{'gene' if number % 3 else 'exon'}\t{number}\t{number + 1}\t.\t+\t.\tID=f{number}{';Note=n' if number < 10 else ''}") for number in range(1, 301))
+        import_file._sample_gff_rows(rows=rows, fixed_attributes=('seqid', 'source', 'featuretype', 'start', 'end', 'score', 'strand', 'frame'))
+
+        self.assertEqual(import_file.settings["gff_summary"], {"features": 300, "featuretypes": {"gene": 200, "exon": 100}, "attributes": {"ID": 300, "Note": 9}})
+        self.assertEqual(len(import_file.fields.get(name="ID").sample.split(", ")), 10)
+
+    @skipIf("Genome" not in settings.ML_IMPORT_WIZARD["Importers"], "Don't include model tests")
+    def test_gff_db_offset_and_limit_are_read_as_a_range_of_rowids(self):
+        """ Offsets and limits should give the same rows whether or not the rowids of the features have gaps """
+        import_scheme = ImportScheme(name="Test Importer", importer="Genome")
+        import_scheme.save()
+        import_file = ImportSchemeFile(name="test.gff3", import_scheme=import_scheme, settings={"gff_reader": "gffutils"})
+        import_file.save()
+
+        db_file_name = f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{import_file.file_name}.db"
+        self.addCleanup(os.remove, db_file_name)
+
+        with closing(sqlite3.connect(db_file_name)) as db:
+            db.execute("CREATE TABLE features (id text, seqid text, source text, featuretype text, start int, end int, score text, strand text, frame text, attributes text, extra text, bin int, primary key (id))")
+            db.executemany("INSERT INTO features VALUES (?, 'chr1', 'src', 'gene', ?, ?, '.', '+', '.', ?, '[]', 1)", [(f"g{number}", number, number + 1, json.dumps({"ID": [f"g{number}"]})) for number in range(1, 21)])
+            db.commit()
+
+            for gaps in (False, True):
+                if gaps:
+                    db.execute("DELETE FROM features WHERE rowid % 3 = 0")
+                    db.commit()
+
+                ids = [row[0] for row in db.execute("SELECT id FROM features ORDER BY rowid")]
+
+                for offset_count, limit_count in ((0, None), (2, 5), (len(ids) - 2, 5), (len(ids), 5)):
+                    rowids = import_file._gff_rowid_range(limit_count=limit_count, offset_count=offset_count)
+                    rows = list(import_file._rows_from_gff_db(start_rowid=rowids[0], end_rowid=rowids[1])) if rowids else []
+                    self.assertEqual([row["ID"] for row in rows], ids[offset_count:offset_count + limit_count if limit_count else None])
+
+                self.assertEqual(import_file.settings["gff_rowids"]["contiguous"], not gaps)
+
+
+@skipIf("Genome" not in settings.ML_IMPORT_WIZARD["Importers"], "Don't include model tests")
+class TabularFileTests(TestCase):
+    ''' Tests for reading csv/tsv files and their staging files '''
+
+    def setUp(self):
+        ''' Write a small csv file, with a quoted value that spans lines and a blank line '''
+
+        import_scheme = ImportScheme(name="Test Importer", importer="Genome")
+        import_scheme.save()
+        self.import_file = ImportSchemeFile(name="test.csv", import_scheme=import_scheme)
+        self.import_file.save()
+
+        self.file_name = f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.import_file.file_name}"
+
+        with open(self.file_name, "w") as file:
+            file.write('id,name,empty\n1,a,\n2,"b\nb",\n\n3,c,\n4,d,\n5,e,\n6,f,\n7,c,\n')
+
+        for suffix in ("", ".meta.json", ".db", ".arrow"):
+            self.addCleanup(lambda file_name: os.path.exists(file_name) and os.remove(file_name), f"{self.file_name}{suffix}")
+
+    def read(self, **kwargs) -> list[dict]:
+        ''' Read rows through a fresh copy of the file, so nothing read before is cached '''
+        return [dict(row) for row in ImportSchemeFile.objects.get(pk=self.import_file.pk).rows(**kwargs)]
+
+    def test_every_path_should_read_the_same_rows_for_an_offset(self):
+        """ The file, the file read from its sidecar's offsets, and each staging file should all skip offset_count rows """
+        expected = [{"id": "4", "name": "d"}, {"id": "5", "name": "e"}]
+
+        with mock.patch.dict(settings.ML_IMPORT_WIZARD, {"Row_Offset_Interval": 2}):
+            self.assertEqual(expected, self.read(offset_count=3, limit_count=2))
+
+            meta = self.import_file._write_file_meta()
+            self.assertEqual((7, ["id", "name"]), (meta["row_count"], meta["columns"]))
+            self.assertEqual(4, len(meta["offsets"]))
+            self.assertEqual(expected, self.read(offset_count=3, limit_count=2))
+            self.assertEqual([{"id": "2", "name": "b\nb"}, {"id": "5", "name": "e"}], self.read(specific_rows=[1, 4]))
+
+            self.import_file._create_db_from_tabular_file(replace_file=True)
+            self.assertEqual(expected, self.read(offset_count=3, limit_count=2))
+
+            if not NO_PYARROW:
+                self.import_file._create_arrow_from_tabular_file()
+                self.assertEqual(expected, self.read(offset_count=3, limit_count=2))
+
+    def test_the_file_should_be_read_in_bounded_chunks_of_strings(self):
+        """ Files are read Read_Chunk_Size rows at a time, with every value a str or None, and rows() yields the same rows as the chunks """
+
+        with mock.patch.dict(settings.ML_IMPORT_WIZARD, {"Read_Chunk_Size": 3}):
+            chunks = list(self.import_file._tabular_chunks())
+
+            self.assertEqual([3, 3, 1], [len(chunk.index) for chunk in chunks])
+            self.assertEqual({str, type(None)}, {type(value) for chunk in chunks for value in chunk.to_numpy().flat})
+            self.assertEqual([{"id": "2", "name": "b\nb", "empty": None}, {"id": "3", "name": "c", "empty": None}], chunks[0].iloc[1:].to_dict("records"))
+            self.assertEqual([{"id": id, "name": name} for chunk in chunks for id, name in zip(chunk["id"], chunk["name"])], self.read())
+
+    def test_staged_files_should_take_their_row_count_and_columns_from_the_sidecar(self):
+        """ Staged text files read their row count and columns from the sidecar, and from the staging once the file has changed since the sidecar was written """
+        self.import_file._write_file_meta()
+        self.import_file._create_db_from_tabular_file(replace_file=True)
+
+        with mock.patch.object(ImportSchemeFile, "_get_db_connection", side_effect=AssertionError("The DB was read")), \
+                mock.patch("sqlite3.connect", side_effect=AssertionError("The DB was read")):
+            import_file = ImportSchemeFile.objects.get(pk=self.import_file.pk)
+            self.assertEqual((7, ["id", "name"]), (import_file.row_count, import_file.header_fields()))
+
+        os.utime(self.file_name, ns=(0, 0))
+
+        import_file = ImportSchemeFile.objects.get(pk=self.import_file.pk)
+        self.assertEqual((7, ["id", "name"]), (import_file.row_count, import_file.header_fields()))
+
+    def test_inspection_should_stage_the_file_the_way_its_settings_ask(self):
+        """ Inspection stages the file in SQLite or Arrow, from the Staging_Format setting or the file's staging setting, through a .tmp file """
+        self.import_file.settings["first_row_header"] = True
+        self.import_file.save()
+
+        with open(f"{self.file_name}.db.tmp", "w") as file:
+            file.write("left by a killed inspection")
+
+        stagings = [("sqlite", None), ("sqlite", "arrow"), ("arrow", "sqlite")] if not NO_PYARROW else [("sqlite", None)]
+
+        for staging_format, file_staging in stagings:
+            import_file = ImportSchemeFile.objects.get(pk=self.import_file.pk)
+
+            if file_staging:
+                import_file.settings["staging"] = file_staging
+
+            with mock.patch.dict(settings.ML_IMPORT_WIZARD, {"Staging_Format": staging_format}):
+                import_file._inspect_tabular_file(ignore_status=True)
+
+            staging = file_staging or staging_format
+            import_file = ImportSchemeFile.objects.get(pk=self.import_file.pk)
+
+            self.assertEqual((staging == "sqlite", staging == "arrow"), (import_file.settings["has_db"], import_file.settings["has_arrow"]), staging)
+            self.assertEqual(7, import_file.row_count)
+            self.assertEqual(["id", "name"], sorted(import_file.fields.values_list("name", flat=True)))
+            self.assertEqual({"id": "2", "name": "b\nb"}, dict(list(import_file.rows())[1]))
+            self.assertFalse(os.path.exists(f"{self.file_name}.db.tmp") or os.path.exists(f"{self.file_name}.arrow.tmp"))
+
+    def test_execute_should_index_the_linked_fields_of_child_files(self):
+        """ The linked fields of child files are indexed by execute, not when the files are linked """
+        self.import_file._write_file_meta()
+        self.import_file._create_db_from_tabular_file(replace_file=True)
+        self.import_file.import_fields(fields={"id": set(), "name": set()})
+
+        import_scheme = self.import_file.import_scheme
+        import_scheme.settings["file_links"] = {self.import_file.id: {"child": self.import_file.fields.get(name="name").pk, "primary": 0}}
+        import_scheme.save()
+
+        with mock.patch.object(ImportScheme, "_execute_range", return_value=Counter()):
+            import_scheme.execute(ignore_status=True)
+
+        with closing(sqlite3.connect(f"{self.file_name}.db")) as db:
+            self.assertEqual([("data_name",)], db.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall())
+
+        self.assertEqual(["name"], ImportSchemeFile.objects.get(pk=self.import_file.pk).settings["indexes"])
+
+    def test_index_fields_should_not_overwrite_settings_saved_since_the_file_was_loaded(self):
+        """ Indexes are saved into a fresh copy of the settings, along with the indexes another process added """
+        self.import_file._write_file_meta()
+        self.import_file._create_db_from_tabular_file(replace_file=True)
+
+        other_copy = ImportSchemeFile.objects.get(pk=self.import_file.pk)
+        other_copy.settings["first_row_header"] = "True"
+        other_copy.save(update_fields=["settings"])
+        other_copy.index_fields(fields=["id"])
+
+        self.import_file.index_fields(fields=["name", "id"])
+
+        file_settings = ImportSchemeFile.objects.get(pk=self.import_file.pk).settings
+        self.assertEqual("True", file_settings["first_row_header"])
+        self.assertEqual(["id", "name"], file_settings["indexes"])
+        self.assertEqual(["id", "name"], self.import_file.settings["indexes"])
+
+    def test_keys_should_be_found_in_the_db_of_any_staged_file(self):
+        """ Excel files are staged in a DB like text files, so their rows should be found by key the same way """
+        self.import_file._write_file_meta()
+        self.import_file._create_db_from_tabular_file(replace_file=True)
+
+        def find(import_file: ImportSchemeFile) -> list:
+            return [
+                [dict(row) if row else row for row in (import_file.find_row_by_key(field="name", key=key) for key in ("c", "b\nb", "z"))],
+                {key: dict(row) for key, row in import_file.find_rows_by_keys(field="id", keys=["7", "2", "9"]).items()},
+            ]
+
+        expected = find(ImportSchemeFile.objects.get(pk=self.import_file.pk))
+        self.assertEqual({"id": "3", "name": "c"}, expected[0][0])
+
+        with mock.patch.object(ImportSchemeFile, "base_type", new_callable=mock.PropertyMock, return_value="excel"):
+            self.assertEqual(expected, find(ImportSchemeFile.objects.get(pk=self.import_file.pk)))
+
+    def child_file(self) -> ImportSchemeFile:
+        ''' Write a child file keyed on the name of the test file, with a key that's there twice and one that isn't in the test file '''
+
+        child_file = ImportSchemeFile(name="child.csv", import_scheme=self.import_file.import_scheme)
+        child_file.save()
+        child_file_name = f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{child_file.file_name}"
+
+        with open(child_file_name, "w") as file:
+            file.write("key,value\nc,first c\na,a\nc,second c\nz,z\n")
+
+        for suffix in ("", ".meta.json", ".db"):
+            self.addCleanup(lambda file_name: os.path.exists(file_name) and os.remove(file_name), f"{child_file_name}{suffix}")
+
+        return child_file
+
+    def test_joined_rows_should_match_the_rows_found_by_key(self):
+        """ Rows joined by SQLite should have the same child row as find_row_by_key, and the connection should be closed when the generator is """
+        child_file = self.child_file()
+
+        for import_file in (self.import_file, child_file):
+            import_file._write_file_meta()
+            import_file._create_db_from_tabular_file(replace_file=True)
+
+        child_connection = child_file._get_db_connection()
+        self.addCleanup(child_connection.close)
+        connections = []
+
+        def get_db_connection(import_file):
+            connections.append(sqlite3.connect(f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{import_file.file_name}.db"))
+            connections[-1].row_factory = sqlite3.Row
+            return connections[-1]
+
+        with mock.patch.object(ImportSchemeFile, "_get_db_connection", get_db_connection):
+            rows = self.import_file.joined_rows(links={child_file.id: (child_file, "key", "name", ["value"])})
+
+            for row in rows:
+                found = child_file.find_row_by_key(field="key", key=row["name"], connection=child_connection)
+                self.assertEqual(found["value"] if found else None, row[joined_column(child_file.id, "value")], row["name"])
+
+            rows = self.import_file.joined_rows(links={child_file.id: (child_file, "key", "name", ["value"])}, offset_count=1)
+            self.assertEqual("2", next(rows)["id"])
+            rows.close()
+
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connections[-1].execute("SELECT 1")
+
+    def test_merge_join_should_find_the_same_rows_as_prefetch(self):
+        """ Child rows merged with the primary file in key order, or prefetched when a file isn't staged for the merge, should be the ones prefetched for each block of rows """
+        child_file = self.child_file()
+        import_scheme = self.import_file.import_scheme
+        plan = RowPlan(
+            columns=[plan_column("id", "File Field", {"key": 1}), plan_column("value", "File Field", {"key": 2})],
+            primary_file_id=self.import_file.id,
+            child_links={child_file.id: ("key", "name")},
+            file_fields={1: (self.import_file.id, "id"), 2: (child_file.id, "value")},
+        )
+
+        def read(**kwargs) -> list[dict]:
+            return list(ImportScheme.objects.get(pk=import_scheme.pk).data_rows(plan=plan, **kwargs))
+
+        # A budget of a byte, so the child file never fits in memory
+        tiny_budget = 1 / 1024 / 1024
+
+        prefetched = read()
+        self.assertEqual(["a", "", "first c", "", "", "", "first c"], [row["value"] for row in prefetched])
+
+        # Only the child file is staged, so it can't be merged with the primary file
+        child_file._write_file_meta()
+        child_file._create_db_from_tabular_file(replace_file=True)
+        self.assertEqual(prefetched, read(join_budget=tiny_budget))
+
+        self.import_file._write_file_meta()
+        self.import_file._create_db_from_tabular_file(replace_file=True)
+        merged = read(join_budget=tiny_budget)
+
+        self.assertEqual(["1", "2", "3", "7", "4", "5", "6"], [row["id"] for row in merged])
+        self.assertEqual(prefetched, sorted(merged, key=lambda row: int(row["id"])))
+        self.assertEqual(prefetched, read(join_budget=1))
+
+    @skipIf(NO_PYARROW, "pyarrow isn't installed")
+    def test_arrow_staging_should_find_the_same_rows_as_sqlite(self):
+        """ Key lookups, specific rows, ordering and counts should be the same whether the file is staged in SQLite or Arrow """
+
+        def reads() -> list:
+            import_file = ImportSchemeFile.objects.get(pk=self.import_file.pk)
+
+            return [
+                import_file.row_count,
+                import_file.header_fields(),
+                [dict(row) if row else row for row in (import_file.find_row_by_key(field="name", key=key) for key in ("c", "b\nb", 4, "z"))],
+                {key: dict(row) for key, row in import_file.find_rows_by_keys(field="id", keys=["7", 2, "9", "7"]).items()},
+                self.read(order_by="name", offset_count=1, limit_count=4),
+                self.read(specific_rows=[0, 6]),
+            ]
+
+        self.import_file._write_file_meta()
+        self.import_file._create_db_from_tabular_file(replace_file=True)
+        staged_in_sqlite = reads()
+
+        self.import_file._create_arrow_from_tabular_file()
+        staged_in_arrow = reads()
+
+        self.assertEqual(staged_in_sqlite, staged_in_arrow)
+        self.assertEqual({"id": "3", "name": "c"}, staged_in_arrow[2][0])
+        self.assertEqual([{"id": "1", "name": "a"}, {"id": "7", "name": "c"}], staged_in_arrow[5])
+
+
+@skipIf("Genome" not in settings.ML_IMPORT_WIZARD["Importers"], "Don't include model tests")
+class InspectionTests(TestCase):
+    ''' Tests for following and recovering file inspections '''
+
+    def setUp(self):
+        ''' Set up a GFF file that's being inspected '''
+
+        import_scheme = ImportScheme(name="Test Importer", importer="Genome")
+        import_scheme.save()
+        self.import_file = ImportSchemeFile(name="test.gff3", import_scheme=import_scheme, settings={"gff_reader": "gffutils"})
+        self.import_file.save()
+        self.import_file.set_status_by_name("Inspecting")
+
+        self.file_name = f"{settings.ML_IMPORT_WIZARD['Working_Files_Dir']}{self.import_file.file_name}"
+
+        with open(self.file_name, "w") as file:
+            file.write("##gff-version 3\nchr1\tsrc\tgene\t1\t100\t.\t+\t.\tID=g1\nchr1\tsrc\texon\t1\t50\t.\t+\t.\tID=e1;Parent=g1\n")
+
+        for suffix in ("", ".db", ".db.tmp"):
+            self.addCleanup(lambda file_name: os.path.exists(file_name) and os.remove(file_name), f"{self.file_name}{suffix}")
+
+    def test_inspect_progress_should_not_overwrite_settings_saved_since_the_file_was_loaded(self):
+        """ Progress is saved into a fresh copy of the settings """
+        other_copy = ImportSchemeFile.objects.get(pk=self.import_file.pk)
+        other_copy.settings["first_row_header"] = "True"
+        other_copy.save(update_fields=["settings"])
+
+        self.import_file._save_inspect_progress(progress={"features": 10, "bytes_read": 5, "bytes": 10})
+
+        file_settings = ImportSchemeFile.objects.get(pk=self.import_file.pk).settings
+        self.assertEqual("True", file_settings["first_row_header"])
+        self.assertEqual({"features": 10, "bytes_read": 5, "bytes": 10}, file_settings["inspect_progress"])
+        self.assertEqual("50% of the file read", self.import_file.inspect_progress.split(", ")[1])
+
+    @skipIf(NO_GFFUTILS, "gffutils isn't installed")
+    def test_a_killed_gff_db_build_should_be_cleaned_up_and_inspected_again(self):
+        """ A build that doesn't finish only leaves a .tmp file, which inspect_check_health removes when the inspecting process is gone """
+        import gffutils
+
+        def killed_features(import_file):
+            # gffutils reads ahead of the features it has written, so the build is killed after enough of them to have started the file
+            for number in range(1000):
+                yield gffutils.feature.feature_from_line(f"chr1\tsrc\tgene\t{number + 1}\t{number + 100}\t.\t+\t.\tID=g{number}")
+
+            raise KeyboardInterrupt
+
+        with mock.patch.object(ImportSchemeFile, "_gff_features", killed_features), self.assertRaises(KeyboardInterrupt):
+            self.import_file._create_gff_db()
+
+        self.assertFalse(os.path.exists(f"{self.file_name}.db"))
+        self.assertTrue(os.path.exists(f"{self.file_name}.db.tmp"))
+
+        # The inspecting process is alive, so nothing is touched
+        self.import_file.settings["inspect_process"] = {"pid": os.getpid(), "created": psutil.Process(os.getpid()).create_time()}
+        self.assertTrue(self.import_file.inspect_check_health())
+        self.assertTrue(os.path.exists(f"{self.file_name}.db.tmp"))
+
+        # A process with the same pid but a different create time is a different process
+        self.import_file.settings["inspect_process"]["created"] = 0
+        self.assertFalse(self.import_file.inspect_check_health())
+        self.assertFalse(os.path.exists(f"{self.file_name}.db.tmp"))
+
+        import_file = ImportSchemeFile.objects.get(pk=self.import_file.pk)
+        self.assertEqual("Preinspected", import_file.status.name)
+        self.assertNotIn("inspect_process", import_file.settings)
+
+        import_file._create_gff_db()
+        self.assertTrue(os.path.exists(f"{self.file_name}.db"))
+        self.assertFalse(os.path.exists(f"{self.file_name}.db.tmp"))
+        self.assertEqual(2, ImportSchemeFile.objects.get(pk=self.import_file.pk).settings["inspect_progress"]["features"])
+
+
+@skipIf("Genome" not in settings.ML_IMPORT_WIZARD["Importers"], "Don't include model tests")
+class IdentityIndexTests(TestCase):
+    ''' Tests for the IdentityIndex '''
+
+    def test_identity_index_finds_the_same_objects_as_the_database(self):
+        """ _find_instance should find the same object with and without the index, and the index shouldn't answer for a partial unique set """
+        import_scheme = ImportScheme(name="Test Importer", importer="Genome")
+        import_scheme.save()
+
+        for name, pkey_int, pkey_str in (("Feature", 1, "a"), ("Feature", 2, "b"), ("Gene", 1, None)):
+            ImportSchemeRowDeferred(import_scheme=import_scheme, model=name, pkey_int=pkey_int, pkey_str=pkey_str).save()
+
+        fields_by_name = {name: SimpleNamespace(name=name, field=ImportSchemeRowDeferred._meta.get_field(name), is_pseudo=False, settings={}) for name in ("model", "pkey_int", "pkey_str")}
+        model = SimpleNamespace(name="ImportSchemeRowDeferred", model=ImportSchemeRowDeferred, unique_sets=[("model", "pkey_int"), ("pkey_str",)], fields_by_name=fields_by_name, key_value_children=[], settings={})
+
+        identity_index = IdentityIndex()
+        self.assertTrue(identity_index.load(model=model))
+
+        for attributes in ({"model": "Feature", "pkey_int": "2"}, {"model": "Gene", "pkey_int": 1}, {"model": "Gene", "pkey_int": 3, "pkey_str": "c"}, {"model": "Gene", "pkey_str": "b"}, {"model": "Feature"}):
+            found, cache_keys = import_scheme._find_instance(model=model, row={}, working_attributes=attributes)
+            indexed, cache_keys = import_scheme._find_instance(model=model, row={}, working_attributes=attributes, identity_index=identity_index)
+
+            self.assertEqual(getattr(indexed, "pk", None), getattr(found, "pk", None), attributes)
+
+        self.assertIs(identity_index.find(model=model, unique_set=("model", "pkey_int"), attributes={"model": "Feature"}), NOT_INDEXED)
+
+    def test_dropping_a_model_gives_its_entries_back_to_the_budget(self):
+        """ The size of a dropped model's entries, including the ones added during the import, should be taken off the size of the index """
+        import_scheme = ImportScheme(name="Test Importer", importer="Genome")
+        import_scheme.save()
+        ImportSchemeRowDeferred(import_scheme=import_scheme, model="Feature", pkey_int=1).save()
+
+        fields_by_name = {name: SimpleNamespace(name=name, field=ImportSchemeRowDeferred._meta.get_field(name), is_pseudo=False, settings={}) for name in ("model", "pkey_int")}
+        importer_models = [SimpleNamespace(name=name, model=ImportSchemeRowDeferred, unique_sets=[("model", "pkey_int")], fields_by_name=fields_by_name, key_value_children=[], settings={}) for name in ("Kept", "Dropped")]
+
+        identity_index = IdentityIndex()
+        self.assertTrue(identity_index.load(model=importer_models[0]))
+        kept_size = identity_index.size
+
+        self.assertTrue(identity_index.load(model=importer_models[1]))
+        identity_index.add(model=importer_models[1], instance=ImportSchemeRowDeferred(pk=2, model="Gene", pkey_int=2))
+        identity_index.drop(model=importer_models[1])
+
+        self.assertEqual(kept_size, identity_index.size)
+
+
+@skipIf("Genome" not in settings.ML_IMPORT_WIZARD["Importers"], "Don't include model tests")
+class ExecuteTests(TestCase):
+    ''' Tests for committing imported rows in transactions '''
+
+    def setUp(self):
+        ''' Set up an import scheme whose rows each save an ImportSchemeRowDeferred, so what's committed can be counted '''
+
+        self.import_scheme = ImportScheme(name="Test Importer", importer="Genome")
+        self.import_scheme.save()
+        self.calls = Counter()
+
+    def execute_row(self, *, row, fail: dict={}, times: int=1, **kwargs) -> Counter:
+        ''' Stands in for _execute_row.  Rows listed in fail raise their exception the first times times they're imported '''
+        self.calls[row["n"]] += 1
+
+        if row["n"] in fail and self.calls[row["n"]] <= times:
+            raise fail[row["n"]]
+
+        ImportSchemeRowDeferred(import_scheme=self.import_scheme, model="Row", pkey_int=row["n"]).save()
+
+        return Counter({("created", "Row"): 1})
+
+    def execute(self, *, rows: int, fail: dict={}, times: int=1, **kwargs) -> Counter:
+        ''' Import rows rows through _execute_range '''
+
+        with mock.patch.object(self.import_scheme, "data_rows", return_value=iter([{"n": number} for number in range(rows)])), \
+                mock.patch.object(self.import_scheme, "_execute_row", partial(self.execute_row, fail=fail, times=times)):
+            return self.import_scheme._execute_range(**kwargs)
+
+    def saved_rows(self) -> list[int]:
+        ''' The rows that were committed '''
+        return sorted(ImportSchemeRowDeferred.objects.filter(import_scheme=self.import_scheme).values_list("pkey_int", flat=True))
+
+    def test_a_bad_row_should_only_roll_back_its_savepoint(self):
+        """ With transaction_batch_size a row that fails is rejected on its own, and the rest of its chunk is committed """
+        counts = self.execute(rows=5, fail={2: IntegrityError("duplicate")}, transaction_batch_size=3)
+
+        self.assertEqual(Counter({"rows": 5, "rejected": 1, ("created", "Row"): 4}), counts)
+        self.assertEqual([0, 1, 3, 4], self.saved_rows())
+        self.assertEqual(1, ImportSchemeRowRejected.objects.filter(import_scheme=self.import_scheme).count())
+
+    def test_a_row_that_deadlocks_should_be_tried_again_in_its_savepoint(self):
+        """ A row that fails with an OperationalError, like a deadlock, is tried again without rolling back the rest of its chunk """
+        counts = self.execute(rows=5, fail={1: OperationalError("deadlock detected")}, transaction_batch_size=3)
+
+        self.assertEqual(Counter({"rows": 5, ("created", "Row"): 5}), counts)
+        self.assertEqual([0, 1, 2, 3, 4], self.saved_rows())
+        self.assertEqual({0: 1, 1: 2, 2: 1, 3: 1, 4: 1}, dict(self.calls))
+
+    def test_a_chunk_that_fails_should_be_imported_one_row_at_a_time(self):
+        """ A chunk with a row that still deadlocks after Row_Retries tries is rolled back and its rows are imported in their own transactions """
+        with mock.patch.dict(settings.ML_IMPORT_WIZARD, {"Row_Retries": 1}):
+            counts = self.execute(rows=5, fail={1: OperationalError("deadlock detected")}, times=2, transaction_batch_size=3)
+
+        self.assertEqual(Counter({"rows": 5, ("created", "Row"): 5}), counts)
+        self.assertEqual([0, 1, 2, 3, 4], self.saved_rows())
+        self.assertEqual({0: 2, 1: 3, 2: 1, 3: 1, 4: 1}, dict(self.calls))
+
+    def test_a_row_that_keeps_deadlocking_should_be_rejected(self):
+        """ A row that fails with an OperationalError in its own transaction more than Row_Retries times is rejected, and the other rows are committed """
+        with mock.patch.dict(settings.ML_IMPORT_WIZARD, {"Row_Retries": 1}):
+            counts = self.execute(rows=5, fail={1: OperationalError("deadlock detected")}, times=100, transaction_batch_size=3)
+
+        self.assertEqual(Counter({"rows": 5, "rejected": 1, ("created", "Row"): 4}), counts)
+        self.assertEqual([0, 2, 3, 4], self.saved_rows())
+        self.assertEqual({0: 2, 1: 4, 2: 1, 3: 1, 4: 1}, dict(self.calls))
+        self.assertEqual(["deadlock detected"], list(ImportSchemeRowRejected.objects.filter(import_scheme=self.import_scheme).values_list("errors", flat=True)))
+
+    def test_a_chunk_whose_bulk_save_fails_should_be_imported_one_row_at_a_time(self):
+        """ If saving the buffered objects of a chunk raises an IntegrityError the chunk is rolled back and its rows are imported one at a time without the writer """
+        flushes = []
+
+        def flush_writer(*, writer, counts, **kwargs):
+            flushes.append(len(flushes))
+
+            if len(flushes) == 1:
+                raise IntegrityError("duplicate")
+
+        with mock.patch.object(self.import_scheme, "_flush_writer", flush_writer):
+            counts = self.execute(rows=4, bulk_batch_size=2, transaction_batch_size=2)
+
+        self.assertEqual(Counter({"rows": 4, ("created", "Row"): 4}), counts)
+        self.assertEqual([0, 1, 2, 3], self.saved_rows())
+        self.assertEqual({0: 2, 1: 2, 2: 1, 3: 1}, dict(self.calls))
+
+
+@skipIf("Genome" not in settings.ML_IMPORT_WIZARD["Importers"], "Don't include model tests")
+class ParallelImportTests(TestCase):
+    ''' Tests for splitting imports between workers '''
+
+    class SerialPool():
+        """ Stands in for ProcessPoolExecutor by running each job when it's submitted """
+
+        def __init__(self, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def submit(self, function, **kwargs):
+            future = Future()
+            future.set_result(function(**kwargs))
+            return future
+
+    @classmethod
+    def setUpTestData(cls):
+        ''' Set up an import scheme with one file '''
+
+        cls.import_scheme = ImportScheme(name="Test Importer", importer="Genome")
+        cls.import_scheme.save()
+
+        ImportSchemeFile(name="test1.txt", import_scheme=cls.import_scheme).save()
+
+    def test_row_ranges_should_cover_every_row_once(self):
+        """ _row_ranges should split the rows after the offset into nearly equal ranges """
+        self.assertEqual([(5, 4), (9, 4), (13, 2)], ImportScheme._row_ranges(row_count=10, offset_count=5, parts=3))
+        self.assertEqual([(0, 1), (1, 1)], ImportScheme._row_ranges(row_count=2, offset_count=0, parts=4))
+
+    def test_execute_parallel_should_merge_the_counts_of_each_range(self):
+        """ _execute_parallel should run a range for each worker and add up their counts """
+        ranges = []
+
+        def execute_range(*, import_scheme_id, offset_count, limit_count, options, featuretypes=None):
+            ranges.append((offset_count, limit_count))
+            return Counter({"rows": limit_count, ("created", "Feature"): 1})
+
+        with mock.patch("ml_import_wizard.models.transaction.get_connection", return_value=SimpleNamespace(vendor="postgresql")), \
+                mock.patch("ml_import_wizard.models.connections"), \
+                mock.patch("ml_import_wizard.models.ProcessPoolExecutor", self.SerialPool), \
+                mock.patch("ml_import_wizard.models.execute_range", execute_range), \
+                mock.patch.object(ImportSchemeFile, "is_staged", new_callable=mock.PropertyMock, return_value=True), \
+                mock.patch.object(ImportSchemeFile, "row_count", new_callable=mock.PropertyMock, return_value=10):
+            counts = self.import_scheme._execute_parallel(workers=3, offset_count=1, limit_count=8, options={})
+
+        self.assertEqual([(1, 3), (4, 3), (7, 2)], ranges)
+        self.assertEqual(Counter({"rows": 8, ("created", "Feature"): 3}), counts)
+
+    def test_execute_parallel_should_fall_back_to_one_process_without_postgresql(self):
+        """ _execute_parallel should return None so the import runs in one process when the database can't take advisory locks """
+        if connection.vendor == "postgresql":
+            self.skipTest("The test database is PostgreSQL")
+
+        with mock.patch("ml_import_wizard.models.ProcessPoolExecutor") as pool:
+            self.assertIsNone(self.import_scheme._execute_parallel(workers=2, options={}))
+
+        pool.assert_not_called()
+
+    def test_chunk_should_import_rows_one_at_a_time_if_a_lock_is_busy(self):
+        """ A chunk shouldn't wait for a lock while it holds others, it should roll back and import its rows in their own transactions """
+        waits = []
+
+        def execute_row(*, row, cache_thing, lock_identities=False, wait_for_locks=True, **kwargs):
+            waits.append(wait_for_locks)
+
+            if not wait_for_locks:
+                raise IdentityLockBusy("busy")
+
+            return Counter({("created", "Feature"): 1})
+
+        counts = Counter()
+
+        with mock.patch.object(self.import_scheme, "_execute_row", execute_row):
+            self.import_scheme._execute_chunk(rows=[{"a": 1}, {"a": 2}], cache_thing=LRUCacheThing(), counts=counts, lock_identities=True)
+
+        self.assertEqual([False, True, True], waits)
+        self.assertEqual(Counter({"rows": 2, ("created", "Feature"): 2}), counts)
+
+
+class ContentSignaturesTests(TestCase):
+    ''' Tests for content signatures '''
+
+    @classmethod
+    def setUpTestData(cls):
+        ''' Set up a stand in for an ImporterModel '''
+        fields = [
+            SimpleNamespace(name="pkey_int", field=models.IntegerField(), is_pseudo=False, settings={}),
+            SimpleNamespace(name="model", field=models.CharField(), is_pseudo=False, settings={"case_insensitive_compare": True}),
+        ]
+        cls.model = SimpleNamespace(name="ImportSchemeRowDeferred", model=ImportSchemeRowDeferred, fields=fields, key_value_children=[])
+
+    def test_signature_is_the_same_for_row_values_and_database_values(self):
+        """ signature() should normalize values, so "5" from a file matches 5 from the database, and case insensitive fields ignore case """
+        self.assertEqual(
+            ContentSignatures.signature(model=self.model, values={"pkey_int": "5", "model": "Feature"}, key_values={}),
+            ContentSignatures.signature(model=self.model, values={"pkey_int": 5, "model": "feature"}, key_values={}),
+        )
+
+    def test_signature_is_different_for_different_values(self):
+        """ signature() should change when a value changes """
+        self.assertNotEqual(
+            ContentSignatures.signature(model=self.model, values={"pkey_int": 5, "model": "Feature"}, key_values={}),
+            ContentSignatures.signature(model=self.model, values={"pkey_int": 6, "model": "Feature"}, key_values={}),
+        )
+
+
 class SimpleUtilsTest(TestCase):
     ''' Tests for functions from the utils.simple module '''
 
@@ -172,6 +1066,11 @@ class SimpleUtilsTest(TestCase):
     def test_dict_hash_returns_different_hash_with_the_different_dict(self):
         """ dict_hash() should return different hashes when the input is different """
         self.assertNotEqual(dict_hash(self.dict1), dict_hash(self.dict3))
+
+    def test_lock_id_returns_the_same_signed_64_bit_int_for_the_same_key(self):
+        """ lock_id() should return the same value in the PostgreSQL bigint range for equal keys """
+        self.assertEqual(lock_id(("Feature", "|feature_name:gene1|")), lock_id(("Feature", "|feature_name:gene1|")))
+        self.assertTrue(-2**63 <= lock_id(("Feature", "|feature_name:gene1|")) < 2**63)
     
     # Stringalization tests
     def test_stringalize_returns_a_string_when_given_an_int(self):
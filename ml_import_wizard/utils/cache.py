@@ -5,6 +5,9 @@ log = logging.getLogger(settings.ML_IMPORT_WIZARD['Logger'])
 
 from collections import OrderedDict
 
+# Marks a key that wasn't in transaction_things before a savepoint
+_missing = object()
+
 
 class LRUCacheThing():
     """" Cache things with Least Recently Used.  Has stupid name to avoid colisions """
@@ -14,6 +17,7 @@ class LRUCacheThing():
 
         self.things: OrderedDict = OrderedDict()
         self.transaction_things: OrderedDict = OrderedDict()
+        self.savepoints: list[list[tuple]] = []
         self.items: int = items
     
     def store(self, *, key: any, value: any, transaction: bool = False) -> any:
@@ -21,6 +25,10 @@ class LRUCacheThing():
         If transaction, temporarilly stores in transaction_things so they can be thrown out with rollback or committed with commit """
         
         if transaction:
+            # Journal the previous value so the store can be undone by savepoint_rollback
+            if self.savepoints:
+                self.savepoints[-1].append((key, self.transaction_things.get(key, _missing)))
+
             self.transaction_things[key] = value
             self.transaction_things.move_to_end(key)
 
@@ -66,6 +74,7 @@ class LRUCacheThing():
         """ Roll back by removing all things in transaction_things """
 
         self.transaction_things.clear()
+        self.savepoints.clear()
 
     def commit(self) -> None:
         """ Add all items in transaction_things to things """
@@ -74,6 +83,35 @@ class LRUCacheThing():
             self.store(key=key, value=value)
 
         self.transaction_things.clear()
+        self.savepoints.clear()
+
+    def savepoint(self) -> None:
+        """ Start a savepoint inside the transaction.  Savepoints can be nested """
+
+        self.savepoints.append([])
+
+    def savepoint_rollback(self) -> None:
+        """ Undo everything stored in transaction_things since the last savepoint """
+
+        if not self.savepoints:
+            return
+
+        for key, value in reversed(self.savepoints.pop()):
+            if value is _missing:
+                self.transaction_things.pop(key, None)
+            else:
+                self.transaction_things[key] = value
+
+    def savepoint_commit(self) -> None:
+        """ Keep everything stored since the last savepoint.  The changes still belong to any enclosing savepoint """
+
+        if not self.savepoints:
+            return
+
+        journal: list[tuple] = self.savepoints.pop()
+
+        if self.savepoints:
+            self.savepoints[-1].extend(journal)
 
     @property
     def count(self) -> int:
@@ -0,0 +1,55 @@
+""" Holds the helpers for compressed uploads, which are read through a decompressing stream instead of being decompressed on disk """
+
+from django.conf import settings
+
+import logging
+log = logging.getLogger(settings.ML_IMPORT_WIZARD['Logger'])
+
+import bz2, gzip, lzma
+from pathlib import Path
+from typing import IO
+
+# Check to see if zstandard is installed, it's needed for .zst files
+NO_ZSTANDARD: bool = False
+from importlib.util import find_spec
+if find_spec("zstandard"): import zstandard # type: ignore
+else: NO_ZSTANDARD=True
+
+# Compression suffixes and the compression they mean, named the way pandas names them
+COMPRESSIONS: dict[str, str] = {
+    "gz": "gzip",
+    "gzip": "gzip",
+    "bz2": "bz2",
+    "xz": "xz",
+    "zst": "zstd",
+}
+
+
+def split_compression(name: str) -> tuple[str, str|None]:
+    """ Returns the type of a file name, from the last suffix that isn't a compression suffix, and its compression or None """
+
+    suffixes: list[str] = [suffix[1:] for suffix in Path(name).suffixes]
+    compression: str|None = None
+
+    if suffixes and suffixes[-1].lower() in COMPRESSIONS:
+        compression = COMPRESSIONS[suffixes.pop().lower()]
+
+    return (suffixes[-1] if suffixes else ""), compression
+
+
+def open_file(path: str|IO, compression: str|None=None, mode: str="rb") -> IO:
+    """ Opens a file, decompressing it as it's read if it has a compression.  path can also be a file opened in binary mode, which is returned as is if it isn't compressed """
+
+    match compression:
+        case None:
+            return open(path, mode) if isinstance(path, str) else path
+        case "gzip":
+            return gzip.open(path, mode)
+        case "bz2":
+            return bz2.open(path, mode)
+        case "xz":
+            return lzma.open(path, mode)
+        case "zstd":
+            return zstandard.open(path, mode)
+
+    raise ValueError(f"Unknown compression: {compression}")
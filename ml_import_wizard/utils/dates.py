@@ -0,0 +1,79 @@
+""" Holds the DateParser, which parses dates with a fixed format and a memo, using dateutil only for values the format doesn't match """
+
+from django.conf import settings
+
+import logging
+log = logging.getLogger(settings.ML_IMPORT_WIZARD['Logger'])
+
+from datetime import datetime
+from dateutil.parser import parse
+
+from ml_import_wizard.utils.cache import LRUCacheThing
+
+# Formats that parse to the same date as dateutil for every value they match.  Day first and two digit years are left to dateutil
+DATE_FORMATS: tuple = (
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%m/%d/%Y",
+    "%m-%d-%Y",
+    "%d-%b-%Y",
+    "%d %b %Y",
+    "%b %d %Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+)
+
+
+def infer_date_format(values: list|set) -> str|None:
+    """ Returns the first of DATE_FORMATS that parses every value to the same date as dateutil, or None if none do """
+
+    values = [value for value in values if value and type(value) is str]
+
+    if not values:
+        return None
+
+    for date_format in DATE_FORMATS:
+        try:
+            if all(datetime.strptime(value, date_format).date() == parse(value).date() for value in values):
+                return date_format
+        except (ValueError, OverflowError):
+            continue
+
+    return None
+
+
+class DateParser():
+    """ Parses date strings to ISO dates.  Tries the known formats first, then dateutil, and remembers raw values it has seen """
+
+    def __init__(self, *, formats: list=None, memo_items: int=100000) -> None:
+        """ formats are strptime formats to try before dateutil.  If none are given the format of the first value dateutil parses is learned """
+
+        self.formats: list[str] = list(formats or [])
+        self.learn: bool = not self.formats
+        self.memo = LRUCacheThing(items=memo_items)
+
+    def parse(self, value: str) -> str:
+        """ Returns the date in value as an ISO date string """
+
+        if (date := self.memo.find(key=value)) is not None:
+            return date
+
+        date = None
+
+        for date_format in self.formats:
+            try:
+                date = str(datetime.strptime(value, date_format).date())
+                break
+            except ValueError:
+                continue
+
+        if date is None:
+            date = str(parse(value).date())
+
+            if self.learn and (date_format := infer_date_format([value])):
+                self.formats.append(date_format)
+                self.learn = False
+
+        self.memo.store(key=value, value=date)
+
+        return date
@@ -0,0 +1,97 @@
+""" Holds the streaming Excel reader, which reads the first sheet of a workbook a row at a time instead of loading it into a DataFrame """
+
+from django.conf import settings
+
+import logging
+log = logging.getLogger(settings.ML_IMPORT_WIZARD['Logger'])
+
+from datetime import date, datetime, time
+from typing import Generator, Callable
+
+# Check to see if python-calamine (fast, reads xlsx and xls) or openpyxl (read only mode, reads xlsx) are installed
+NO_CALAMINE: bool = False
+from importlib.util import find_spec
+if find_spec("python_calamine"): import python_calamine # type: ignore
+else: NO_CALAMINE=True
+
+NO_OPENPYXL: bool = False
+if find_spec("openpyxl"): import openpyxl # type: ignore
+else: NO_OPENPYXL=True
+
+
+def excel_rows(path: str, file_type: str) -> Generator[list, None, None]|None:
+    """ Returns a generator of the rows of the first sheet of a workbook, as lists of str or None, or None if no streaming reader can read the file """
+
+    if not NO_CALAMINE:
+        return _rows(python_calamine.CalamineWorkbook.from_path(path).get_sheet_by_index(0).iter_rows())
+
+    if not NO_OPENPYXL and file_type.lower() == "xlsx":
+        # openpyxl checks the extension of paths, and working files don't keep theirs, so it gets an open file instead
+        file = open(path, "rb")
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+
+        def close() -> None:
+            workbook.close()
+            file.close()
+
+        return _rows(workbook.worksheets[0].iter_rows(values_only=True), close=close)
+
+    return None
+
+
+def excel_header(row: list) -> list[str]:
+    """ Returns column names for a header row the way pandas names them: Unnamed: n for blanks, and .n added to repeated names """
+
+    header: list[str] = []
+    seen: dict[str, int] = {}
+
+    for index, value in enumerate(row):
+        name: str = value if value is not None else f"Unnamed: {index}"
+
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+
+        seen.setdefault(name, 0)
+        header.append(name)
+
+    return header
+
+
+def excel_value(value: any) -> str|None:
+    """ Returns a cell value as a str, or None for an empty cell.  Whole numbers lose the .0 Excel stores them with """
+
+    if value is None or value == "":
+        return None
+
+    if type(value) is float and value.is_integer():
+        return str(int(value))
+
+    # Dates are written the way pandas writes its timestamps, whichever reader found them
+    if type(value) is date:
+        value = datetime.combine(value, time())
+
+    return str(value)
+
+
+def _rows(rows: Generator, close: Callable=None) -> Generator[list, None, None]:
+    """ Yields each row as a list of excel_values.  Blank rows at the end of the sheet, which readers often report for formatted cells, are left out """
+
+    blank_rows: int = 0
+
+    try:
+        for row in rows:
+            values: list = [excel_value(value) for value in row]
+
+            if all(value is None for value in values):
+                blank_rows += 1
+                continue
+
+            for blank_row in range(blank_rows):
+                yield []
+
+            blank_rows = 0
+            yield values
+
+    finally:
+        if close: close()
@@ -0,0 +1,157 @@
+""" Holds the streaming GFF3 reader, which parses lines into rows shaped like the features of a gffutils DB without building one """
+
+from django.conf import settings
+
+import logging
+log = logging.getLogger(settings.ML_IMPORT_WIZARD['Logger'])
+
+import os, re, mmap, multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote
+from typing import Generator
+
+from ml_import_wizard.utils.compression import open_file
+
+BASE_FIELDS: tuple = ('seqid', 'source', 'featuretype', 'start', 'end', 'score', 'strand', 'frame')
+
+# Attributes named like a column of the feature, including the bin column of gffutils DBs, get this prefix so they don't replace the column
+ATTRIBUTE_PREFIX: str = "attribute_"
+RESERVED_FIELDS: frozenset = frozenset(BASE_FIELDS + ("bin",))
+
+# Bytes of the file each worker parses at a time.  Only a few ranges are parsed ahead of the rows being used, so memory stays bounded
+RANGE_SIZE: int = 8 * 1024 * 1024
+
+# Features end where the FASTA section starts, like they do for gffutils
+FASTA_START = re.compile(rb"^(?:##FASTA\r?$|>)", re.MULTILINE)
+
+
+def gff_attributes(text: str) -> dict[str, list[str]]:
+    """ Splits a GFF3 attributes column into a list of values for each key, the way gffutils does """
+
+    attributes: dict[str, list[str]] = {}
+    parts: list[str] = [part.strip() for part in text.strip(";").split(";")]
+
+    # Keys that repeat keep each of their values whole instead of splitting them on commas
+    repeated_keys: bool = len(parts) > 1 and len({part.partition("=")[0] for part in parts}) != len(parts)
+
+    for part in parts:
+        key, _, value = part.partition("=")
+        values: list[str] = attributes.setdefault(key, [])
+
+        if not value:
+            continue
+
+        if value[0] == '"' and value[-1] == '"':
+            value = value.strip('"')
+
+        if repeated_keys or ", " in value:
+            values.append(value)
+        else:
+            values.extend(value.split(","))
+
+    if "%" in text:
+        attributes = {key: [unquote(value) for value in values] for key, values in attributes.items()}
+
+    return attributes
+
+
+def attribute_field(key: str) -> str:
+    """ Returns the name of the row field that holds an attribute, which is the attribute's key unless a column of the feature has that name """
+
+    return f"{ATTRIBUTE_PREFIX}{key}" if key in RESERVED_FIELDS else key
+
+
+def gff_row(line: str) -> dict[str, any]:
+    """ Returns the row for a feature line: the base fields, then the attributes, with a value instead of a list for attributes that have one value """
+
+    fields: list[str] = line.split("\t")
+    fields.extend(["."] * (8 - len(fields)))
+
+    row: dict[str, any] = dict(zip(BASE_FIELDS, fields))
+
+    for coordinate in ("start", "end"):
+        row[coordinate] = None if row[coordinate] == "." else int(row[coordinate])
+
+    for key, values in gff_attributes(fields[8] if len(fields) > 8 else "").items():
+        row[attribute_field(key)] = values[0] if len(values) == 1 else values
+
+    return row
+
+
+def gff_rows(path: str, *, compression: str=None, start: int=0, end: int=None, featuretypes: set=None) -> Generator[dict[str, any]|str, None, None]:
+    """ Yields the rows of the features in a GFF3 file, or in the byte range from start to end of an uncompressed one.  Ranges should start at the beginning of a line.
+        If featuretypes is given features of other featuretypes aren't parsed, and only their featuretype is yielded """
+
+    position: int = start
+
+    with open_file(path, compression) as file:
+        if start:
+            file.seek(start)
+
+        for line in file:
+            if end is not None and position >= end:
+                return
+
+            position += len(line)
+            line = line.decode().rstrip("\r\n")
+
+            if line == "##FASTA" or line.startswith(">"):
+                return
+
+            if line.startswith("#") or not line:
+                continue
+
+            if featuretypes is not None and (featuretype := line.split("\t", 3)[2] if line.count("\t") > 1 else ".") not in featuretypes:
+                yield featuretype
+                continue
+
+            yield gff_row(line)
+
+
+def gff_ranges(path: str, *, parts: int) -> list[tuple[int, int]]:
+    """ Splits the features of an uncompressed GFF3 file into at most parts byte ranges that start at the beginning of a line """
+
+    if not os.path.getsize(path):
+        return []
+
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        fasta = FASTA_START.search(data)
+        size: int = fasta.start() if fasta else len(data)
+        starts: list[int] = [0]
+
+        for part in range(1, parts):
+            line_start: int = data.find(b"\n", size * part // parts, size) + 1
+
+            if line_start and line_start > starts[-1]:
+                starts.append(line_start)
+
+    return [(start, end) for start, end in zip(starts, starts[1:] + [size]) if start < end]
+
+
+def gff_rows_parallel(path: str, *, workers: int, featuretypes: set=None) -> Generator[dict[str, any]|str, None, None]:
+    """ Yields the rows of an uncompressed GFF3 file in file order, parsing byte ranges of it in worker processes """
+
+    ranges: list[tuple[int, int]] = gff_ranges(path, parts=max(workers, -(-os.path.getsize(path) // RANGE_SIZE)))
+    pending: deque = deque()
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        try:
+            for start, end in ranges:
+                pending.append(pool.submit(_range_rows, path, start, end, featuretypes))
+
+                if len(pending) > workers * 2:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _range_rows(path: str, start: int, end: int, featuretypes: set=None) -> list[dict[str, any]|str]:
+    """ Returns the rows of a byte range, for a worker process """
+
+    return list(gff_rows(path, start=start, end=end, featuretypes=featuretypes))
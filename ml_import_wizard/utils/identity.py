@@ -0,0 +1,177 @@
+""" Holds the identity index, an in memory map from the unique field values of objects to their pks """
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models
+
+import logging
+log = logging.getLogger(settings.ML_IMPORT_WIZARD['Logger'])
+
+import sys
+
+# Default memory budget for the whole index, in MB, when one is made without a budget.  Imports only make one if identity_index_budget is set
+DEFAULT_BUDGET: int = 64
+
+# Rough cost of a dict entry beyond the size of its key, used to keep the index under budget
+ENTRY_OVERHEAD: int = 100
+
+# Field types whose values compare the same in Python as they do in the database
+INDEXABLE_TYPES: tuple = (
+    "AutoField", "BigAutoField", "SmallAutoField",
+    "IntegerField", "BigIntegerField", "SmallIntegerField", "PositiveIntegerField", "PositiveBigIntegerField", "PositiveSmallIntegerField",
+    "BooleanField", "CharField", "TextField", "SlugField", "EmailField", "DateField", "UUIDField",
+    "ForeignKey", "OneToOneField",
+)
+
+# Returned by find when the index can't answer and the database has to be queried
+NOT_INDEXED = object()
+
+
+class IdentityIndex():
+    """ Maps the values of each unique field set of a model to the pk of the first object that has them.
+    Models that don't fit in the memory budget aren't indexed, so lookups for them fall back to queries """
+
+    def __init__(self, *, budget: int=DEFAULT_BUDGET) -> None:
+        """ budget is in MB """
+
+        self.budget: int = budget * 1024 * 1024
+        self.size: int = 0
+        self.indexes: dict[str, dict[tuple, dict]] = {}
+
+        # The size of each indexed model's entries, so it can be given back to the budget when the model is dropped
+        self.model_sizes: dict[str, int] = {}
+
+    def load(self, *, model: object) -> bool:
+        """ Load the keys of all existing objects of an ImporterModel.  Returns True if the model was indexed """
+
+        unique_sets: list[tuple] = [unique_set for unique_set in model.unique_sets if self._indexable(model=model, unique_set=unique_set)]
+
+        if not unique_sets:
+            return False
+
+        object_count: int = model.model.objects.count()
+
+        if self.size + object_count * len(unique_sets) * ENTRY_OVERHEAD > self.budget:
+            log.debug(f"{model.name}: {object_count} objects won't fit in the identity index")
+            return False
+
+        indexes: dict[tuple, dict] = {unique_set: {} for unique_set in unique_sets}
+        fields: dict[str, object] = {field.name: field for unique_set in unique_sets for field in self._fields(model=model, unique_set=unique_set)}
+        attnames: list[str] = [field.field.attname for field in fields.values()]
+        size: int = 0
+
+        for values in model.model.objects.order_by("pk").values_list("pk", *attnames).iterator(chunk_size=10000):
+            attributes: dict = dict(zip(fields.keys(), values[1:]))
+
+            for unique_set, index in indexes.items():
+                key: tuple = self._key(model=model, unique_set=unique_set, attributes=attributes)
+
+                if key not in index:
+                    index[key] = values[0]
+                    size += sys.getsizeof(key) + ENTRY_OVERHEAD
+
+            if self.size + size > self.budget:
+                log.debug(f"{model.name}: ran out of identity index budget while loading")
+                return False
+
+        self.size += size
+        self.indexes[model.name] = indexes
+        self.model_sizes[model.name] = size
+
+        return True
+
+    def find(self, *, model: object, unique_set: tuple, attributes: dict) -> any:
+        """ Returns the pk of the object with the attributes, None if there isn't one, or NOT_INDEXED if the index can't answer.
+        The database lookup leaves out fields of the unique set that aren't in attributes, so the index only answers when all of them are there """
+
+        index: dict = self.indexes.get(model.name, {}).get(unique_set)
+        if index is None:
+            return NOT_INDEXED
+
+        if any(field.name not in attributes for field in self._fields(model=model, unique_set=unique_set)):
+            return NOT_INDEXED
+
+        try:
+            return index.get(self._key(model=model, unique_set=unique_set, attributes=attributes))
+        except TypeError:
+            # Unhashable values can't be looked up
+            return NOT_INDEXED
+
+    def add(self, *, model: object, instance: models.Model) -> None:
+        """ Add a saved instance to the index.  Should only be called once the instance has been committed """
+
+        for unique_set, index in self.indexes.get(model.name, {}).items():
+            attributes: dict = {field.name: getattr(instance, field.field.attname) for field in self._fields(model=model, unique_set=unique_set)}
+
+            try:
+                key: tuple = self._key(model=model, unique_set=unique_set, attributes=attributes)
+            except TypeError:
+                continue
+
+            if key not in index:
+                index[key] = instance.pk
+                self.size += sys.getsizeof(key) + ENTRY_OVERHEAD
+                self.model_sizes[model.name] += sys.getsizeof(key) + ENTRY_OVERHEAD
+
+    def drop(self, *, model: object) -> None:
+        """ Stop indexing a model, so lookups for it go to the database, and give its entries back to the budget """
+
+        self.indexes.pop(model.name, None)
+        self.size -= self.model_sizes.pop(model.name, 0)
+
+    @staticmethod
+    def instance(*, model: object, pk: any) -> models.Model:
+        """ Returns an unloaded instance for a pk found in the index.  It's only good for pointing foreign keys at """
+
+        instance: models.Model = model.model(pk=pk)
+        instance._state.adding = False
+
+        return instance
+
+    @staticmethod
+    def _fields(*, model: object, unique_set: tuple) -> list:
+        """ Returns the ImporterFields that execute uses to look up the unique set """
+
+        return [model.fields_by_name[field] for field in unique_set if field in model.fields_by_name]
+
+    def _indexable(self, *, model: object, unique_set: tuple) -> bool:
+        """ True if all the fields in the unique set can be compared in memory """
+
+        # Matching key/value children takes a query
+        if "***Key_Value_Models***" in unique_set and model.key_value_children:
+            return False
+
+        fields: list = self._fields(model=model, unique_set=unique_set)
+
+        if not fields:
+            return False
+
+        for field in fields:
+            if field.is_pseudo or field.field.get_internal_type() not in INDEXABLE_TYPES:
+                return False
+
+        return True
+
+    def _key(self, *, model: object, unique_set: tuple, attributes: dict) -> tuple:
+        """ Returns the index key for the attributes, normalized the same way for database values and row values """
+
+        key: list = []
+
+        for field in self._fields(model=model, unique_set=unique_set):
+            value: any = attributes.get(field.name)
+
+            if isinstance(value, models.Model):
+                value = value.pk
+
+            elif value is not None:
+                try:
+                    value = field.field.to_python(value)
+                except (ValidationError, ValueError, TypeError):
+                    pass
+
+            if field.settings.get("case_insensitive_compare") == True and isinstance(value, str):
+                value = value.lower()
+
+            key.append(value)
+
+        return tuple(key)
@@ -12,9 +12,9 @@ import logging
 log = logging.getLogger(settings.ML_IMPORT_WIZARD['Logger'])
 
 from weakref import proxy
-from dateutil.parser import parse
 
 from ml_import_wizard.utils.simple import fancy_name, deep_exists
+from ml_import_wizard.utils.dates import DateParser
 from ml_import_wizard.exceptions import UnresolvedInspectionOrder
 
 
@@ -176,6 +176,23 @@ class ImporterModel(BaseImporter):
         """ returns the db table name to query against """
 
         return self.model.objects.model._meta.db_table
+
+    @property
+    def unique_sets(self) -> list[tuple]:
+        """ Returns the sets of field names that identify an object of this model.
+        minimum_objects models also treat all fields, along with their key/value children, as one set """
+
+        unique_sets: list[tuple] = list(self.model._meta.__dict__.get("unique_together"))
+        unique_sets = unique_sets + [(field.name,) for field in self.fields if field.field.unique and not field.is_foreign_key]
+
+        # minimum_objects models treat all fields together as unique so we don't end up with duplicates
+        if "minimum_objects" not in self.settings or self.settings["minimum_objects"]:
+            full_unique_set: list = [field.name for field in self.fields] # if not field.is_foreign_key
+            full_unique_set.append("***Key_Value_Models***")
+
+            unique_sets.append(tuple(full_unique_set))
+
+        return unique_sets
     
 
 class ImporterField(BaseImporter):
@@ -201,6 +218,7 @@ class ImporterField(BaseImporter):
 
         if isinstance(self.field, DateField):
             self.is_date: bool = True
+            self.date_parser: DateParser = DateParser()
         else:
             self.is_date: bool = False
 
@@ -334,11 +352,11 @@ class ImporterField(BaseImporter):
 
         return instance
     
-    def clean_data(self, data: str) -> str:
-        """ Clean the data so it is formatted corectly for the database """
+    def clean_data(self, data: str, date_parser: DateParser=None) -> str:
+        """ Clean the data so it is formatted corectly for the database.  date_parser can be given to parse dates with formats known for the file """
 
         if self.is_date and data:
-            return str(parse(data).date())
+            return (date_parser or self.date_parser).parse(data)
 
         return data
     
@@ -381,10 +399,15 @@ def setup_importers() -> None:
     """ Initialize the importer objects from settings """
 
     for importer_setting, importer_value in settings.ML_IMPORT_WIZARD["Importers"].items():
+        # Get settings for the importer and save them in the object, except keys in exclude_keys
+        exclude_keys: tuple = ("name", "long_name", "description", "apps")
+        importer_settings: dict = {setting: value for setting, value in importer_value.items() if setting not in exclude_keys}
+
         working_importer = importers[importer_setting] = Importer(
             name = importer_setting, 
             long_name = importer_value.get('long_name', ''),
             description = importer_value.get('description', ''),
+            **importer_settings
         )
 
         for app in importer_value.get("apps", []):
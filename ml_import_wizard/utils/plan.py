@@ -0,0 +1,668 @@
+""" Holds the row plan, an import scheme's items compiled into a flat list of steps that build each row """
+
+from django.conf import settings
+
+import logging
+log = logging.getLogger(settings.ML_IMPORT_WIZARD['Logger'])
+
+from typing import Generator, Callable
+from itertools import islice
+from functools import partial
+import sys
+
+import pandas as pd
+
+from ml_import_wizard.utils.cache import LRUCacheThing
+from ml_import_wizard.utils.dates import DateParser
+from ml_import_wizard.utils.simple import dict_hash
+
+# Compiled plans, keyed by the scheme, its importer hash, its settings, and the updated timestamps of its items
+plans = LRUCacheThing(items=32)
+
+# Strategies that need the rest of the row before they can run
+DEFERRED_STRATEGIES: tuple = ("Resolver",)
+
+# Primary rows read at a time in row mode, so their child rows can be fetched together
+PREFETCH_ROWS: int = 1000
+
+
+def joined_column(file_id: int, name: str) -> str:
+    """ Returns the name a child file field has in primary rows that SQLite joined the child file into """
+
+    return f"***{file_id}***{name}"
+
+
+class RowContext():
+    """ Per run state for a RowPlan: the current primary row, the child rows linked to it, and resolver instances and results """
+
+    def __init__(self, *, plan: object, child_files: dict) -> None:
+        """ child_files is a dict of ImportSchemeFile.id: ImportSchemeFile for each child file in the plan """
+
+        self.plan: RowPlan = plan
+        self.row: any = None
+        self.child_rows: dict = {}
+
+        # Child files, with the connections to their dbs
+        self.child_files: dict[int, tuple] = {file_id: (file, file._get_db_connection()) for file_id, file in child_files.items()}
+
+        self.resolver_instances: dict = {}
+        self.resolved = LRUCacheThing(items=1000000)
+
+        # Child rows fetched for the current block of primary rows, by child file id and str(key)
+        self.prefetched: dict[int, dict] = {}
+
+        # Join mode state: child files held in hash tables by child file id and str(key), and the child file read in key order alongside the primary file
+        self.joined: dict[int, dict] = {}
+        self.merge_file_id: int = None
+        self.merge_rows: Generator = None
+        self.merge_row: tuple = None
+        self.attached: set[int] = set()
+
+        # Block mode state: the current block of primary rows, as a DataFrame, and the child rows linked to each of them
+        self.block: list = []
+        self.frame: pd.DataFrame = None
+        self.block_child_rows: dict[int, list] = {}
+
+    def start_row(self, row: any, index: int=None) -> None:
+        """ Set the primary row that values are taken from.  index is the position of the row in the current block, if there is one """
+
+        self.row = row
+        self.child_rows = {} if index is None else {file_id: child_rows[index] for file_id, child_rows in self.block_child_rows.items()}
+
+    def start_block(self, rows: list) -> None:
+        """ Set the block of primary rows that columns are taken from """
+
+        self.block = rows
+        self.frame = None
+        self.block_child_rows = {}
+
+        self.prefetch(rows)
+
+    def prefetch(self, rows: list) -> None:
+        """ Fetch the child rows linked to a list of primary rows, with one lookup per child file """
+
+        self.prefetched = {}
+
+        for file_id, (file, connection) in self.child_files.items():
+            if file_id in self.joined or file_id == self.merge_file_id or file_id in self.attached:
+                continue
+
+            child_linked_field, primary_linked_field = self.plan.child_links[file_id]
+            keys: list = []
+
+            for row in rows:
+                self.row = row
+                keys.append(self.primary_value(primary_linked_field))
+
+            self.prefetched[file_id] = file.find_rows_by_keys(field=child_linked_field, keys=[key for key in keys if type(key) is not list], connection=connection)
+
+    def primary_series(self, name: str) -> pd.Series:
+        """ Returns a field of every primary row in the block """
+
+        if self.frame is None:
+            if type(self.block[0]) is dict:
+                self.frame = pd.DataFrame(self.block, dtype=object)
+            else:
+                self.frame = pd.DataFrame([tuple(row) for row in self.block], columns=self.block[0].keys(), dtype=object)
+
+        if name not in self.frame:
+            return pd.Series([None] * len(self.block), dtype=object)
+
+        return self.frame[name]
+
+    def child_series(self, file_id: int, name: str, missing: any=None) -> pd.Series:
+        """ Returns a field of the child rows linked to every primary row in the block, or missing where there is no child row """
+
+        if file_id not in self.block_child_rows:
+            self.block_child_rows[file_id] = []
+
+            for row in self.block:
+                self.start_row(row)
+                self.block_child_rows[file_id].append(self.child_row(file_id))
+
+        return pd.Series([(child_row.get(name) if type(child_row) is dict else child_row[name]) if child_row else missing for child_row in self.block_child_rows[file_id]], dtype=object)
+
+    def primary_value(self, name: str) -> any:
+        """ Returns a field of the primary row """
+
+        if type(self.row) is dict:
+            return self.row.get(name)
+
+        return self.row[name]
+
+    def attach(self) -> dict[int, tuple]:
+        """ Take the child rows from primary rows that SQLite joined the child files into.
+        Returns a dict of child file id: (child file, child linked field, primary linked field, child fields) for ImportSchemeFile.joined_rows """
+
+        links: dict[int, tuple] = {}
+
+        for file_id, (file, connection) in self.child_files.items():
+            links[file_id] = (file, *self.plan.child_links[file_id], self.plan.child_fields.get(file_id, []))
+            self.attached.add(file_id)
+
+        return links
+
+    def join(self, *, budget: int) -> int|None:
+        """ Load child files into hash tables on their linked field, only keeping the fields the plan uses, while they fit in budget bytes.
+        Returns the id of a child file that didn't fit and can be read in key order for a merge join, or None """
+
+        merge_file_id: int = None
+
+        for file_id, (file, connection) in self.child_files.items():
+            child_linked_field, primary_linked_field = self.plan.child_links[file_id]
+            table: dict[str, dict] = {}
+            size: int = 0
+
+            for key, row in file.key_rows(field=child_linked_field, fields=self.plan.child_fields.get(file_id, []), connection=connection):
+                if key not in table:
+                    table[key] = row
+                    size += sys.getsizeof(key) + sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+
+                    if size > budget:
+                        break
+            else:
+                self.joined[file_id] = table
+                budget -= size
+                continue
+
+            log.debug(f"Child file {file.name} doesn't fit in the join budget")
+
+            if merge_file_id is None and file.is_staged:
+                merge_file_id = file_id
+
+        return merge_file_id
+
+    def merge(self, file_id: int) -> None:
+        """ Read a child file in key order, to be merged with primary rows that are in the same order """
+
+        file, connection = self.child_files[file_id]
+        child_linked_field, primary_linked_field = self.plan.child_links[file_id]
+
+        self.merge_file_id = file_id
+        self.merge_rows = file.key_rows(field=child_linked_field, fields=self.plan.child_fields.get(file_id, []), ordered=True, connection=connection)
+        self.merge_row = next(self.merge_rows, None)
+
+    def _merged_row(self, key: str) -> dict|None:
+        """ Returns the first child row for a key, moving through the child rows in key order.  Keys must be asked for in order """
+
+        while self.merge_row is not None and self.merge_row[0] < key:
+            self.merge_row = next(self.merge_rows, None)
+
+        if self.merge_row is not None and self.merge_row[0] == key:
+            return self.merge_row[1]
+
+        return None
+
+    def child_row(self, file_id: int) -> any:
+        """ Returns the row of a child file linked to the primary row.  Each child row is only looked up once per primary row """
+
+        if file_id not in self.child_rows:
+            child_linked_field, primary_linked_field = self.plan.child_links[file_id]
+            file, connection = self.child_files[file_id]
+            key: any = self.primary_value(primary_linked_field)
+
+            if file_id in self.attached:
+                self.child_rows[file_id] = None
+
+                if self.primary_value(joined_column(file_id, "***rowid***")) is not None:
+                    self.child_rows[file_id] = {name: self.primary_value(joined_column(file_id, name)) for name in self.plan.child_fields.get(file_id, [])}
+            elif file_id in self.joined:
+                self.child_rows[file_id] = next((self.joined[file_id][str(item)] for item in (key if type(key) is list else [key]) if item and str(item) in self.joined[file_id]), None)
+            elif file_id == self.merge_file_id and type(key) is not list:
+                self.child_rows[file_id] = self._merged_row(str(key)) if key else None
+            elif file_id in self.prefetched and type(key) is not list:
+                self.child_rows[file_id] = self.prefetched[file_id].get(str(key)) if key else None
+            else:
+                self.child_rows[file_id] = file.find_row_by_key(field=child_linked_field, key=key, connection=connection)
+
+        return self.child_rows[file_id]
+
+    def child_value(self, file_id: int, name: str, missing: any=None) -> any:
+        """ Returns a field of a child row, or missing if there is no child row """
+
+        child_row = self.child_row(file_id)
+
+        if not child_row:
+            return missing
+
+        if type(child_row) is dict:
+            return child_row.get(name)
+
+        return child_row[name]
+
+    def resolver_instance(self, resolver: dict) -> Callable:
+        """ Returns the instance of a resolver class, making it the first time it's needed """
+
+        if resolver["full_name"] not in self.resolver_instances:
+            self.resolver_instances[resolver["full_name"]] = resolver["class"]()
+
+        return self.resolver_instances[resolver["full_name"]]
+
+
+class RowPlan():
+    """ The steps that build a row dict from a row of the primary file, compiled once from an import scheme's items """
+
+    def __init__(self, *, columns: list[dict], primary_file_id: int, child_links: dict[int, tuple], file_fields: dict[int, tuple], date_formats: dict[int, str]=None) -> None:
+        """ child_links is a dict of child file id: (child linked field name, primary linked field name)
+        file_fields is a dict of ImportSchemeFileField.id: (ImportSchemeFile.id, field name) for the fields of the scheme's files
+        date_formats is a dict of ImportSchemeFileField.id: the strptime format found for the field when its file was inspected """
+
+        self.columns: list[dict] = columns
+        self.primary_file_id: int = primary_file_id
+        self.child_links: dict[int, tuple] = child_links
+        self.file_fields: dict[int, tuple] = file_fields
+
+        # The fields of each child file that the plan reads, by child file id
+        self.child_fields: dict[int, list] = {}
+
+        self.steps: list[Callable] = []
+        self.block_steps: list[Callable] = []
+        self.deferred_steps: list[Callable] = []
+        self.clean_steps: list[tuple] = []
+
+        for column in columns:
+            strategy: str = column["import_scheme_item"].strategy
+
+            if strategy in DEFERRED_STRATEGIES:
+                self.deferred_steps.append(self._resolver_step(column))
+
+            elif step := self._step(column):
+                self.steps.append(step)
+                self.block_steps.append(self._block_step(column))
+
+            # Only dates need cleaning.  Fields read straight from a file use the date format found when it was inspected
+            if not column["importer_model"].is_key_value and getattr(column["importer_field"], "is_date", False):
+                date_format: str = (date_formats or {}).get(int(column["import_scheme_item"].settings["key"])) if strategy == "File Field" else None
+
+                self.clean_steps.append((column["column_name"], partial(column["importer_field"].clean_data, date_parser=DateParser(formats=[date_format]) if date_format else None)))
+
+    def rows(self, *, rows: Generator, context: RowContext, block_size: int=None) -> Generator[dict[str: any], None, None]:
+        """ Yields a row dict for each row of the primary file.  If block_size is set rows are built block_size at a time, with columns transformed by pandas """
+
+        if block_size:
+            yield from self._block_rows(rows=rows, context=context, block_size=block_size)
+            return
+
+        if not self.child_links:
+            yield from self._row_dicts(rows=rows, context=context)
+            return
+
+        rows = iter(rows)
+
+        while block := list(islice(rows, PREFETCH_ROWS)):
+            context.prefetch(block)
+
+            yield from self._row_dicts(rows=block, context=context)
+
+    def _row_dicts(self, *, rows: list, context: RowContext) -> Generator[dict[str: any], None, None]:
+        """ Yields a row dict for each of a list of primary rows, built one row at a time """
+
+        for row in rows:
+            context.start_row(row)
+            row_dict: dict = {"***row***setting***": {}}
+
+            for step in self.steps:
+                step(row_dict, context)
+
+            for step in self.deferred_steps:
+                step(row_dict, context)
+
+            for column_name, clean in self.clean_steps:
+                row_dict[column_name] = clean(row_dict.get(column_name))
+
+            yield row_dict
+
+    def _block_rows(self, *, rows: Generator, context: RowContext, block_size: int) -> Generator[dict[str: any], None, None]:
+        """ Yields a row dict for each row of the primary file, building block_size rows at a time.  Only Resolver columns are run row by row """
+
+        rows = iter(rows)
+
+        while block := list(islice(rows, block_size)):
+            context.start_block(block)
+            row_dicts: list[dict] = [{"***row***setting***": {}} for row in block]
+
+            for step in self.block_steps:
+                step(row_dicts, context)
+
+            if self.deferred_steps:
+                for index, row_dict in enumerate(row_dicts):
+                    context.start_row(block[index], index=index)
+
+                    for step in self.deferred_steps:
+                        step(row_dict, context)
+
+            # Each distinct value in the block is only cleaned once
+            for column_name, clean in self.clean_steps:
+                values: list = [row_dict.get(column_name) for row_dict in row_dicts]
+                cleaned: dict = {value: clean(value) for value in dict.fromkeys(values)}
+
+                for row_dict, value in zip(row_dicts, values):
+                    row_dict[column_name] = cleaned[value]
+
+            yield from row_dicts
+
+    def primary_field_approval(self, name: str) -> Callable|None:
+        """ Returns a function that takes a value of a field of the primary file and returns True if rows with that value get past the approved_values
+        of the File Field columns that read the field, or None if no column rejects rows by the field """
+
+        checks: list[tuple] = []
+
+        for column in self.columns:
+            field_settings: dict = getattr(column.get("importer_field"), "settings", {})
+
+            if (
+                column["import_scheme_item"].strategy == "File Field"
+                and not column["importer_model"].is_key_value
+                and column["importer_model"].settings.get("restriction") == "rejected"
+                and "approved_values" in field_settings
+                and self.file_fields[int(column["import_scheme_item"].settings["key"])] == (self.primary_file_id, name)
+            ):
+                checks.append((field_settings.get("translate_values"), field_settings.get("force_case"), field_settings["approved_values"]))
+
+        if not checks:
+            return None
+
+        return lambda value: all(_adjusted_value(value, translate_values=translate_values, force_case=force_case) in approved_values for translate_values, force_case, approved_values in checks)
+
+    def _getter(self, key: int, missing: any="") -> Callable:
+        """ Returns a function that takes a RowContext and returns the value of a file field.  missing is returned if there's no linked child row """
+
+        file_id, name = self.file_fields[int(key)]
+
+        if file_id == self.primary_file_id:
+            return lambda context: context.primary_value(name)
+
+        self._use_child_field(file_id, name)
+
+        return lambda context: context.child_value(file_id, name, missing)
+
+    def _use_child_field(self, file_id: int, name: str) -> None:
+        """ Record that the plan reads a field of a child file """
+
+        if name not in self.child_fields.setdefault(file_id, []):
+            self.child_fields[file_id].append(name)
+
+    def _step(self, column: dict) -> Callable|None:
+        """ Compile a column that doesn't need the rest of the row """
+
+        strategy: str = column["import_scheme_item"].strategy
+        item_settings: dict = column["import_scheme_item"].settings
+        column_name: str = column["column_name"]
+
+        # Model is a key/value model, meaning that the data goes in as multiple rows instead of columns
+        if column["importer_model"].is_key_value:
+            if strategy == "No Data":
+                return None
+
+            getters: list[tuple] = [(key, self._getter(value["key"])) for key, value in item_settings.items() if type(value) is dict and "key" in value]
+
+            def key_value_step(row_dict: dict, context: RowContext) -> None:
+                row_dict[column_name] = {key: getter(context) for key, getter in getters}
+
+            return key_value_step
+
+        value: Callable = None
+
+        if strategy == "Raw Text":
+            raw_text: str = item_settings["raw_text"]
+            value = lambda context: raw_text
+
+        # A value loaded from a table
+        elif strategy == "Table Row":
+            table_row: any = item_settings["row"]
+            value = lambda context: table_row
+
+        elif strategy == "No Data":
+            value = lambda context: None
+
+        # The 'regular' import of a field directly from the file
+        elif strategy == "File Field":
+            value = self._getter(item_settings["key"])
+
+        elif strategy == "Select First":
+            first_getters: list[Callable] = [self._getter(key, missing=None) for key in item_settings.get("first_keys", [])]
+
+            def value(context: RowContext) -> any:
+                first_value: any = None
+
+                for getter in first_getters:
+                    if first_value := getter(context):
+                        break
+
+                return first_value
+
+        elif strategy == "Split Field":
+            split_getter: Callable = self._getter(item_settings["split_key"], missing=None)
+            splitter: str = item_settings["splitter"]
+            splitter_position: int = item_settings["splitter_position"] - 1
+
+            def value(context: RowContext) -> any:
+                split_value: any = split_getter(context)
+
+                if split_value and splitter in split_value:
+                    return split_value.split(splitter)[splitter_position]
+
+                return split_value
+
+        else:
+            log.warn(f"{column['name']}: Unknown strategy {strategy}")
+            return None
+
+        return self._adjusted(column, value)
+
+    def _adjusted(self, column: dict, value: Callable) -> Callable:
+        """ Wrap a value function with the adjustments and rejection checks set on the field """
+
+        column_name: str = column["column_name"]
+        field_settings: dict = column["importer_field"].settings
+
+        translate_values: dict = field_settings.get("translate_values")
+        force_case: str = field_settings.get("force_case")
+        approved_values: list = None
+
+        # Check the data for rejections and store that in row_dict[***row***setting***][reject_row]
+        if column["importer_model"].settings.get("restriction") == "rejected" and "approved_values" in field_settings:
+            approved_values = field_settings["approved_values"]
+
+        def step(row_dict: dict, context: RowContext) -> None:
+            field_value: any = _adjusted_value(value(context), translate_values=translate_values, force_case=force_case)
+
+            row_dict[column_name] = field_value
+
+            if approved_values is not None and field_value not in approved_values:
+                row_dict["***row***setting***"].setdefault("reject_row", []).append({column["name"]: field_value})
+
+        return step
+
+    def _series_getter(self, key: int, missing: any="") -> Callable:
+        """ Returns a function that takes a RowContext and returns the values of a file field for the block.  missing is used where there's no linked child row """
+
+        file_id, name = self.file_fields[int(key)]
+
+        if file_id == self.primary_file_id:
+            return lambda context: context.primary_series(name)
+
+        self._use_child_field(file_id, name)
+
+        return lambda context: context.child_series(file_id, name, missing)
+
+    def _block_step(self, column: dict) -> Callable:
+        """ Compile a column that doesn't need the rest of the row into a step that sets it for a block of rows """
+
+        strategy: str = column["import_scheme_item"].strategy
+        item_settings: dict = column["import_scheme_item"].settings
+        column_name: str = column["column_name"]
+
+        if column["importer_model"].is_key_value:
+            getters: list[tuple] = [(key, self._series_getter(value["key"])) for key, value in item_settings.items() if type(value) is dict and "key" in value]
+
+            def key_value_step(row_dicts: list[dict], context: RowContext) -> None:
+                values: list[tuple] = [(key, _values(getter(context))) for key, getter in getters]
+
+                for index, row_dict in enumerate(row_dicts):
+                    row_dict[column_name] = {key: key_values[index] for key, key_values in values}
+
+            return key_value_step
+
+        series: Callable = None
+
+        if strategy in ("Raw Text", "Table Row", "No Data"):
+            constant: any = item_settings["raw_text"] if strategy == "Raw Text" else item_settings["row"] if strategy == "Table Row" else None
+            series = lambda context: pd.Series([constant] * len(context.block), dtype=object)
+
+        elif strategy == "File Field":
+            series = self._series_getter(item_settings["key"])
+
+        elif strategy == "Select First":
+            first_getters: list[Callable] = [self._series_getter(key, missing=None) for key in item_settings.get("first_keys", [])]
+
+            def series(context: RowContext) -> pd.Series:
+                first_values = pd.Series([None] * len(context.block), dtype=object)
+
+                # Working back from the last field, each field replaces the values of the fields after it where it has a value
+                for getter in reversed(first_getters):
+                    values: pd.Series = getter(context)
+                    first_values = values.where(values.notna() & values.astype(bool), first_values)
+
+                return first_values
+
+        elif strategy == "Split Field":
+            split_getter: Callable = self._series_getter(item_settings["split_key"], missing=None)
+            splitter: str = item_settings["splitter"]
+            splitter_position: int = item_settings["splitter_position"] - 1
+
+            def series(context: RowContext) -> pd.Series:
+                values: pd.Series = split_getter(context)
+                split: pd.Series = _string_method(values, "split", splitter, regex=False)
+
+                if split is None:
+                    return values
+
+                return split.str[splitter_position].where(_string_method(values, "contains", splitter, regex=False).eq(True), values)
+
+        return self._adjusted_block(column, series)
+
+    def _adjusted_block(self, column: dict, series: Callable) -> Callable:
+        """ Wrap a series function with the adjustments and rejection checks set on the field, run column-wise on the block """
+
+        column_name: str = column["column_name"]
+        field_settings: dict = column["importer_field"].settings
+
+        translate_values: dict = field_settings.get("translate_values")
+        force_case: str = field_settings.get("force_case")
+        approved_values: list = None
+
+        if column["importer_model"].settings.get("restriction") == "rejected" and "approved_values" in field_settings:
+            approved_values = field_settings["approved_values"]
+
+        def step(row_dicts: list[dict], context: RowContext) -> None:
+            values: pd.Series = series(context)
+
+            # Multi-valued fields, like GFF attributes, hold lists that pandas can't hash or compare, so they're adjusted one row at a time
+            if values.dtype == object and any(type(value) is list for value in values):
+                for row_dict, field_value in zip(row_dicts, _values(values)):
+                    field_value = _adjusted_value(field_value, translate_values=translate_values, force_case=force_case)
+                    row_dict[column_name] = field_value
+
+                    if approved_values is not None and field_value not in approved_values:
+                        row_dict["***row***setting***"].setdefault("reject_row", []).append({column["name"]: field_value})
+
+                return
+
+            if (lowered := _string_method(values, "lower")) is not None:
+                values = values.where(lowered.ne("null"), None)
+
+            if translate_values is not None:
+                values = values.map(translate_values).where(values.isin(list(translate_values)), values)
+
+            if force_case in ("upper", "lower") and (cased := _string_method(values, force_case)) is not None:
+                values = cased.where(cased.notna(), values)
+
+            field_values: list = _values(values)
+
+            for row_dict, field_value in zip(row_dicts, field_values):
+                row_dict[column_name] = field_value
+
+            if approved_values is not None:
+                for index in (~values.isin(approved_values)).to_numpy().nonzero()[0]:
+                    row_dicts[index]["***row***setting***"].setdefault("reject_row", []).append({column["name"]: field_values[index]})
+
+        return step
+
+    def _resolver_step(self, column: dict) -> Callable:
+        """ Compile a column that runs a resolver on the rest of the row """
+
+        column_name: str = column["column_name"]
+        resolver: dict = column["importer_field"].resolvers[column["import_scheme_item"].settings["resolver"]]
+        cacheable: bool = column["importer_field"].settings.get("cacheable", True)
+
+        # Field lookup arguments return a value from the current processed row
+        lookup_arguments: list[tuple] = [(f"field_lookup_{argument}", argument) for argument in resolver["field_lookup_arguments"]]
+
+        # User input arguments are looked up in the provided files.  Used to impliment a translation table
+        input_arguments: list[tuple] = [
+            (f"user_input_{argument['name']}", self._getter(column["import_scheme_item"].settings["arguments"][argument["name"]]["key"]))
+            for argument in resolver["user_input_arguments"]
+        ]
+
+        def step(row_dict: dict, context: RowContext) -> None:
+            arguments: dict = {name: row_dict[argument] for name, argument in lookup_arguments}
+
+            for name, getter in input_arguments:
+                arguments[name] = getter(context)
+
+            function: Callable = resolver["function"] if "function" in resolver else context.resolver_instance(resolver)
+
+            # If the function throws an error, reject the row
+            try:
+                if cacheable:
+                    key: str = dict_hash(arguments)
+
+                    if not (field_value := context.resolved.find(key=key)):
+                        field_value = function(**arguments)
+                        context.resolved.store(key=key, value=field_value)
+                else:
+                    field_value = function(**arguments)
+
+            except Exception as err:
+                log.warn(err)
+                field_value = None
+
+                row_dict["***row***setting***"].setdefault("reject_row", []).append({column["name"]: f"Function error: {err}"})
+
+            row_dict[column_name] = field_value
+
+        return step
+
+
+def _adjusted_value(field_value: any, *, translate_values: dict=None, force_case: str=None) -> any:
+    """ Returns a field value with "null" as None, translated and with its case forced the way the field's settings ask.  Lists of values are left as they are """
+
+    if type(field_value) is str and field_value.lower() == "null":
+        field_value = None
+
+    if translate_values is not None and type(field_value) is not list and field_value in translate_values:
+        field_value = translate_values[field_value]
+
+    if force_case == "upper" and type(field_value) is str:
+        field_value = field_value.upper()
+
+    elif force_case == "lower" and type(field_value) is str:
+        field_value = field_value.lower()
+
+    return field_value
+
+
+def _string_method(values: pd.Series, method: str, *args, **kwargs) -> pd.Series|None:
+    """ Runs a pandas string method on a series.  Values that aren't strings become NaN, and None is returned if there are no strings at all """
+
+    try:
+        return getattr(values.str, method)(*args, **kwargs)
+    except AttributeError:
+        return None
+
+
+def _values(values: pd.Series) -> list:
+    """ Returns the values of a series as a list, with missing values as None """
+
+    return values.astype(object).where(values.notna(), None).tolist()
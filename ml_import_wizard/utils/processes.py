@@ -20,6 +20,10 @@ def check_processes() -> None:
             log.warn(f"{scheme} has all files inspected, setting status to 'Files Inspected'")
 
 
+    # Check for crashed inspections
+    for scheme_file in models.ImportSchemeFile.objects.filter(status__inspecting=True, status__inspected=False):
+        scheme_file.inspect_check_health()
+
     # Check for crashed imports
     for scheme in models.ImportScheme.objects.filter(status__import_started=True, status__import_completed=False, status__import_failed=False):
         scheme.process_check_health()
@@ -0,0 +1,66 @@
+""" Holds RecordScanner, which finds where the records of a csv/tsv file start while the file is being parsed """
+
+import io
+from typing import IO
+
+
+class RecordScanner(io.RawIOBase):
+    """ Reads a file opened in binary mode a line at a time, keeping the offset of every interval-th record after the header.
+    Records are found by counting quotes, and blank lines are skipped as pandas skips them.  Wrap it in an io.BufferedReader to parse it as it's scanned """
+
+    def __init__(self, file: IO, *, interval: int):
+        """ Scan file, keeping the offset of every interval-th record """
+
+        self.lines = iter(file)
+        self.interval: int = interval
+        self.offsets: list[int] = []
+        self.row_count: int = 0
+
+        self.pending: bytearray = bytearray()
+        self.position: int = 0
+        self.record_start: int = 0
+        self.quotes: int = 0
+        self.header_read: bool = False
+
+    def readable(self) -> bool:
+        """ RecordScanner can be read """
+        return True
+
+    def readinto(self, buffer) -> int:
+        """ Fill buffer with the next lines of the file, scanning each line as it's read """
+
+        while len(self.pending) < len(buffer) and (line := next(self.lines, None)) is not None:
+            self._scan(line)
+            self.pending += line
+
+        size: int = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        del self.pending[:size]
+
+        return size
+
+    def _scan(self, line: bytes) -> None:
+        """ Count the record that ends with line, if it ends one """
+
+        if self.quotes % 2 == 0:
+            self.record_start, self.quotes = self.position, 0
+
+        self.quotes += line.count(b'"')
+        self.position += len(line)
+
+        # An odd number of quotes means a quoted value carries on to the next line
+        if self.quotes % 2:
+            return
+
+        # pandas skips blank lines, including before the header
+        if self.record_start == self.position - len(line) and not line.strip(b"\r\n"):
+            return
+
+        if not self.header_read:
+            self.header_read = True
+            return
+
+        if self.row_count % self.interval == 0:
+            self.offsets.append(self.record_start)
+
+        self.row_count += 1
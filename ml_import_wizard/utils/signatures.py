@@ -0,0 +1,181 @@
+""" Holds content signatures, persisted hashes of an object's field values and key/value children that let minimum_objects matches be one indexed lookup """
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+import logging
+log = logging.getLogger(settings.ML_IMPORT_WIZARD['Logger'])
+
+import hashlib, json
+
+# Returned by find when the model's objects aren't all signed and the database has to be queried
+NOT_SIGNED = object()
+
+
+class ContentSignatures():
+    """ Finds and records the ImportSignatures of models with the content_signature setting.
+    Signatures describe objects as they were imported, so objects changed outside of the wizard should be signed again with sign_objects """
+
+    def __init__(self, *, models: list) -> None:
+        """ models should be ImporterModels.  Only models whose objects are all signed are looked up by signature """
+
+        self.models: set[str] = {model.name for model in models if model.settings.get("content_signature")}
+        self.signed: set[str] = set()
+
+        for model in [model for model in models if model.name in self.models]:
+            if self.is_fully_signed(model=model):
+                self.signed.add(model.name)
+            else:
+                log.info(f"{model.name}: not all objects have content signatures, run sign_objects to use them")
+
+    @staticmethod
+    def signature_model() -> models.Model:
+        """ Returns the ImportSignature model """
+
+        return apps.get_model("ml_import_wizard", "ImportSignature")
+
+    @staticmethod
+    def _pkey_field(model: object) -> str:
+        """ Returns the ImportSignature field that holds pks for the model """
+
+        return "pkey_int" if model.model._meta.pk.get_internal_type() in ("AutoField", "BigAutoField", "SmallAutoField", "IntegerField", "BigIntegerField") else "pkey_str"
+
+    def is_fully_signed(self, *, model: object) -> bool:
+        """ True if every object of the model, and nothing else, has a signature """
+
+        signatures = self.signature_model().objects.filter(model=model.model._meta.label)
+        object_count: int = model.model.objects.count()
+
+        if signatures.count() != object_count:
+            return False
+
+        return signatures.filter(**{f"{self._pkey_field(model)}__in": model.model.objects.values("pk")}).count() == object_count
+
+    @staticmethod
+    def row_key_values(*, model: object, row: dict) -> dict[str, dict]:
+        """ Returns the key/value children of the model held in a row, keeping only the ones execute saves """
+
+        return {key_value_model.name: {key: value for key, value in row.get(f"{key_value_model.name} (key-value)", {}).items() if value and value != "NULL"} for key_value_model in model.key_value_children}
+
+    @staticmethod
+    def signature(*, model: object, values: dict, key_values: dict[str, dict]) -> str:
+        """ Returns the signature for the field values (by field name) and key/value children of an object """
+
+        def normalize(field: object, value: any) -> any:
+            if isinstance(value, models.Model):
+                value = value.pk
+
+            if value is not None:
+                try:
+                    value = field.to_python(value)
+                except (ValidationError, ValueError, TypeError):
+                    pass
+
+            return value
+
+        parts: list = [model.model._meta.label]
+
+        for field in [field for field in model.fields if not field.is_pseudo]:
+            value: any = normalize(field.field, values.get(field.name))
+
+            if field.settings.get("case_insensitive_compare") == True and isinstance(value, str):
+                value = value.lower()
+
+            parts.append(value)
+
+        for key_value_model in model.key_value_children:
+            key_field = key_value_model.fields_by_name[key_value_model.settings["key_field"]].field
+            value_field = key_value_model.fields_by_name[key_value_model.settings["value_field"]].field
+
+            parts.append(sorted((str(normalize(key_field, key)), str(normalize(value_field, value))) for key, value in key_values.get(key_value_model.name, {}).items()))
+
+        return hashlib.md5(json.dumps(parts, default=str).encode()).hexdigest()
+
+    def find(self, *, model: object, attributes: dict, key_values: dict[str, dict]) -> any:
+        """ Returns the pk of the object with the attributes and key/values, None if there isn't one, or NOT_SIGNED if signatures can't answer """
+
+        if model.name not in self.signed:
+            return NOT_SIGNED
+
+        signature: str = self.signature(model=model, values=attributes, key_values=key_values)
+        pkeys: tuple = self.signature_model().objects.filter(model=model.model._meta.label, signature=signature).values_list("pkey_int", "pkey_str").first()
+
+        if not pkeys:
+            return None
+
+        return pkeys[0] if pkeys[0] is not None else pkeys[1]
+
+    def add(self, *, model: object, instances: list) -> None:
+        """ Save signatures for new instances.  Instances should carry the key/values of their row in _import_wizard_key_values """
+
+        if model.name not in self.models:
+            return
+
+        signatures: list = []
+
+        for instance in instances:
+            # Without a pk the signature can't point at the object, so the model can't be trusted to be fully signed anymore
+            if instance.pk is None:
+                self.signed.discard(model.name)
+                continue
+
+            signatures.append(self._signature_object(model=model, instance=instance, key_values=getattr(instance, "_import_wizard_key_values", {})))
+
+        self.signature_model().objects.bulk_create(signatures)
+
+    def _signature_object(self, *, model: object, instance: models.Model, key_values: dict[str, dict]) -> models.Model:
+        """ Returns an unsaved ImportSignature for an instance """
+
+        values: dict = {field.name: getattr(instance, field.field.attname) for field in model.fields if not field.is_pseudo}
+
+        return self.signature_model()(
+            model = model.model._meta.label,
+            signature = self.signature(model=model, values=values, key_values=key_values),
+            **{self._pkey_field(model): instance.pk},
+        )
+
+    def sign_all(self, *, model: object, batch_size: int=1000) -> int:
+        """ Replace the signatures of all objects of a model.  Returns the number of objects signed """
+
+        signature_model = self.signature_model()
+        object_count: int = 0
+
+        with transaction.atomic():
+            signature_model.objects.filter(model=model.model._meta.label).delete()
+            instances: list = []
+
+            for instance in model.model.objects.order_by("pk").iterator(chunk_size=batch_size):
+                instances.append(instance)
+
+                if len(instances) >= batch_size:
+                    object_count += self._sign_batch(model=model, instances=instances)
+                    instances = []
+
+            object_count += self._sign_batch(model=model, instances=instances)
+
+        self.signed.add(model.name)
+
+        return object_count
+
+    def _sign_batch(self, *, model: object, instances: list) -> int:
+        """ Save signatures for a batch of existing objects, loading their key/value children with one query per key/value model """
+
+        key_values: dict = {instance.pk: {} for instance in instances}
+
+        for key_value_model in model.key_value_children:
+            foreign_key = next(field for field in key_value_model.fields if field.is_foreign_key and field.field.related_model == model.model)
+
+            for key_value in key_values.values():
+                key_value[key_value_model.name] = {}
+
+            for pk, key, value in key_value_model.model.objects.filter(**{f"{foreign_key.field.attname}__in": list(key_values)}).values_list(
+                foreign_key.field.attname, key_value_model.settings["key_field"], key_value_model.settings["value_field"]
+            ):
+                if value and value != "NULL":
+                    key_values[pk][key_value_model.name][key] = value
+
+        self.signature_model().objects.bulk_create([self._signature_object(model=model, instance=instance, key_values=key_values[instance.pk]) for instance in instances])
+
+        return len(instances)
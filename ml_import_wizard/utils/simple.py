@@ -18,6 +18,12 @@ def dict_hash(dictionary: Dict[str, Any]) -> str:
     return dhash.hexdigest()
 
 
+def lock_id(value: any) -> int:
+    """ Signed 64 bit hash of a value, for use as a PostgreSQL advisory lock key """
+    dhash = hashlib.md5(repr(value).encode())
+    return int.from_bytes(dhash.digest()[:8], "big", signed=True)
+
+
 def sound_user_name(user: object) -> str: # object should be user, but importing user caused a circular import
     ''' Get a sound name for the user.  First match of "first_name last_name", "first_name", "last_name", "username"'''
     if user.first_name and user.last_name:
@@ -0,0 +1,260 @@
+""" Holds writers that buffer new objects during an import and save them in batches """
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, models
+
+import logging
+log = logging.getLogger(settings.ML_IMPORT_WIZARD['Logger'])
+
+from itertools import count
+from datetime import date, time
+from decimal import Decimal
+from uuid import UUID
+import io
+
+# Tokens identify instances that haven't been saved yet, so they can be told apart in cache keys
+_pending_tokens = count(1)
+
+
+def identity_value(value: any) -> any:
+    """ Returns a value that can stand in for the given value in cache keys.
+    Model instances are identified by pk, or by a pending token if they haven't been saved yet """
+
+    if isinstance(value, models.Model):
+        if value.pk is not None:
+            return f"{value._meta.label}:{value.pk}"
+
+        if not hasattr(value, "_import_wizard_token"):
+            value._import_wizard_token = next(_pending_tokens)
+
+        return f"{value._meta.label}:pending:{value._import_wizard_token}"
+
+    return value
+
+
+def copy_text(value: any) -> str|None:
+    """ Returns the value as a field for COPY text format, or None if COPY can't take it """
+
+    if value is None:
+        return "\\N"
+
+    if isinstance(value, bool):
+        return "t" if value else "f"
+
+    if isinstance(value, (str, int, float, Decimal, date, time, UUID)):
+        return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+    return None
+
+
+def missing_key_values(model: object, instances: list) -> list:
+    """ Returns the instances of a key/value ImporterModel that aren't already in the database.
+    Existing key/values are found with one query per 500 parents instead of one query per key, and key/values with a null parent match saved ones with the same null parent """
+
+    fields: list = [field for field in model.fields if field.is_foreign_key or field.is_key_field or field.is_value_field]
+    foreign_keys: list = [field for field in fields if field.is_foreign_key]
+    key_field: object = next(field for field in fields if field.is_key_field)
+
+    def identity(values: tuple) -> tuple:
+        """ Normalize database values and row values so they compare the same """
+
+        normalized: list = []
+
+        for field, value in zip(fields, values):
+            try:
+                normalized.append(field.field.to_python(value))
+            except (ValidationError, ValueError, TypeError):
+                normalized.append(value)
+
+        return tuple(normalized)
+
+    def instance_values(instance: models.Model) -> tuple:
+        return tuple(getattr(instance, field.field.attname) for field in fields)
+
+    if not instances or not foreign_keys:
+        return instances
+
+    # A parent that's null has to be matched with __isnull, so key/values are looked up in groups by which of their parents are null
+    groups: dict[tuple, list] = {}
+
+    for instance in instances:
+        groups.setdefault(tuple(getattr(instance, field.field.attname) is None for field in foreign_keys), []).append(instance)
+
+    existing: set = set()
+
+    for nulls, candidates in groups.items():
+        null_parents: dict = {f"{field.field.attname}__isnull": True for field, null in zip(foreign_keys, nulls) if null}
+        parents: list = [field for field, null in zip(foreign_keys, nulls) if not null]
+        parent_ids: list = list(dict.fromkeys(getattr(instance, parents[0].field.attname) for instance in candidates)) if parents else [None]
+        keys: set = {getattr(instance, key_field.field.attname) for instance in candidates}
+
+        for start in range(0, len(parent_ids), 500):
+            query = model.model.objects.filter(**null_parents, **{f"{key_field.field.attname}__in": keys})
+
+            if parents:
+                query = query.filter(**{f"{parents[0].field.attname}__in": parent_ids[start:start+500]})
+
+            for field in parents[1:]:
+                query = query.filter(**{f"{field.field.attname}__in": {getattr(instance, field.field.attname) for instance in candidates}})
+
+            existing.update(identity(values) for values in query.values_list(*[field.field.attname for field in fields]))
+
+    if not existing:
+        return instances
+
+    return [instance for instance in instances if identity(instance_values(instance)) not in existing]
+
+
+class BulkWriter():
+    """ Buffers new model instances and saves them with bulk_create.
+    Models are saved in the order given so parents get their pks before their children are saved """
+
+    def __init__(self, *, models: list, batch_size: int=1000, copy_leaf_models: bool=False) -> None:
+        """ models should be ImporterModels in import order.
+        If copy_leaf_models is True models that nothing in the writer points to are saved with COPY on PostgreSQL """
+
+        self.models: list = models
+        self.batch_size: int = batch_size
+        self.copy_leaf_models: bool = copy_leaf_models and connection.vendor == "postgresql"
+        self.pending: dict = {model: [] for model in models}
+        self.dedupe_keys: set = set()
+
+        # Marks for the row currently being built, so the row can be discarded if it's rejected
+        self.row_marks: dict = {}
+        self.row_dedupe_keys: list = []
+
+        # Models that other models in the writer point to need their pks back from bulk_create
+        self.parent_models: set = set()
+        for model in models:
+            for field in model.model._meta.concrete_fields:
+                if field.is_relation and field.related_model:
+                    self.parent_models.add(field.related_model)
+
+    def add(self, model: object, instance: models.Model, *, dedupe_key: any=None) -> bool:
+        """ Buffer an instance to be saved.  Returns False if an instance with the same dedupe_key is already buffered """
+
+        if dedupe_key is not None:
+            if dedupe_key in self.dedupe_keys:
+                return False
+
+            self.dedupe_keys.add(dedupe_key)
+            self.row_dedupe_keys.append(dedupe_key)
+
+        identity_value(instance)   # Gives the instance its pending token
+        self.pending[model].append(instance)
+
+        return True
+
+    def start_row(self) -> None:
+        """ Mark the start of a row """
+
+        self.row_marks = {model: len(instances) for model, instances in self.pending.items()}
+        self.row_dedupe_keys = []
+
+    def discard_row(self) -> None:
+        """ Throw out everything buffered since start_row """
+
+        for model, mark in self.row_marks.items():
+            del self.pending[model][mark:]
+
+        self.dedupe_keys.difference_update(self.row_dedupe_keys)
+        self.row_dedupe_keys = []
+
+    def clear(self) -> None:
+        """ Throw out everything that is buffered """
+
+        for instances in self.pending.values():
+            instances.clear()
+
+        self.dedupe_keys.clear()
+        self.row_marks = {}
+        self.row_dedupe_keys = []
+
+    def flush(self) -> dict:
+        """ Save all buffered instances.  Should be run inside a transaction.  Returns a dict of ImporterModel: list of saved instances """
+
+        flushed: dict = {}
+
+        for model in self.models:
+            instances = self.pending[model]
+            if not instances:
+                continue
+
+            for instance in instances:
+                self._wire_foreign_keys(instance)
+
+            # Key/values are buffered without checking the database, so the ones that already exist are dropped here
+            if model.is_key_value:
+                instances = missing_key_values(model, instances)
+
+            if instances:
+                self._save(model, instances)
+                flushed[model] = list(instances)
+
+        self.clear()
+
+        return flushed
+
+    def _save(self, model: object, instances: list) -> None:
+        """ Save the instances for one model """
+
+        # Copied instances don't get pks back, so only models that nothing points to (and that aren't deferred or signed by pk) can be copied
+        if self.copy_leaf_models and model.model not in self.parent_models and model.settings.get("restriction") != "deferred" and not model.settings.get("content_signature"):
+            if self._copy(model, instances):
+                return
+
+        # If the backend can't give us pks from bulk_create the parents have to be saved one at a time
+        if model.model in self.parent_models and not connection.features.can_return_rows_from_bulk_insert:
+            for instance in instances:
+                instance.save(force_insert=True)
+            return
+
+        model.model.objects.bulk_create(instances, batch_size=self.batch_size)
+
+    @staticmethod
+    def _wire_foreign_keys(instance: models.Model) -> None:
+        """ Copy the pks of parents that were saved after being assigned to this instance into its foreign key columns """
+
+        for field in instance._meta.concrete_fields:
+            if field.is_relation and field.is_cached(instance):
+                related = field.get_cached_value(instance)
+
+                if related is not None and getattr(instance, field.attname) is None:
+                    setattr(instance, field.attname, related.pk)
+
+    @staticmethod
+    def _copy(model: object, instances: list) -> bool:
+        """ Stream the instances into the model's table with COPY.  Returns False, without writing anything, if a value can't be copied """
+
+        options = model.model._meta
+        fields: list = [field for field in options.concrete_fields if field is not options.auto_field]
+        lines: list[str] = []
+
+        for instance in instances:
+            values: list[str] = []
+
+            for field in fields:
+                value: str = copy_text(field.get_db_prep_save(field.pre_save(instance, True), connection))
+
+                if value is None:
+                    log.debug(f"{model.name}: {field.name} can't be copied, using bulk_create")
+                    return False
+
+                values.append(value)
+
+            lines.append("\t".join(values))
+
+        quote = connection.ops.quote_name
+        sql: str = f"COPY {quote(options.db_table)} ({', '.join(quote(field.column) for field in fields)}) FROM STDIN"
+        data: str = "\n".join(lines) + "\n"
+
+        with connection.cursor() as cursor:
+            # psycopg2 and psycopg 3 have different COPY interfaces
+            if hasattr(cursor, "copy_expert"):
+                cursor.copy_expert(sql, io.StringIO(data))
+            else:
+                with cursor.copy(sql) as copy:
+                    copy.write(data)
+
+        return True